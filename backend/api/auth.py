@@ -3,14 +3,23 @@ Authentication endpoints.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from database import get_db
 from models.user import User
-from schemas.auth import UserCreate, UserLogin, UserResponse, Token, ChangePassword, ResetPassword
-from core.security import verify_password, get_password_hash, create_access_token, decode_access_token
+from schemas.auth import UserCreate, UserLogin, UserResponse, CurrentUser, Token, ChangePassword, ResetPassword
+from core.security import (
+    PasswordHashBusy,
+    create_access_token,
+    decode_access_token,
+    get_password_hash_async,
+    verify_password_async,
+)
+from services.login_throttle import login_throttle
+from services.user_cache import get_user_by_subject, invalidate_user
 
 
 router = APIRouter()
@@ -24,8 +33,14 @@ security = HTTPBearer()
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """Récupère l'utilisateur actuel depuis le token JWT."""
+) -> CurrentUser:
+    """
+    Récupère l'utilisateur actuel depuis le token JWT.
+    
+    L'utilisateur est lu depuis le cache (services/user_cache.py) : la
+    plupart des requêtes s'authentifient sans requête SQL. L'objet
+    retourné est en lecture seule ; recharger le User pour le modifier.
+    """
     token = credentials.credentials
     payload = decode_access_token(token)
     
@@ -42,7 +57,14 @@ def get_current_user(
             detail="Invalid token payload"
         )
     
-    user = db.query(User).filter(User.username == username).first()
+    # Compte désactivé au moment de l'émission du token
+    if payload.get("active") is False:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    
+    user = get_user_by_subject(db, username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,7 +82,7 @@ def get_current_user(
 
 def require_role(allowed_roles: list[str]):
     """Dependency pour vérifier le rôle."""
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    def role_checker(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -75,60 +97,104 @@ def require_role(allowed_roles: list[str]):
 # ============================================================
 
 @router.post("/register", response_model=UserResponse)
-def register(
+async def register(
     user_data: UserCreate, 
-    current_user: User = Depends(require_role(["admin"])),  # ✅ ADMIN ONLY
+    current_user: CurrentUser = Depends(require_role(["admin"])),  # ✅ ADMIN ONLY
     db: Session = Depends(get_db)
 ):
-    """Créer un nouveau compte (ADMIN only)."""
+    """
+    Créer un nouveau compte (ADMIN only).
+    
+    Async : bcrypt tourne dans le pool dédié, comme pour change-password.
+    """
     # Vérifier si username existe
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == user_data.username).first()
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
     # Vérifier si email existe
-    if user_data.email and db.query(User).filter(User.email == user_data.email).first():
+    if user_data.email and await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == user_data.email).first()
+    ):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
+    try:
+        password_hash = await get_password_hash_async(user_data.password)
+    except PasswordHashBusy:
+        raise _password_busy_error()
+    
     # Créer user
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         role=user_data.role
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    def _save():
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+    
+    await run_in_threadpool(_save)
     
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    """Se connecter et obtenir un token."""
-    user = db.query(User).filter(User.username == credentials.username).first()
+async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+    """
+    Se connecter et obtenir un token.
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    Async : bcrypt tourne dans le pool dédié (core/security.py), un pic de
+    logins n'occupe donc pas le threadpool des autres routes. Les échecs
+    répétés sur un même username sont limités (429).
+    """
+    retry_after = login_throttle.retry_after(credentials.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.username == credentials.username).first()
+    )
+    
+    password_ok = False
+    if user:
+        password_ok = await _verify_password_or_503(credentials.password, user.password_hash)
+    
+    if not password_ok:
+        login_throttle.record_failure(credentials.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
+    login_throttle.reset(credentials.username)
+    
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="User account is inactive"
         )
     
-    # Créer token
-    access_token = create_access_token(data={"sub": user.username})
+    # Créer token (rôle et statut inclus dans les claims)
+    access_token = create_access_token(data={
+        "sub": user.username,
+        "uid": user.id,
+        "role": user.role,
+        "active": user.is_active,
+    })
     
     return Token(
         access_token=access_token,
@@ -138,13 +204,13 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(current_user: CurrentUser = Depends(get_current_user)):
     """Récupérer les infos de l'utilisateur connecté."""
     return current_user
 
 @router.get("/users", response_model=list[UserResponse])
 def get_all_users(
-    current_user: User = Depends(require_role(["admin"])),
+    current_user: CurrentUser = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Récupérer tous les utilisateurs (ADMIN only)."""
@@ -152,35 +218,52 @@ def get_all_users(
     return users
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     data: ChangePassword,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Changer son mot de passe."""
+    # Recharger l'utilisateur (current_user est un snapshot du cache)
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.id == current_user.id).first()
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    
     # Vérifier l'ancien mot de passe
-    if not verify_password(data.old_password, current_user.password_hash):
+    if not await _verify_password_or_503(data.old_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
     
     # Changer le mot de passe
-    current_user.password_hash = get_password_hash(data.new_password)
-    db.commit()
+    try:
+        user.password_hash = await get_password_hash_async(data.new_password)
+    except PasswordHashBusy:
+        raise _password_busy_error()
+    
+    await run_in_threadpool(db.commit)
+    invalidate_user(user.username)
     
     return {"message": "Password changed successfully"}
 
 @router.post("/reset-password/{user_id}")
-def reset_user_password(
+async def reset_user_password(
     user_id: int,
     data: ResetPassword,
-    current_user: User = Depends(require_role(["admin"])),
+    current_user: CurrentUser = Depends(require_role(["admin"])),
     db: Session = Depends(get_db)
 ):
     """Reset le mot de passe d'un utilisateur (ADMIN only)."""
     # Trouver l'utilisateur
-    target_user = db.query(User).filter(User.id == user_id).first()
+    target_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.id == user_id).first()
+    )
     
     if not target_user:
         raise HTTPException(
@@ -189,7 +272,33 @@ def reset_user_password(
         )
     
     # Changer le mot de passe
-    target_user.password_hash = get_password_hash(data.new_password)
-    db.commit()
+    try:
+        target_user.password_hash = await get_password_hash_async(data.new_password)
+    except PasswordHashBusy:
+        raise _password_busy_error()
+    
+    await run_in_threadpool(db.commit)
+    invalidate_user(target_user.username)
     
-    return {"message": f"Password reset successfully for user {target_user.username}"}
\ No newline at end of file
+    return {"message": f"Password reset successfully for user {target_user.username}"}
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+async def _verify_password_or_503(plain_password: str, hashed_password: str) -> bool:
+    """Vérifie un mot de passe dans le pool dédié, 503 si saturé."""
+    try:
+        return await verify_password_async(plain_password, hashed_password)
+    except PasswordHashBusy:
+        raise _password_busy_error()
+
+
+def _password_busy_error() -> HTTPException:
+    """Erreur renvoyée quand le pool de hachage est saturé."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service busy, try again shortly",
+        headers={"Retry-After": "1"}
+    )
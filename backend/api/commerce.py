@@ -2,12 +2,13 @@
 # API: Commerce Module - Cargo Runs Endpoints
 # ============================================================
 
-from fastapi import APIRouter, HTTPException, Depends
+import base64
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import insert, text, tuple_
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
 
 from database import get_db
 from models.models import CargoRun
@@ -30,6 +31,10 @@ class CargoRunCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class CargoRunBatchCreate(BaseModel):
+    runs: List[CargoRunCreate] = Field(..., min_length=1, max_length=500)
+
+
 class CargoRunResponse(BaseModel):
     id: int
     commodity_name: str
@@ -46,7 +51,7 @@ class CargoRunResponse(BaseModel):
     notes: Optional[str]
 
 
-class CommerceStats(BaseModel):
+class CommerceAggregate(BaseModel):
     total_runs: int
     active_runs: int
     delivered_runs: int
@@ -55,6 +60,74 @@ class CommerceStats(BaseModel):
     roi_percentage: float
 
 
+class CommodityStats(CommerceAggregate):
+    commodity_name: str
+
+
+class RouteStats(CommerceAggregate):
+    buy_location: str
+    sell_location: str
+
+
+class PeriodStats(CommerceAggregate):
+    period: datetime
+
+
+class CommerceStats(CommerceAggregate):
+    by_commodity: List[CommodityStats] = []
+    by_route: List[RouteStats] = []
+    roi_by_period: List[PeriodStats] = []
+
+
+# Périodes acceptées pour le ROI dans le temps (date_trunc)
+STATS_BUCKETS = ("day", "week", "month")
+
+
+# Taille de page maximale de /runs
+MAX_RUNS_PAGE_SIZE = 500
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+
+def _cargo_run_values(cargo_run: CargoRunCreate) -> dict:
+    """Colonnes d'un nouveau cargo run, avec les calculs automatiques."""
+    return {
+        "commodity_name": cargo_run.commodity_name,
+        "buy_location": cargo_run.buy_location,
+        "sell_location": cargo_run.sell_location,
+        "quantity": cargo_run.quantity,
+        "buy_price": cargo_run.buy_price,
+        "sell_price": cargo_run.sell_price,
+        "total_investment": cargo_run.quantity * cargo_run.buy_price,
+        "expected_profit": (cargo_run.sell_price - cargo_run.buy_price) * cargo_run.quantity,
+        "status": "active",
+        "notes": cargo_run.notes,
+    }
+
+
+def _encode_runs_cursor(created_at: datetime, run_id: int) -> str:
+    """Position (created_at, id) du dernier run d'une page, en curseur opaque."""
+    raw = f"{created_at.isoformat()}|{run_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_runs_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Décode un curseur produit par _encode_runs_cursor.
+    
+    Raises:
+        HTTPException: Curseur invalide (400)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, run_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(run_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 # ============================================================
 # ENDPOINTS
 # ============================================================
@@ -64,22 +137,7 @@ def create_cargo_run(cargo_run: CargoRunCreate, db: Session = Depends(get_db)):
     """
     Créer un nouveau cargo run
     """
-    # Calculs automatiques
-    total_investment = cargo_run.quantity * cargo_run.buy_price
-    expected_profit = (cargo_run.sell_price - cargo_run.buy_price) * cargo_run.quantity
-    
-    new_run = CargoRun(
-        commodity_name=cargo_run.commodity_name,
-        buy_location=cargo_run.buy_location,
-        sell_location=cargo_run.sell_location,
-        quantity=cargo_run.quantity,
-        buy_price=cargo_run.buy_price,
-        sell_price=cargo_run.sell_price,
-        total_investment=total_investment,
-        expected_profit=expected_profit,
-        status="active",
-        notes=cargo_run.notes
-    )
+    new_run = CargoRun(**_cargo_run_values(cargo_run))
     
     db.add(new_run)
     db.commit()
@@ -88,21 +146,60 @@ def create_cargo_run(cargo_run: CargoRunCreate, db: Session = Depends(get_db)):
     return new_run.to_dict()
 
 
+@router.post("/runs/batch", response_model=List[CargoRunResponse])
+def create_cargo_runs_batch(batch: CargoRunBatchCreate, db: Session = Depends(get_db)):
+    """
+    Créer plusieurs cargo runs (session de trading complète)
+    
+    Un seul INSERT multi-lignes et un seul commit : tout ou rien.
+    """
+    runs = db.scalars(
+        insert(CargoRun).returning(CargoRun, sort_by_parameter_order=True),
+        [_cargo_run_values(run) for run in batch.runs],
+    ).all()
+    
+    # Sérialiser avant le commit, qui expire les objets (sinon 1 SELECT par run)
+    created = [run.to_dict() for run in runs]
+    db.commit()
+    
+    return created
+
+
 @router.get("/runs", response_model=List[CargoRunResponse])
 def get_cargo_runs(
+    response: Response,
     status: Optional[str] = None,
-    limit: int = 100,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=MAX_RUNS_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor de la page précédente"),
     db: Session = Depends(get_db)
 ):
     """
-    Récupérer la liste des cargo runs
+    Récupérer la liste des cargo runs (plus récents d'abord)
+    
+    Pagination par curseur : quand une page suivante existe, son curseur
+    est renvoyé dans l'en-tête X-Next-Cursor.
     """
     query = db.query(CargoRun)
     
     if status:
         query = query.filter(CargoRun.status == status)
+    if created_after:
+        query = query.filter(CargoRun.created_at >= created_after)
+    if created_before:
+        query = query.filter(CargoRun.created_at < created_before)
     
-    runs = query.order_by(CargoRun.created_at.desc()).limit(limit).all()
+    if cursor:
+        cursor_created_at, cursor_id = _decode_runs_cursor(cursor)
+        query = query.filter(tuple_(CargoRun.created_at, CargoRun.id) < (cursor_created_at, cursor_id))
+    
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    runs = query.order_by(CargoRun.created_at.desc(), CargoRun.id.desc()).limit(limit + 1).all()
+    
+    if len(runs) > limit:
+        runs = runs[:limit]
+        response.headers["X-Next-Cursor"] = _encode_runs_cursor(runs[-1].created_at, runs[-1].id)
     
     return [run.to_dict() for run in runs]
 
@@ -180,32 +277,106 @@ def delete_cargo_run(run_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/stats", response_model=CommerceStats)
-def get_commerce_stats(db: Session = Depends(get_db)):
+def get_commerce_stats(
+    bucket: str = Query("week", description="Période du ROI: day, week ou month"),
+    periods: int = Query(12, ge=1, le=366, description="Nombre de périodes récentes"),
+    breakdown_limit: int = Query(10, ge=1, le=100, description="Top commodités / routes"),
+    db: Session = Depends(get_db)
+):
     """
     Récupérer les statistiques du commerce
+    
+    Un seul parcours de cargo_runs (GROUPING SETS) donne les totaux, le
+    détail par commodité, par route et le ROI par période. Profit,
+    investissement et ROI ne portent que sur les runs livrés.
     """
-    total_runs = db.query(func.count(CargoRun.id)).scalar() or 0
-    active_runs = db.query(func.count(CargoRun.id)).filter(CargoRun.status == "active").scalar() or 0
-    delivered_runs = db.query(func.count(CargoRun.id)).filter(CargoRun.status == "delivered").scalar() or 0
+    if bucket not in STATS_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid bucket '{bucket}' (expected one of {', '.join(STATS_BUCKETS)})"
+        )
+    
+    # bucket vient de STATS_BUCKETS : interpolation sûre
+    period_expr = f"date_trunc('{bucket}', delivered_at)"
+    rows = db.execute(
+        text(f"""
+            SELECT
+                GROUPING(commodity_name) = 0 AS is_commodity,
+                GROUPING(buy_location, sell_location) = 0 AS is_route,
+                GROUPING({period_expr}) = 0 AS is_period,
+                commodity_name,
+                buy_location,
+                sell_location,
+                {period_expr} AS period,
+                COUNT(*) AS total_runs,
+                COUNT(*) FILTER (WHERE status = 'active') AS active_runs,
+                COUNT(*) FILTER (WHERE status = 'delivered') AS delivered_runs,
+                COALESCE(SUM(expected_profit) FILTER (WHERE status = 'delivered'), 0) AS total_profit,
+                COALESCE(SUM(total_investment) FILTER (WHERE status = 'delivered'), 0) AS total_investment
+            FROM cargo_runs
+            GROUP BY GROUPING SETS (
+                (),
+                (commodity_name),
+                (buy_location, sell_location),
+                ({period_expr})
+            )
+        """)
+    ).mappings().all()
     
-    # Profit total des runs livrés
-    delivered_profit = db.query(func.sum(CargoRun.expected_profit)).filter(
-        CargoRun.status == "delivered"
-    ).scalar() or 0
+    totals = _empty_aggregate()
+    by_commodity, by_route, roi_by_period = [], [], []
     
-    # Investment total des runs livrés
-    delivered_investment = db.query(func.sum(CargoRun.total_investment)).filter(
-        CargoRun.status == "delivered"
-    ).scalar() or 0
+    for row in rows:
+        aggregate = _aggregate_from_row(row)
+        if row["is_commodity"]:
+            by_commodity.append({"commodity_name": row["commodity_name"], **aggregate})
+        elif row["is_route"]:
+            by_route.append({
+                "buy_location": row["buy_location"],
+                "sell_location": row["sell_location"],
+                **aggregate,
+            })
+        elif row["is_period"]:
+            # Runs non livrés : pas de période
+            if row["period"] is not None:
+                roi_by_period.append({"period": row["period"], **aggregate})
+        else:
+            totals = aggregate
     
-    # ROI
-    roi_percentage = (delivered_profit / delivered_investment * 100) if delivered_investment > 0 else 0
+    by_commodity.sort(key=lambda s: s["total_profit"], reverse=True)
+    by_route.sort(key=lambda s: s["total_profit"], reverse=True)
+    roi_by_period.sort(key=lambda s: s["period"])
     
     return {
-        "total_runs": total_runs,
-        "active_runs": active_runs,
-        "delivered_runs": delivered_runs,
-        "total_profit": delivered_profit,
-        "total_investment": delivered_investment,
-        "roi_percentage": roi_percentage
-    }
\ No newline at end of file
+        **totals,
+        "by_commodity": by_commodity[:breakdown_limit],
+        "by_route": by_route[:breakdown_limit],
+        "roi_by_period": roi_by_period[-periods:],
+    }
+
+
+def _aggregate_from_row(row) -> dict:
+    """Compteurs, profit, investissement et ROI d'une ligne agrégée."""
+    profit = float(row["total_profit"])
+    investment = float(row["total_investment"])
+    
+    return {
+        "total_runs": row["total_runs"],
+        "active_runs": row["active_runs"],
+        "delivered_runs": row["delivered_runs"],
+        "total_profit": profit,
+        "total_investment": investment,
+        "roi_percentage": (profit / investment * 100) if investment > 0 else 0,
+    }
+
+
+def _empty_aggregate() -> dict:
+    """Agrégat d'une table vide."""
+    return {
+        "total_runs": 0,
+        "active_runs": 0,
+        "delivered_runs": 0,
+        "total_profit": 0.0,
+        "total_investment": 0.0,
+        "roi_percentage": 0,
+    }
@@ -2,88 +2,54 @@
 Dashboard API endpoint - Global stats for all users.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy import func, desc, text
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models.refining_job import RefiningJob
-from models.inventory import Inventory
+from services import dashboard_service
 
 router = APIRouter()
 
 
 @router.get("/stats", response_model=Dict[str, Any])
-def get_dashboard_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
+def get_dashboard_stats(
+    valuation: str = Query(
+        dashboard_service.DEFAULT_STOCK_VALUATION,
+        description="Stock valuation: average, latest_uex or best_sell"
+    ),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
     """
     Retrieve GLOBAL dashboard statistics (all users combined).
     No user filtering - shows organization-wide data.
-    """
-    
-    # Total stock from Inventory table (all users)
-    stock_total = db.query(func.coalesce(func.sum(Inventory.quantity), 0)).scalar()
-    
-    # Calculate estimated value
-    estimated_stock_value = _calculate_stock_value(db)
-    
-    # Active refining jobs (all users, processing status)
-    active_refining = (
-        db.query(RefiningJob)
-        .filter(RefiningJob.status == "processing")
-        .count()
-    )
-    
-    # Recent collected jobs (all users, last 7 days)
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    refining_history = (
-        db.query(RefiningJob)
-        .filter(RefiningJob.status == "collected")
-        .filter(RefiningJob.collected_at >= seven_days_ago)
-        .order_by(RefiningJob.collected_at.desc())
-        .limit(5)
-        .all()
-    )
-    
-    formatted_history = [
-        {
-            "id": job.id,
-            "material": ", ".join([m.material.name for m in job.materials]) if job.materials else "Unknown",
-            "quantity": sum([m.quantity_refined for m in job.materials]) if job.materials else 0,
-            "ended_at": job.collected_at or job.end_time,
-        }
-        for job in refining_history
-    ]
     
-    return {
-        "stock_total": float(stock_total),
-        "estimated_stock_value": float(estimated_stock_value),
-        "active_refining": active_refining,
-        "refining_history": formatted_history,
-    }
-
-
-def _calculate_stock_value(db: Session) -> float:
+    Same payload as the "dashboard" WebSocket topic; estimated_stock_value
+    uses the requested valuation mode, stock_valuations lists them all.
     """
-    Calculate total stock value using market prices.
-    Uses average sell price from market_prices table.
+    try:
+        return dashboard_service.get_dashboard_stats(db, valuation=valuation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/activity", response_model=Dict[str, Any])
+def get_activity_feed(
+    limit: int = Query(
+        dashboard_service.ACTIVITY_PAGE_SIZE,
+        ge=1,
+        le=dashboard_service.ACTIVITY_MAX_PAGE_SIZE,
+        description="Page size"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
     """
-    
-    # Get all inventory with estimated prices
-    result = db.execute(
-        text("""
-            SELECT 
-                i.quantity,
-                COALESCE(AVG(mp.sell_price), 0) as avg_price
-            FROM inventory i
-            LEFT JOIN market_prices mp ON i.material_id = mp.material_id
-            WHERE i.quantity > 0
-            GROUP BY i.id, i.quantity
-        """)
-    ).fetchall()
-    
-    total_value = sum(row[0] * row[1] for row in result)
-    
-    return total_value
\ No newline at end of file
+    Retrieve the organization activity timeline (collected refining jobs
+    and sales), newest first, with cursor pagination.
+    """
+    try:
+        return dashboard_service.get_activity_feed(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
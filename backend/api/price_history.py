@@ -15,6 +15,7 @@ from database import get_db
 from models.material import Material
 from models.location import Location
 from models.price_history import PriceHistory
+from services.price_snapshot_service import create_price_snapshot as capture_price_snapshot
 
 from pydantic import BaseModel
 
@@ -342,31 +343,10 @@ def create_price_snapshot(db: Session = Depends(get_db)):
     
     Copie les prix depuis market_prices vers price_history.
     """
-    from models.market_price import MarketPrice
-    
     now = datetime.utcnow()
-    snapshots_created = 0
     
     try:
-        # Récupérer tous les prix actuels
-        current_prices = db.query(MarketPrice).filter(
-            MarketPrice.sell_price.isnot(None)
-        ).all()
-        
-        for price in current_prices:
-            # Créer une entrée dans l'historique
-            snapshot = PriceHistory(
-                material_id=price.material_id,
-                location_id=price.location_id,
-                buy_price=price.buy_price,
-                sell_price=price.sell_price,
-                recorded_at=now,
-                source=price.source or "SNAPSHOT"
-            )
-            db.add(snapshot)
-            snapshots_created += 1
-        
-        db.commit()
+        snapshots_created = capture_price_snapshot(db, recorded_at=now)
         
         return {
             "status": "success",
@@ -375,5 +355,4 @@ def create_price_snapshot(db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Snapshot failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Snapshot failed: {str(e)}")
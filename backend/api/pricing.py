@@ -3,14 +3,15 @@ Pricing API endpoint for Star Citizen App.
 Handles price updates and refresh operations for all materials.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from database import get_db
+from services.price_scheduler import JOB_PRICE_REFRESH, price_scheduler
+from services.pricing_service import get_latest_sell_prices, revalidate_prices_if_needed
 from services.uex.uex_service import (
-    refresh_all_prices,
     refresh_single_material,
     get_material_price_history,
 )
@@ -18,37 +19,80 @@ from services.uex.uex_service import (
 router = APIRouter(prefix="/pricing", tags=["Pricing"])
 
 
-@router.post("/refresh/all")
-def refresh_all_materials(
-    force: bool = False,
-    background_tasks: BackgroundTasks = None,
+@router.get("/latest")
+def get_latest_prices(
+    material_ids: List[int] = Query(..., description="IDs des matériaux"),
+    source: Optional[str] = None,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
-    Rafraîchit les prix de TOUS les matériaux depuis UEX.
+    Récupère les derniers prix de vente de plusieurs matériaux.
     
-    Cette opération peut prendre du temps (plusieurs secondes).
-    Utilise background_tasks pour ne pas bloquer si nécessaire.
+    Stale-while-revalidate : les derniers prix connus sont renvoyés
+    immédiatement avec leur âge. Si le cache est périmé, un seul refresh
+    est lancé en arrière-plan ; après expiration dure, la requête l'attend
+    quelques secondes au plus avant de servir les derniers prix connus.
     
     Args:
-        force: Si True, force le refresh même si le cache est valide
-        background_tasks: FastAPI background tasks
+        material_ids: IDs des matériaux
+        source: Filtrer sur une source (ex: "UEX")
         db: Session de base de données
         
     Returns:
-        Statistiques du refresh (updated, skipped, errors)
+        Prix par matériau, âge du cache (secondes) et état de revalidation
     """
-    try:
-        stats = refresh_all_prices(db, force=force)
-        return {
-            "status": "success",
-            "stats": stats
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to refresh prices: {str(e)}"
-        )
+    freshness = revalidate_prices_if_needed(db)
+    prices = get_latest_sell_prices(material_ids, db, source=source)
+    
+    return {
+        "prices": prices,
+        "age": freshness["age"],
+        "state": freshness["state"],
+        "revalidating": freshness["revalidating"],
+    }
+
+
+@router.post("/refresh/all", status_code=202)
+async def refresh_all_materials(force: bool = False) -> Dict[str, Any]:
+    """
+    Déclenche le rafraîchissement des prix de TOUS les matériaux depuis UEX.
+    
+    Ne bloque pas : le refresh est exécuté en arrière-plan par le
+    scheduler (single-flight). Si un refresh est déjà en cours, son
+    job est renvoyé.
+    
+    Args:
+        force: Si True, force le refresh même si le cache est valide
+        
+    Returns:
+        Identifiant du job et URL de suivi
+    """
+    job = price_scheduler.trigger(JOB_PRICE_REFRESH, force=force)
+    
+    return {
+        "status": "accepted",
+        "job_id": job["id"],
+        "job_status": job["status"],
+        "status_url": f"/pricing/refresh/jobs/{job['id']}",
+    }
+
+
+@router.get("/refresh/jobs/{job_id}")
+def get_refresh_job(job_id: str) -> Dict[str, Any]:
+    """
+    Récupère le statut d'un job de refresh.
+    
+    Args:
+        job_id: Identifiant renvoyé par POST /pricing/refresh/all
+        
+    Returns:
+        Statut du job (queued, running, success, skipped, failed) et statistiques
+    """
+    job = price_scheduler.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
 
 
 @router.post("/refresh/{material_id}")
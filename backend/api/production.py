@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime, timedelta
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from database import get_db
 from models.refinery import Refinery
@@ -16,7 +16,12 @@ from models.sale import Sale
 from models.material import Material
 from sqlalchemy import text
 from api.auth import get_current_user
-from models.user import User
+from schemas.auth import CurrentUser
+from services.counter_service import COUNTER_ACTIVE_REFINING, COUNTER_STOCK_TOTAL, adjust_counter
+from services.dashboard_service import invalidate_dashboard, notify_job_update
+from services.refinery_optimizer import OBJECTIVE_VALUE, optimize_refining
+from services.refining_service import record_ore_consumption, record_refined_output, release_ore_consumption
+from services.stock_service import EVENT_SELL, record_stock_event
 
 router = APIRouter(prefix="/production", tags=["production"])
 
@@ -35,6 +40,41 @@ class RefinerySchema(BaseModel):
     is_active: bool
 
 
+class OreLoadItem(BaseModel):
+    material_id: int
+    quantity: float  # SCU de minerai
+
+
+class RefineryOptimizeRequest(BaseModel):
+    materials: List[OreLoadItem]
+    objective: str = OBJECTIVE_VALUE  # 'value' ou 'value_per_hour'
+    system: Optional[str] = None
+    limit: int = Field(5, ge=1, le=50)
+
+
+class RefineryOptionSchema(BaseModel):
+    refinery_id: int
+    refinery_name: str
+    refinery_system: str
+    method_id: int
+    method_name: str
+    refined_scu: float
+    gross_value: float
+    refining_cost: float
+    net_value: float
+    duration_hours: float
+    value_per_hour: float
+
+
+class RefineryOptimizeResponse(BaseModel):
+    objective: str
+    total_scu: float
+    best: Optional[RefineryOptionSchema]
+    options: List[RefineryOptionSchema]
+    unknown_material_ids: List[int]
+    unpriced_material_ids: List[int]
+
+
 class JobMaterialCreate(BaseModel):
     material_id: int
     quantity_refined: float
@@ -50,12 +90,18 @@ class JobMaterialSchema(BaseModel):
     unit: str
 
 
+class JobOreInput(BaseModel):
+    material_id: int
+    quantity: float = Field(..., gt=0)  # SCU de minerai brut
+
+
 class RefiningJobCreate(BaseModel):
     refinery_id: int
     job_type: str = "mining"  # 'mining' ou 'salvage'
     total_cost: float
     processing_time: int  # En minutes
     materials: List[JobMaterialCreate]
+    ores: List[JobOreInput] = []  # Minerai engagé, consommé du stock
     notes: Optional[str] = None
 
 
@@ -147,6 +193,30 @@ def get_refineries(
     return query.order_by(Refinery.system, Refinery.name).all()
 
 
+@router.post("/refineries/optimize", response_model=RefineryOptimizeResponse)
+def optimize_refinery(request: RefineryOptimizeRequest, db: Session = Depends(get_db)):
+    """
+    Classe les combinaisons raffinerie x méthode pour un chargement de minerai.
+    
+    Utilise les bonus des raffineries, les méthodes de raffinage et les
+    derniers prix de vente (voir services/refinery_optimizer.py).
+    """
+    load: dict = {}
+    for item in request.materials:
+        load[item.material_id] = load.get(item.material_id, 0) + item.quantity
+    
+    try:
+        return optimize_refining(
+            db,
+            load,
+            objective=request.objective,
+            limit=request.limit,
+            system=request.system,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ============================================================
 # ENDPOINTS: Refining Jobs
 # ============================================================
@@ -154,7 +224,7 @@ def get_refineries(
 @router.post("/jobs", response_model=RefiningJobSchema)
 def create_refining_job(
     job: RefiningJobCreate, 
-    current_user: User = Depends(get_current_user),  # ✅ AJOUTER
+    current_user: CurrentUser = Depends(get_current_user),  # ✅ AJOUTER
     db: Session = Depends(get_db)
 ):
     """Crée un nouveau job de raffinerie."""
@@ -189,9 +259,16 @@ def create_refining_job(
         )
         db.add(job_material)
     
+    # Consommer le minerai engagé (registre de stock)
+    record_ore_consumption(db, new_job.id, [(ore.material_id, ore.quantity) for ore in job.ores])
+    
+    adjust_counter(db, COUNTER_ACTIVE_REFINING, 1)
     db.commit()
     db.refresh(new_job)
     
+    notify_job_update(new_job)
+    invalidate_dashboard()
+    
     # Retourner avec relations chargées
     return _build_job_schema(new_job, db)
 
@@ -201,7 +278,7 @@ def get_refining_jobs(
     status: Optional[str] = Query(None, description="Filter by status"),
     refinery_id: Optional[int] = None,
     job_type: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Liste les jobs de raffinerie."""
@@ -226,13 +303,15 @@ def get_refining_jobs(
     # Mettre à jour le status des jobs prêts
     for job in jobs:
         if job.check_and_update_status():
+            adjust_counter(db, COUNTER_ACTIVE_REFINING, -1)
             db.commit()
+            invalidate_dashboard()
     
     return [_build_job_schema(job, db) for job in jobs]
 
 
 @router.get("/jobs/{job_id}", response_model=RefiningJobSchema)
-def get_refining_job(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_refining_job(job_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Récupère un job spécifique."""
     job = db.query(RefiningJob).filter(RefiningJob.id == job_id, RefiningJob.user_id == current_user.id).first()
     if not job:
@@ -240,13 +319,15 @@ def get_refining_job(job_id: int, current_user: User = Depends(get_current_user)
     
     # Mettre à jour le status si nécessaire
     if job.check_and_update_status():
+        adjust_counter(db, COUNTER_ACTIVE_REFINING, -1)
         db.commit()
+        invalidate_dashboard()
     
     return _build_job_schema(job, db)
 
 
 @router.post("/jobs/{job_id}/collect")
-def collect_refining_job(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def collect_refining_job(job_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Récupère un job terminé et transfère au stock."""
     from decimal import Decimal
     
@@ -258,6 +339,7 @@ def collect_refining_job(job_id: int, current_user: User = Depends(get_current_u
         raise HTTPException(status_code=400, detail="Job déjà collecté ou annulé")
     
     # Transférer les matériaux vers l'inventaire
+    total_scu = Decimal('0')
     for job_mat in job.materials:
         # Chercher ou créer l'entrée d'inventaire
         inventory = db.query(Inventory).filter(
@@ -268,6 +350,7 @@ def collect_refining_job(job_id: int, current_user: User = Depends(get_current_u
         
         # Convertir quantité brute en SCU (÷ 100)
         quantity_scu = Decimal(str(job_mat.quantity_refined)) / Decimal('100')
+        total_scu += quantity_scu
         
         if inventory:
             inventory.add_quantity(quantity_scu)
@@ -280,12 +363,23 @@ def collect_refining_job(job_id: int, current_user: User = Depends(get_current_u
             )
             db.add(inventory)
     
+    # Entrée des matériaux raffinés dans le registre de stock
+    record_refined_output(db, job)
+    
+    # Mettre à jour les compteurs du dashboard (même transaction)
+    adjust_counter(db, COUNTER_STOCK_TOTAL, total_scu)
+    if job.status == "processing":
+        adjust_counter(db, COUNTER_ACTIVE_REFINING, -1)
+    
     # Marquer le job comme collecté
     job.status = "collected"
     job.collected_at = datetime.utcnow()
     
     db.commit()
     
+    notify_job_update(job)
+    invalidate_dashboard()
+    
     return {"message": "Job collecté avec succès", "job_id": job_id}
     # Convertir quantité brute en SCU (÷ 100)
     from decimal import Decimal  # ← AJOUTER EN HAUT DU FICHIER (ligne ~10)
@@ -314,7 +408,7 @@ def collect_refining_job(job_id: int, current_user: User = Depends(get_current_u
 
 
 @router.delete("/jobs/{job_id}")
-def cancel_refining_job(job_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def cancel_refining_job(job_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Annule un job de raffinerie."""
     job = db.query(RefiningJob).filter(RefiningJob.id == job_id, RefiningJob.user_id == current_user.id).first()
     if not job:
@@ -322,10 +416,21 @@ def cancel_refining_job(job_id: int, current_user: User = Depends(get_current_us
     
     if job.status == "collected":
         raise HTTPException(status_code=400, detail="Job déjà collecté")
+    if job.status == "cancelled":
+        raise HTTPException(status_code=400, detail="Job déjà annulé")
+    
+    if job.status == "processing":
+        adjust_counter(db, COUNTER_ACTIVE_REFINING, -1)
+    
+    # Rendre le minerai consommé au lancement
+    release_ore_consumption(db, job.id)
     
     job.status = "cancelled"
     db.commit()
     
+    notify_job_update(job)
+    invalidate_dashboard()
+    
     return {"message": "Job annulé", "job_id": job_id}
 
 
@@ -338,7 +443,7 @@ def get_inventory(
     refinery_id: Optional[int] = None,
     material_id: Optional[int] = None,
     min_quantity: float = 0,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Liste l'inventaire."""
@@ -362,7 +467,7 @@ def get_inventory(
 # ============================================================
 
 @router.post("/sales", response_model=SaleSchema)
-def create_sale(sale: SaleCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_sale(sale: SaleCreate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Enregistre une vente."""
     
     # Vérifier l'inventaire
@@ -392,13 +497,34 @@ def create_sale(sale: SaleCreate, current_user: User = Depends(get_current_user)
     )
     
     db.add(new_sale)
+    db.flush()  # Pour obtenir l'ID
     
-    # Retirer du stock
+    # Retirer du stock (l'inventaire par raffinerie a été vérifié ci-dessus ;
+    # le registre global ne contient pas l'inventaire antérieur au registre)
     inventory.remove_quantity(sale.quantity_sold)
+    try:
+        record_stock_event(
+            db,
+            material_id=sale.material_id,
+            quantity=sale.quantity_sold,
+            event_type=EVENT_SELL,
+            unit_price=sale.unit_price,
+            total_value=total_revenue,
+            reference_type="SALE",
+            reference_id=new_sale.id,
+            allow_negative=True,
+        )
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    adjust_counter(db, COUNTER_STOCK_TOTAL, -sale.quantity_sold)
     
     db.commit()
     db.refresh(new_sale)
     
+    invalidate_dashboard()
+    
     return _build_sale_schema(new_sale, db)
 
 
@@ -408,7 +534,7 @@ def get_sales(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Liste les ventes."""
@@ -434,7 +560,7 @@ def get_sales(
 def get_sales_stats(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Statistiques globales des ventes."""
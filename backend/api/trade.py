@@ -10,9 +10,14 @@ from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models.stock import Stock
-from models.stock_event import StockEvent
-from services.pricing_service import get_latest_sell_price
+from services.pricing_service import get_latest_sell_prices
+from services.stock_service import (
+    EVENT_BUY,
+    EVENT_SELL,
+    InsufficientStock,
+    get_stock_by_material,
+    record_stock_event,
+)
 from services.trade_service import create_trade_run
 
 router = APIRouter()
@@ -71,7 +76,7 @@ def buy_material(
     Purchase material and add to stock.
     
     Uses the latest available sell price to calculate total cost
-    and creates a stock event for tracking.
+    and records a BUY event in the stock ledger.
     
     Args:
         material_id: ID of the material to purchase
@@ -85,20 +90,12 @@ def buy_material(
         HTTPException: If price is unavailable
     """
     # Get current price
-    price = get_latest_sell_price(material_id, db)
-    if price is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Price unavailable for this material"
-        )
+    price = _get_unit_price(db, material_id)
     
     total_cost = price * quantity
     
-    # Update stock
-    _update_stock_for_purchase(db, material_id, quantity)
-    
-    # Create stock event
-    _create_purchase_event(db, material_id, quantity, total_cost)
+    # Record the purchase in the stock ledger (cost stored as negative value)
+    _record_trade_event(db, material_id, quantity, EVENT_BUY, price, -total_cost)
     
     db.commit()
     
@@ -107,6 +104,7 @@ def buy_material(
         "quantity": quantity,
         "unit_price": price,
         "total_cost": total_cost,
+        "stock": get_stock_by_material(material_id, db),
     }
 
 
@@ -119,8 +117,8 @@ def sell_material(
     """
     Sell material from stock.
     
-    Validates sufficient stock exists, uses latest sell price,
-    and creates a stock event for tracking.
+    Validates sufficient stock exists (under a per-material lock),
+    uses latest sell price, and records a SELL event in the stock ledger.
     
     Args:
         material_id: ID of the material to sell
@@ -133,29 +131,13 @@ def sell_material(
     Raises:
         HTTPException: If insufficient stock or price unavailable
     """
-    # Validate stock availability
-    stock = db.query(Stock).filter_by(material_id=material_id).first()
-    if not stock or stock.quantity < quantity:
-        raise HTTPException(
-            status_code=400,
-            detail="Insufficient stock for this sale"
-        )
-    
     # Get current price
-    price = get_latest_sell_price(material_id, db)
-    if price is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Price unavailable for this material"
-        )
+    price = _get_unit_price(db, material_id)
     
     total_gain = price * quantity
     
-    # Update stock
-    stock.quantity -= quantity
-    
-    # Create stock event
-    _create_sale_event(db, material_id, quantity, total_gain)
+    # Record the sale in the stock ledger (checks stock availability)
+    _record_trade_event(db, material_id, quantity, EVENT_SELL, price, total_gain)
     
     db.commit()
     
@@ -164,6 +146,7 @@ def sell_material(
         "quantity": quantity,
         "unit_price": price,
         "total_gain": total_gain,
+        "stock": get_stock_by_material(material_id, db),
     }
 
 
@@ -171,72 +154,68 @@ def sell_material(
 # HELPER FUNCTIONS
 # ============================================================================
 
-def _update_stock_for_purchase(
-    db: Session,
-    material_id: int,
-    quantity: int
-) -> None:
+def _get_unit_price(db: Session, material_id: int) -> float:
     """
-    Update stock for a purchase, creating stock record if needed.
+    Get the current unit price for a material through the batch price cache.
     
     Args:
         db: Database session
-        material_id: Material being purchased
-        quantity: Quantity being added
+        material_id: Material being traded
+        
+    Returns:
+        Latest sell price for the material
+        
+    Raises:
+        HTTPException: If no price is available
     """
-    stock = db.query(Stock).filter_by(material_id=material_id).first()
+    price = get_latest_sell_prices([material_id], db).get(material_id)
+    if price is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Price unavailable for this material"
+        )
     
-    if stock:
-        stock.quantity += quantity
-    else:
-        db.add(Stock(material_id=material_id, quantity=quantity))
+    return price
 
 
-def _create_purchase_event(
+def _record_trade_event(
     db: Session,
     material_id: int,
     quantity: int,
-    total_cost: float
+    event_type: str,
+    unit_price: float,
+    total_value: float
 ) -> None:
     """
-    Create a stock event for a purchase.
+    Record a purchase or sale in the stock ledger.
     
     Args:
         db: Database session
-        material_id: Material being purchased
-        quantity: Quantity purchased
-        total_cost: Total cost (stored as negative value)
-    """
-    db.add(
-        StockEvent(
-            material_id=material_id,
-            quantity=quantity,
-            total_value=-total_cost,
-            event_type="BUY",
-        )
-    )
-
-
-def _create_sale_event(
-    db: Session,
-    material_id: int,
-    quantity: int,
-    total_gain: float
-) -> None:
-    """
-    Create a stock event for a sale.
+        material_id: Material being traded
+        quantity: Quantity traded
+        event_type: EVENT_BUY or EVENT_SELL
+        unit_price: Unit price used
+        total_value: Financial value (negative for a purchase)
     
-    Args:
-        db: Database session
-        material_id: Material being sold
-        quantity: Quantity sold
-        total_gain: Total revenue from sale
+    Raises:
+        HTTPException: If the quantity is invalid or stock is insufficient
     """
-    db.add(
-        StockEvent(
+    try:
+        record_stock_event(
+            db,
             material_id=material_id,
             quantity=quantity,
-            total_value=total_gain,
-            event_type="SELL",
+            event_type=event_type,
+            unit_price=unit_price,
+            total_value=total_value,
+            reference_type="TRADE",
+        )
+    except InsufficientStock:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Insufficient stock for this sale"
         )
-    )
\ No newline at end of file
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
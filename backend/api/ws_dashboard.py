@@ -3,35 +3,90 @@ WebSocket API endpoint for Star Citizen App.
 Provides real-time dashboard updates via WebSocket connection.
 """
 
+import asyncio
+from typing import Optional
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from services.ws_manager import ws_manager
+from core.security import decode_access_token
+from database import SessionLocal
+from services.dashboard_service import get_dashboard_stats
+from services.user_cache import get_user_by_subject
+from services.ws_manager import TOPIC_DASHBOARD, ws_manager
 
 router = APIRouter()
 
 
 @router.websocket("/ws/dashboard")
-async def dashboard_ws(websocket: WebSocket) -> None:
+async def dashboard_ws(websocket: WebSocket, token: Optional[str] = None) -> None:
     """
     WebSocket endpoint for real-time dashboard updates.
     
+    Clients are subscribed to the "dashboard" topic on connect and can
+    subscribe to more topics ("jobs:{user_id}", "prices:{material_id}")
+    by sending {"action": "subscribe", "topic": "..."}. Per-user topics
+    require a valid JWT passed as the ``token`` query parameter.
+    
     Maintains a persistent connection with the client and keeps it alive
     by listening for messages. When the connection is closed, it properly
     cleans up the connection from the manager.
     
     Args:
         websocket: WebSocket connection instance
-        
+        token: Optional JWT access token identifying the user
+    
     Note:
-        The connection will remain open until the client disconnects
-        or a network error occurs.
+        The connection will remain open until the client disconnects,
+        a network error occurs, or the manager evicts it for being too slow.
     """
-    await ws_manager.connect(websocket)
+    user_id = await asyncio.to_thread(_resolve_user_id, token) if token else None
+    
+    await ws_manager.connect(websocket, user_id=user_id)
+    
+    # Make sure the cached dashboard state exists (no-op when already cached)
+    await asyncio.to_thread(_load_dashboard_state)
+    await ws_manager.subscribe(websocket, TOPIC_DASHBOARD)
     
     try:
         while True:
-            # Keep connection alive by receiving messages
-            await websocket.receive_text()
+            # Control messages (subscribe / unsubscribe / ping)
+            message = await websocket.receive_text()
+            await ws_manager.handle_message(websocket, message)
+    
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: socket closed by the manager (evicted client)
+        pass
+    
+    finally:
+        ws_manager.disconnect(websocket)
+
+
+def _resolve_user_id(token: str) -> Optional[int]:
+    """
+    Resolve the user id behind a JWT access token.
+    
+    Args:
+        token: JWT access token
+    
+    Returns:
+        ID of the active user, or None if the token is invalid
+    """
+    payload = decode_access_token(token)
+    if not payload or not payload.get("sub") or payload.get("active") is False:
+        return None
     
-    except WebSocketDisconnect:
-        ws_manager.disconnect(websocket)
\ No newline at end of file
+    db = SessionLocal()
+    try:
+        user = get_user_by_subject(db, payload["sub"])
+        return user.id if user and user.is_active else None
+    finally:
+        db.close()
+
+
+def _load_dashboard_state() -> None:
+    """Fill the dashboard cache, publishing it on the "dashboard" topic."""
+    db = SessionLocal()
+    try:
+        get_dashboard_stats(db)
+    finally:
+        db.close()
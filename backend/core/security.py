@@ -2,6 +2,9 @@
 Security utilities for authentication and authorization.
 """
 
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from passlib.context import CryptContext
@@ -14,6 +17,24 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 jours
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Pool dédié au hachage bcrypt (~250 ms par opération) : un pic de logins
+# n'occupe pas le threadpool des routes sync. bcrypt libère le GIL, des
+# threads suffisent.
+PASSWORD_HASH_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Opérations en attente au-delà desquelles on refuse (503) au lieu d'empiler
+PASSWORD_HASH_MAX_PENDING = PASSWORD_HASH_WORKERS * 8
+
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_password_slots: Optional[asyncio.Semaphore] = None
+
+
+class PasswordHashBusy(Exception):
+    """Trop d'opérations de hachage en attente."""
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Vérifie un mot de passe."""
@@ -25,6 +46,40 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Vérifie un mot de passe dans le pool dédié.
+    
+    Raises:
+        PasswordHashBusy: Si trop d'opérations sont déjà en attente
+    """
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash un mot de passe dans le pool dédié.
+    
+    Raises:
+        PasswordHashBusy: Si trop d'opérations sont déjà en attente
+    """
+    return await _run_password_job(get_password_hash, password)
+
+
+async def _run_password_job(func, *args):
+    """Exécute une opération bcrypt dans password_executor, avec une file bornée."""
+    global _password_slots
+    if _password_slots is None:
+        _password_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+    
+    if _password_slots.locked():
+        raise PasswordHashBusy()
+    
+    async with _password_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Créer un JWT token."""
     to_encode = data.copy()
@@ -38,6 +38,12 @@ try:
 except Exception as e:
     print(f"  ⚠️ MarketPrice: {e}")
 
+try:
+    from models.latest_market_price import LatestMarketPrice
+    print("  ✅ LatestMarketPrice")
+except Exception as e:
+    print(f"  ⚠️ LatestMarketPrice: {e}")
+
 try:
     from models.price_history import PriceHistory
     print("  ✅ PriceHistory")
@@ -62,6 +68,12 @@ try:
 except Exception as e:
     print(f"  ⚠️ Inventory: {e}")
 
+try:
+    from models.dashboard_counter import DashboardCounter
+    print("  ✅ DashboardCounter")
+except Exception as e:
+    print(f"  ⚠️ DashboardCounter: {e}")
+
 try:
     from models.sale import Sale
     print("  ✅ Sale")
@@ -92,18 +104,18 @@ try:
 except Exception as e:
     print(f"  ⚠️ Session: {e}")
 
-try:
-    from models.stock import Stock
-    print("  ✅ Stock")
-except Exception as e:
-    print(f"  ⚠️ Stock: {e}")
-
 try:
     from models.stock_event import StockEvent
     print("  ✅ StockEvent")
 except Exception as e:
     print(f"  ⚠️ StockEvent: {e}")
 
+try:
+    from models.stock_balance_snapshot import StockBalanceSnapshot
+    print("  ✅ StockBalanceSnapshot")
+except Exception as e:
+    print(f"  ⚠️ StockBalanceSnapshot: {e}")
+
 try:
     from models.trade_run import TradeRun
     print("  ✅ TradeRun")
@@ -3,14 +3,18 @@ Main FastAPI application for Star Citizen App.
 Configures routes, middleware, and application lifecycle.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from database import SessionLocal
-from services.pricing_service import ensure_quantanium_price
+from services.price_scheduler import price_scheduler
+from services.ws_broadcast import pg_broadcast
+from services.ws_manager import ws_manager
+from services.startup_service import readiness, run_startup_warmup
 
 # Import routers
 from routes import reference
@@ -29,7 +33,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Application lifespan manager.
     
     Handles startup and shutdown events for the application.
-    Initializes Quantanium pricing data on startup.
+    Starts pricing warmup as a background task so the app accepts
+    traffic immediately; readiness is exposed on /ready. Also runs the
+    periodic price refresh/snapshot scheduler and the cross-worker
+    WebSocket broadcast.
     
     Args:
         app: FastAPI application instance
@@ -37,19 +44,21 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Yields:
         None during application runtime
     """
-    # Startup: Initialize pricing data
-    db = SessionLocal()
-    try:
-        ensure_quantanium_price(db)
-        print("✅ Quantanium price initialized")
-    except Exception as e:
-        print(f"⚠️  Quantanium initialization failed: {e}")
-    finally:
-        db.close()
+    # Startup: relay WebSocket events between workers
+    ws_manager.bind_loop(asyncio.get_running_loop())
+    pg_broadcast.start()
+    
+    # Startup: warm pricing data and start periodic refreshes in the background
+    warmup_task = asyncio.create_task(run_startup_warmup())
+    price_scheduler.start()
     
     yield
     
-    # Shutdown: cleanup would go here if needed
+    # Shutdown: stop background work
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await price_scheduler.stop()
+    await asyncio.to_thread(pg_broadcast.stop)
 
 
 # Create FastAPI application
@@ -75,6 +84,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Pagination par curseur (/commerce/runs)
 )
 
 
@@ -126,4 +136,19 @@ def health_check():
     Returns:
         Simple status message confirming API is running
     """
-    return {"status": "ok", "message": "Star Citizen App API is running"}
\ No newline at end of file
+    return {"status": "ok", "message": "Star Citizen App API is running"}
+
+
+@app.get("/ready", tags=["Health"])
+def readiness_check():
+    """
+    Readiness check endpoint.
+    
+    Returns 200 once background warmup has finished (successfully or not),
+    503 while it is still running. Traffic is served in both cases.
+    
+    Returns:
+        Readiness state with warmup timestamps and last error
+    """
+    status_code = 200 if readiness.ready else 503
+    return JSONResponse(status_code=status_code, content=readiness.to_dict())
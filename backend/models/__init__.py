@@ -12,9 +12,11 @@ from models.material import Material
 from models.refinery import Refinery
 from models.location import Location
 from models.market_price import MarketPrice
+from models.latest_market_price import LatestMarketPrice
 from models.price_history import PriceHistory
 from models.refining_job import RefiningJob, RefiningJobMaterial
 from models.inventory import Inventory
+from models.dashboard_counter import DashboardCounter
 from models.sale import Sale
 from models.commerce import CommerceTransaction
 from models.freight import Freight
@@ -22,12 +24,14 @@ from models.market_location import MarketLocation
 from models.run import Run
 from models.session import Session
 from models.stock_event import StockEvent
-from models.stock import Stock
+from models.stock_balance_snapshot import StockBalanceSnapshot
 from models.trade_run import TradeRun
 from models.scan_signature import ScanSignature
 from models.refinery_bonus import RefineryBonus
 from models.refining_method import RefiningMethod
 from models.history_event import HistoryEvent
+from models.history_tag import HistoryTag
+from models.reference_data_version import ReferenceDataVersion
 # Export all models for easy import
 __all__ = [
     "Base",
@@ -36,10 +40,12 @@ __all__ = [
     "Refinery",
     "Location",
     "MarketPrice",
+    "LatestMarketPrice",
     "PriceHistory",
     "RefiningJob",
     "RefiningJobMaterial",
     "Inventory",
+    "DashboardCounter",
     "Sale",
     "CommerceTransaction",
     "Freight",
@@ -47,11 +53,13 @@ __all__ = [
     "Run",
     "Session",
     "StockEvent",
-    "Stock",
+    "StockBalanceSnapshot",
     "TradeRun",
     "CargoRun",
     "ScanSignature",
     "RefineryBonus",
     "RefiningMethod",
     "HistoryEvent",
+    "HistoryTag",
+    "ReferenceDataVersion",
 ]
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""
+Dashboard counter model.
+
+Running totals for the organization-wide dashboard (total stock,
+processing refining jobs). Rows are adjusted in the same transaction as
+the writes that change them, so reading a total is a primary-key lookup
+instead of an aggregate over inventory or refining_jobs. A periodic
+reconciliation (services/counter_service.py) corrects any drift.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, String, Numeric, DateTime
+
+from database import Base
+
+
+class DashboardCounter(Base):
+    """Named running total."""
+
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Numeric(14, 2), nullable=False, default=0)
+    reconciled_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DashboardCounter(name='{self.name}', value={self.value})>"
@@ -2,10 +2,21 @@
 Model for history events with tags and crew tracking
 """
 
-from sqlalchemy import Column, Integer, String, Text, ARRAY, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Computed, Index, Integer, String, Text, DECIMAL, TIMESTAMP, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from database import Base
 
+# Full-text configuration: titles mix French and English, so no stemming
+SEARCH_CONFIG = "simple"
+
+# Title matches rank above description matches
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(description, '')), 'B')"
+)
+
 
 class HistoryEvent(Base):
     """
@@ -13,6 +24,13 @@ class HistoryEvent(Base):
     Supports tags and crew member tracking
     """
     __tablename__ = "history_events"
+    __table_args__ = (
+        # Full-text search on title + description
+        Index('idx_history_events_search', 'search_vector', postgresql_using='gin'),
+        # Tag / crew member filters (array containment)
+        Index('idx_history_events_tags', 'tags', postgresql_using='gin'),
+        Index('idx_history_events_crew_members', 'crew_members', postgresql_using='gin'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -24,4 +42,7 @@ class HistoryEvent(Base):
     amount = Column(DECIMAL(12, 2))
     location = Column(String(100))
     event_date = Column(TIMESTAMP, nullable=False)
-    created_at = Column(TIMESTAMP, server_default=func.now())
\ No newline at end of file
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    
+    # Maintained by Postgres, only used in WHERE / ORDER BY (never loaded)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
@@ -0,0 +1,24 @@
+"""
+History tag model.
+
+Dictionary of the tags used by history events, with the number of
+events carrying each tag. Maintained by the history routes on create,
+update and delete, so listing the available tags reads this small table
+instead of every event.
+"""
+
+from sqlalchemy import Column, Integer, Text
+
+from database import Base
+
+
+class HistoryTag(Base):
+    """Tag used by at least one history event."""
+
+    __tablename__ = "history_tags"
+
+    name = Column(Text, primary_key=True)
+    usage_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<HistoryTag(name='{self.name}', usage_count={self.usage_count})>"
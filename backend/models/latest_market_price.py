@@ -0,0 +1,135 @@
+"""
+Latest market price model.
+
+One row per (material, source) holding the most recent price written to
+``market_prices``. The table is maintained by a PostgreSQL trigger so every
+writer (API, refresh scripts, manual SQL) keeps it up to date, and valuation
+code can read the latest price without rebuilding it from the full history.
+"""
+
+from sqlalchemy import Column, Integer, Float, DateTime, String, ForeignKey, DDL, event
+
+from database import Base
+
+
+class LatestMarketPrice(Base):
+    """Most recent price per material and source (trigger-maintained)."""
+
+    __tablename__ = "latest_market_prices"
+
+    material_id = Column(Integer, ForeignKey("materials.id", ondelete="CASCADE"), primary_key=True)
+    source = Column(String, primary_key=True)
+
+    price_id = Column(Integer, ForeignKey("market_prices.id", ondelete="CASCADE"), nullable=False)
+    location_id = Column(Integer, nullable=True)
+    location_string = Column(String(100), nullable=True)
+
+    sell_price = Column(Float, nullable=True)
+    buy_price = Column(Float, nullable=True)
+
+    collected_at = Column(DateTime, nullable=True, index=True)
+
+    def __repr__(self):
+        return f"<LatestMarketPrice(material_id={self.material_id}, source='{self.source}', sell={self.sell_price})>"
+
+
+# Sources are nullable in market_prices but part of the primary key here
+UNKNOWN_SOURCE = "UNKNOWN"
+
+
+# Upsert the written row if it is at least as recent as the stored one.
+# When a row leaves its (material, source) pair (DELETE, or an UPDATE of
+# either column) the pair is re-pointed to its most recent remaining row,
+# or removed if none remains. The price_id foreign key cascade may have
+# removed the pair already; the re-pointing then re-inserts it.
+TRIGGER_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION refresh_latest_market_price() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE'
+       OR (TG_OP = 'UPDATE' AND (
+           OLD.material_id IS DISTINCT FROM NEW.material_id
+           OR COALESCE(OLD.source, '{UNKNOWN_SOURCE}') <> COALESCE(NEW.source, '{UNKNOWN_SOURCE}')
+       ))
+    THEN
+        INSERT INTO latest_market_prices (
+            material_id, source, price_id, location_id, location_string,
+            sell_price, buy_price, collected_at
+        )
+        SELECT
+            material_id, COALESCE(source, '{UNKNOWN_SOURCE}'), id, location_id, location_string,
+            sell_price, buy_price, collected_at
+        FROM market_prices
+        WHERE material_id = OLD.material_id
+          AND COALESCE(source, '{UNKNOWN_SOURCE}') = COALESCE(OLD.source, '{UNKNOWN_SOURCE}')
+        ORDER BY collected_at DESC NULLS LAST, id DESC
+        LIMIT 1
+        ON CONFLICT (material_id, source) DO UPDATE SET
+            price_id = EXCLUDED.price_id,
+            location_id = EXCLUDED.location_id,
+            location_string = EXCLUDED.location_string,
+            sell_price = EXCLUDED.sell_price,
+            buy_price = EXCLUDED.buy_price,
+            collected_at = EXCLUDED.collected_at
+        WHERE latest_market_prices.price_id = OLD.id;
+
+        -- No row left for the pair
+        DELETE FROM latest_market_prices
+        WHERE material_id = OLD.material_id
+          AND source = COALESCE(OLD.source, '{UNKNOWN_SOURCE}')
+          AND price_id = OLD.id;
+
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+    END IF;
+
+    INSERT INTO latest_market_prices (
+        material_id, source, price_id, location_id, location_string,
+        sell_price, buy_price, collected_at
+    )
+    VALUES (
+        NEW.material_id, COALESCE(NEW.source, '{UNKNOWN_SOURCE}'), NEW.id, NEW.location_id,
+        NEW.location_string, NEW.sell_price, NEW.buy_price, NEW.collected_at
+    )
+    ON CONFLICT (material_id, source) DO UPDATE SET
+        price_id = EXCLUDED.price_id,
+        location_id = EXCLUDED.location_id,
+        location_string = EXCLUDED.location_string,
+        sell_price = EXCLUDED.sell_price,
+        buy_price = EXCLUDED.buy_price,
+        collected_at = EXCLUDED.collected_at
+    WHERE latest_market_prices.price_id = EXCLUDED.price_id
+       OR latest_market_prices.collected_at IS NULL
+       OR latest_market_prices.collected_at <= EXCLUDED.collected_at;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_refresh_latest_market_price ON market_prices;
+CREATE TRIGGER trg_refresh_latest_market_price
+AFTER INSERT OR UPDATE OR DELETE ON market_prices
+FOR EACH ROW EXECUTE FUNCTION refresh_latest_market_price();
+"""
+
+# Seed the table from the existing history when it is first created
+_BACKFILL = DDL(f"""
+INSERT INTO latest_market_prices (
+    material_id, source, price_id, location_id, location_string,
+    sell_price, buy_price, collected_at
+)
+SELECT DISTINCT ON (material_id, COALESCE(source, '{UNKNOWN_SOURCE}'))
+    material_id, COALESCE(source, '{UNKNOWN_SOURCE}'), id, location_id, location_string,
+    sell_price, buy_price, collected_at
+FROM market_prices
+ORDER BY material_id, COALESCE(source, '{UNKNOWN_SOURCE}'), collected_at DESC NULLS LAST, id DESC
+ON CONFLICT (material_id, source) DO NOTHING;
+""")
+
+for _ddl in (DDL(TRIGGER_FUNCTION_SQL), DDL(TRIGGER_SQL), _BACKFILL):
+    event.listen(
+        LatestMarketPrice.__table__,
+        "after_create",
+        _ddl.execute_if(dialect="postgresql"),
+    )
@@ -8,7 +8,7 @@ class MarketPrice(Base):
     __tablename__ = "market_prices"
 
     id = Column(Integer, primary_key=True)
-    material_id = Column(Integer, ForeignKey("materials.id"), nullable=False)
+    material_id = Column(Integer, ForeignKey("materials.id"), nullable=False, index=True)
     
     # DEUX colonnes pour gérer les deux cas
     location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)  # Vraies locations
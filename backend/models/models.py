@@ -1,9 +1,14 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Index
 from sqlalchemy.sql import func
 from database import Base
 
 class CargoRun(Base):
     __tablename__ = "cargo_runs"
+    __table_args__ = (
+        # Runs list: keyset pagination, with or without a status filter
+        Index('idx_cargo_runs_created_at_id', 'created_at', 'id'),
+        Index('idx_cargo_runs_status_created_at_id', 'status', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     commodity_name = Column(String(200), nullable=False)
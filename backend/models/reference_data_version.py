@@ -0,0 +1,27 @@
+"""
+Reference data version model.
+
+One row per reference dataset (scan signatures, refineries, refining
+methods). The import scripts bump the version in the same transaction as
+the data they write; the API keeps the reference data in memory
+(services/reference_store.py) and reloads it when a version changes.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, String, Integer, DateTime
+
+from database import Base
+
+
+class ReferenceDataVersion(Base):
+    """Version counter of a reference dataset."""
+
+    __tablename__ = "reference_data_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ReferenceDataVersion(name='{self.name}', version={self.version})>"
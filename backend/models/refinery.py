@@ -25,6 +25,7 @@ class Refinery(Base):
     refining_jobs = relationship("RefiningJob", back_populates="refinery", cascade="all, delete-orphan")
     inventory = relationship("Inventory", back_populates="refinery", cascade="all, delete-orphan")
     sales = relationship("Sale", back_populates="refinery_source", foreign_keys="Sale.refinery_source_id")
+    bonuses = relationship("RefineryBonus", back_populates="refinery", order_by="RefineryBonus.id")
     
     def __repr__(self):
         return f"<Refinery(name='{self.name}', system='{self.system}')>"
\ No newline at end of file
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy.orm import relationship
 from database import Base
 
 class RefineryBonus(Base):
@@ -7,4 +8,6 @@ class RefineryBonus(Base):
     id = Column(Integer, primary_key=True, index=True)
     refinery_id = Column(Integer, ForeignKey("refineries.id"), nullable=False)
     material_name = Column(String(100), nullable=False, index=True)
-    bonus_percentage = Column(Integer, nullable=False)
\ No newline at end of file
+    bonus_percentage = Column(Integer, nullable=False)
+    
+    refinery = relationship("Refinery", back_populates="bonuses")
@@ -2,7 +2,7 @@
 Model pour les jobs de raffinerie (RefiningJob).
 """
 
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
 
@@ -13,6 +13,10 @@ class RefiningJob(Base):
     """Job de raffinerie (mining ou salvage)."""
     
     __tablename__ = "refining_jobs"
+    __table_args__ = (
+        # Activity feed keyset pagination
+        Index('idx_refining_jobs_collected_at_id', 'collected_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     refinery_id = Column(Integer, ForeignKey("refineries.id", ondelete="CASCADE"), nullable=False, index=True)
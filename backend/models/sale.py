@@ -2,7 +2,7 @@
 Model pour les ventes (Sale).
 """
 
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -13,6 +13,10 @@ class Sale(Base):
     """Vente de matériaux."""
     
     __tablename__ = "sales"
+    __table_args__ = (
+        # Activity feed keyset pagination
+        Index('idx_sales_sale_date_id', 'sale_date', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String(100), index=True)
@@ -0,0 +1,33 @@
+"""
+Stock balance snapshot model.
+
+Balance of one material at a point of the stock_events ledger: the sum of
+every event up to last_event_id. A balance read is the snapshot plus the
+events recorded after it, so its cost no longer grows with the lifetime
+number of events. Snapshots are advanced periodically by
+services/stock_service.snapshot_stock_balances().
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, Numeric, Float, DateTime, ForeignKey
+
+from database import Base
+
+
+class StockBalanceSnapshot(Base):
+    """Latest balance snapshot of a material."""
+
+    __tablename__ = "stock_balance_snapshots"
+
+    material_id = Column(Integer, ForeignKey("materials.id"), primary_key=True)
+    quantity = Column(Numeric(12, 2), nullable=False, default=0)
+    total_value = Column(Float, nullable=False, default=0.0)
+    last_event_id = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return (
+            f"<StockBalanceSnapshot(material_id={self.material_id}, "
+            f"quantity={self.quantity}, last_event_id={self.last_event_id})>"
+        )
@@ -1,16 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Numeric, String, Float, DateTime, ForeignKey, Index, DDL, event
 from sqlalchemy.sql import func
 from database import Base
 
 
 class StockEvent(Base):
+    """
+    Ligne du registre de stock (append-only).
+
+    quantity est signée : positive pour une entrée (achat, production),
+    négative pour une sortie (vente, consommation). Le solde d'un matériau
+    est la somme de ses événements ; voir services/stock_service.py.
+    """
     __tablename__ = "stock_events"
+    __table_args__ = (
+        # Événements d'un matériau postérieurs à son snapshot de solde
+        Index('idx_stock_events_material_id_id', 'material_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
 
     material_id = Column(Integer, ForeignKey("materials.id"), nullable=False)
 
-    quantity = Column(Integer, nullable=False)
+    quantity = Column(Numeric(12, 2), nullable=False)  # SCU, comme l'inventaire
 
     unit_price = Column(Float, nullable=True)      # prix unitaire au moment T
     total_value = Column(Float, nullable=False, default=0.0)    # TOUJOURS renseigné
@@ -20,3 +31,27 @@ class StockEvent(Base):
     reference_id = Column(Integer, nullable=True)
 
     created_at = Column(DateTime, server_default=func.now())
+
+
+# Le registre est append-only : une correction est un nouvel événement
+APPEND_ONLY_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION reject_stock_event_change() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION USING MESSAGE = 'stock_events is append-only (' || TG_OP || ' rejected)';
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+APPEND_ONLY_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS trg_stock_events_append_only ON stock_events;
+CREATE TRIGGER trg_stock_events_append_only
+BEFORE UPDATE OR DELETE ON stock_events
+FOR EACH ROW EXECUTE FUNCTION reject_stock_event_change();
+"""
+
+for _sql in (APPEND_ONLY_FUNCTION_SQL, APPEND_ONLY_TRIGGER_SQL):
+    event.listen(
+        StockEvent.__table__,
+        "after_create",
+        DDL(_sql).execute_if(dialect="postgresql"),
+    )
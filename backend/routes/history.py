@@ -3,27 +3,26 @@ Router pour l'historique des événements avec tags et crew tracking
 """
 
 # 1. Standard library
+import re
 from datetime import datetime
-from typing import List, Optional
-import os
+from typing import Dict, Iterable, List, Optional
 
 # 2. Third-party
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
 from pydantic import BaseModel
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
 
 # 3. Local
+from api.auth import get_current_user
 from database import get_db
-from models.history_event import HistoryEvent
+from models.history_event import SEARCH_CONFIG, HistoryEvent
+from models.history_tag import HistoryTag
 from models.user import User
+from schemas.auth import CurrentUser
 
 router = APIRouter(prefix="/stats/history", tags=["History"])
 
-security = HTTPBearer()
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
 
 # ========================================
 # SCHEMAS
@@ -80,39 +79,8 @@ class HistoryEventResponse(BaseModel):
     class Config:
         from_attributes = True
 
-# Fonction pour récupérer l'utilisateur actuel
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
-    """
-    Vérifie le token JWT et retourne l'utilisateur
-    """
-    try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials"
-            )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
-        )
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    return user
-
 # Fonction pour vérifier admin
-def require_admin(current_user: User = Depends(get_current_user)):
+def require_admin(current_user: CurrentUser = Depends(get_current_user)):
     """
     Vérifie que l'utilisateur est admin
     """
@@ -123,18 +91,123 @@ def require_admin(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+# ========================================
+# HELPERS
+# ========================================
+
+def _load_crew_map(db: Session, events: Iterable[HistoryEvent]) -> Dict[int, CrewMemberResponse]:
+    """
+    Resolve the crew members of several events with a single query.
+    
+    Returns:
+        Mapping user id -> crew member details
+    """
+    crew_ids = {
+        user_id
+        for event in events
+        for user_id in (event.crew_members or [])
+    }
+    if not crew_ids:
+        return {}
+    
+    users = db.query(User.id, User.username).filter(User.id.in_(crew_ids)).all()
+    return {u.id: CrewMemberResponse(id=u.id, username=u.username) for u in users}
+
+
+def _build_search_query(search: str):
+    """
+    Build a prefix-matching tsquery from the text typed in the search box.
+    
+    Every word must match, the last one as a prefix too ("refin qua"
+    finds "Refining Quantanium"). Punctuation is dropped, so user input
+    can never produce an invalid tsquery.
+    
+    Returns:
+        tsquery expression, or None if the search has no word
+    """
+    words = re.findall(r"\w+", search.lower())
+    if not words:
+        return None
+    
+    return func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{word}:*" for word in words))
+
+
+def _adjust_tag_counts(
+    db: Session,
+    old_tags: Optional[Iterable[str]],
+    new_tags: Optional[Iterable[str]]
+) -> None:
+    """
+    Update the tag dictionary (history_tags) for one event's tag change.
+    
+    Does not commit: runs in the same transaction as the event write.
+    Tags no longer used by any event are removed.
+    
+    Args:
+        db: Database session
+        old_tags: Tags before the change (None for a new event)
+        new_tags: Tags after the change (None for a deleted event)
+    """
+    old_set = set(old_tags or [])
+    new_set = set(new_tags or [])
+    
+    deltas = [{"name": tag, "delta": 1} for tag in new_set - old_set]
+    deltas += [{"name": tag, "delta": -1} for tag in old_set - new_set]
+    if not deltas:
+        return
+    
+    db.execute(
+        text("""
+            INSERT INTO history_tags (name, usage_count)
+            VALUES (:name, :delta)
+            ON CONFLICT (name) DO UPDATE
+            SET usage_count = history_tags.usage_count + EXCLUDED.usage_count
+        """),
+        deltas,
+    )
+    
+    removed = list(old_set - new_set)
+    if removed:
+        db.execute(
+            text("DELETE FROM history_tags WHERE name = ANY(:names) AND usage_count <= 0"),
+            {"names": removed},
+        )
+
+
+def _build_event_response(
+    event: HistoryEvent,
+    crew_map: Dict[int, CrewMemberResponse]
+) -> HistoryEventResponse:
+    """Build the response for an event from a preloaded crew map."""
+    crew_ids = event.crew_members or []
+    
+    return HistoryEventResponse(
+        id=event.id,
+        user_id=event.user_id,
+        title=event.title,
+        description=event.description,
+        event_type=event.event_type,
+        tags=event.tags or [],
+        crew_members_ids=crew_ids,
+        crew_members_details=[crew_map[user_id] for user_id in crew_ids if user_id in crew_map],
+        amount=event.amount,
+        location=event.location,
+        event_date=event.event_date,
+        created_at=event.created_at
+    )
+
 # ========================================
 # ENDPOINTS
 # ========================================
 
 @router.get("/", response_model=List[HistoryEventResponse])
-async def get_history_events(
+def get_history_events(
     skip: int = 0,
     limit: int = 100,
     tag: Optional[str] = None,
     crew_member: Optional[int] = None,
     search: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get history events - members see their own, admins see all"""
@@ -147,11 +220,9 @@ async def get_history_events(
     - search: Search in title and description
     """
     # Si pas admin, voir seulement ses events
-    if not current_user.is_admin:
+    if current_user.role != "admin":
         query = query.filter(HistoryEvent.user_id == current_user.id)
     
-    query = query.order_by(HistoryEvent.event_date.desc())
-    
     # Filter by tag
     if tag:
         query = query.filter(HistoryEvent.tags.contains([tag]))
@@ -160,81 +231,37 @@ async def get_history_events(
     if crew_member:
         query = query.filter(HistoryEvent.crew_members.contains([crew_member]))
     
-    # Search in title and description
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (HistoryEvent.title.ilike(search_filter)) |
-            (HistoryEvent.description.ilike(search_filter))
+    # Search in title and description (full-text, prefix match, ranked)
+    ts_query = _build_search_query(search) if search else None
+    if ts_query is not None:
+        query = query.filter(HistoryEvent.search_vector.op("@@")(ts_query))
+        query = query.order_by(
+            func.ts_rank(HistoryEvent.search_vector, ts_query).desc(),
+            HistoryEvent.event_date.desc()
         )
+    else:
+        query = query.order_by(HistoryEvent.event_date.desc())
     
     events = query.offset(skip).limit(limit).all()
     
-    # Enrich with crew member details
-    result = []
-    for event in events:
-        crew_details = []
-        if event.crew_members:
-            crew_users = db.query(User).filter(User.id.in_(event.crew_members)).all()
-            crew_details = [
-                CrewMemberResponse(id=u.id, username=u.username)
-                for u in crew_users
-            ]
-        
-        result.append(
-            HistoryEventResponse(
-                id=event.id,
-                user_id=event.user_id,
-                title=event.title,
-                description=event.description,
-                event_type=event.event_type,
-                tags=event.tags or [],
-                crew_members_ids=event.crew_members or [],
-                crew_members_details=crew_details,
-                amount=event.amount,
-                location=event.location,
-                event_date=event.event_date,
-                created_at=event.created_at
-            )
-        )
+    # Enrich with crew member details (one query for the whole page)
+    crew_map = _load_crew_map(db, events)
     
-    return result
+    return [_build_event_response(event, crew_map) for event in events]
 
 
 @router.get("/{event_id}", response_model=HistoryEventResponse)
-async def get_history_event(event_id: int, db: Session = Depends(get_db)):
+def get_history_event(event_id: int, db: Session = Depends(get_db)):
     """Get a single event by ID"""
     event = db.query(HistoryEvent).filter(HistoryEvent.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    # Get crew member details
-    crew_details = []
-    if event.crew_members:
-        crew_users = db.query(User).filter(User.id.in_(event.crew_members)).all()
-        crew_details = [
-            CrewMemberResponse(id=u.id, username=u.username)
-            for u in crew_users
-        ]
-    
-    return HistoryEventResponse(
-        id=event.id,
-        user_id=event.user_id,
-        title=event.title,
-        description=event.description,
-        event_type=event.event_type,
-        tags=event.tags or [],
-        crew_members_ids=event.crew_members or [],
-        crew_members_details=crew_details,
-        amount=event.amount,
-        location=event.location,
-        event_date=event.event_date,
-        created_at=event.created_at
-    )
+    return _build_event_response(event, _load_crew_map(db, [event]))
 
 
 @router.post("/", response_model=HistoryEventResponse)
-async def create_history_event(
+def create_history_event(
     event_data: HistoryEventCreate,
     user_id: int = 1,  # TODO: Get from auth
     db: Session = Depends(get_db)
@@ -253,36 +280,15 @@ async def create_history_event(
     )
     
     db.add(event)
+    _adjust_tag_counts(db, None, event.tags)
     db.commit()
     db.refresh(event)
     
-    # Get crew member details
-    crew_details = []
-    if event.crew_members:
-        crew_users = db.query(User).filter(User.id.in_(event.crew_members)).all()
-        crew_details = [
-            CrewMemberResponse(id=u.id, username=u.username)
-            for u in crew_users
-        ]
-    
-    return HistoryEventResponse(
-        id=event.id,
-        user_id=event.user_id,
-        title=event.title,
-        description=event.description,
-        event_type=event_data.event_type,
-        tags=event.tags or [],
-        crew_members_ids=event.crew_members or [],
-        crew_members_details=crew_details,
-        amount=event.amount,
-        location=event.location,
-        event_date=event.event_date,
-        created_at=event.created_at
-    )
+    return _build_event_response(event, _load_crew_map(db, [event]))
 
 
 @router.put("/{event_id}", response_model=HistoryEventResponse)
-async def update_history_event(
+def update_history_event(
     event_id: int,
     event_data: HistoryEventUpdate,
     db: Session = Depends(get_db)
@@ -294,44 +300,26 @@ async def update_history_event(
     
     # Update only provided fields
     update_data = event_data.model_dump(exclude_unset=True)
+    if "tags" in update_data:
+        _adjust_tag_counts(db, event.tags, update_data["tags"])
+    
     for field, value in update_data.items():
         setattr(event, field, value)
     
     db.commit()
     db.refresh(event)
     
-    # Get crew member details
-    crew_details = []
-    if event.crew_members:
-        crew_users = db.query(User).filter(User.id.in_(event.crew_members)).all()
-        crew_details = [
-            CrewMemberResponse(id=u.id, username=u.username)
-            for u in crew_users
-        ]
-    
-    return HistoryEventResponse(
-        id=event.id,
-        user_id=event.user_id,
-        title=event.title,
-        description=event.description,
-        event_type=event.event_type,
-        tags=event.tags or [],
-        crew_members_ids=event.crew_members or [],
-        crew_members_details=crew_details,
-        amount=event.amount,
-        location=event.location,
-        event_date=event.event_date,
-        created_at=event.created_at
-    )
+    return _build_event_response(event, _load_crew_map(db, [event]))
 
 
 @router.delete("/{event_id}")
-async def delete_history_event(event_id: int, db: Session = Depends(get_db)):
+def delete_history_event(event_id: int, db: Session = Depends(get_db)):
     """Delete an event"""
     event = db.query(HistoryEvent).filter(HistoryEvent.id == event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    _adjust_tag_counts(db, event.tags, None)
     db.delete(event)
     db.commit()
     
@@ -339,19 +327,15 @@ async def delete_history_event(event_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/tags/available")
-async def get_available_tags(db: Session = Depends(get_db)):
-    """Get all unique tags used across events"""
-    events = db.query(HistoryEvent).all()
-    all_tags = set()
-    for event in events:
-        if event.tags:
-            all_tags.update(event.tags)
+def get_available_tags(db: Session = Depends(get_db)):
+    """Get all unique tags used across events (from the tag dictionary)"""
+    tags = db.query(HistoryTag.name).filter(HistoryTag.usage_count > 0).all()
     
-    return {"tags": sorted(list(all_tags))}
+    return {"tags": sorted(name for (name,) in tags)}
 
 
 @router.get("/users/available", response_model=List[CrewMemberResponse])
-async def get_available_users(db: Session = Depends(get_db)):
+def get_available_users(db: Session = Depends(get_db)):
     """Get all users available for crew selection"""
     users = db.query(User).all()
     return [CrewMemberResponse(id=u.id, username=u.username) for u in users]
\ No newline at end of file
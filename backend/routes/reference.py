@@ -2,15 +2,18 @@
 Router pour les données de référence (scan signatures, refineries, refining methods)
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
-from models.scan_signature import ScanSignature
-from models.refinery_bonus import RefineryBonus
-from models.refining_method import RefiningMethod
-from models.refinery import Refinery
 from pydantic import BaseModel
+from services.reference_store import (
+    REFERENCE_CACHE_MAX_AGE_SECONDS,
+    CachedBody,
+    lookup_signature,
+    reference_store,
+    serialize,
+)
 
 router = APIRouter(prefix="/reference", tags=["reference"])
 
@@ -28,6 +31,19 @@ class ScanSignatureResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class SignatureMatchResponse(BaseModel):
+    signature: int
+    difference: int
+    signature_id: int
+    type: str
+    category: str
+    rock_count: int
+
+class SignatureLookupResponse(BaseModel):
+    value: int
+    tolerance: int
+    matches: List[SignatureMatchResponse]
+
 class RefineryBonusResponse(BaseModel):
     id: int
     material_name: str
@@ -58,149 +74,122 @@ class RefiningMethodResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Largest tolerance window accepted by the signature lookup
+MAX_SIGNATURE_TOLERANCE = 1000
+
+# ========================================
+# HELPERS
+# ========================================
+
+def _cached_response(request: Request, cached: CachedBody) -> Response:
+    """
+    Réponse JSON pré-sérialisée avec ETag et Cache-Control.
+    
+    Renvoie 304 sans corps si le client possède déjà cette version.
+    """
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"public, max-age={REFERENCE_CACHE_MAX_AGE_SECONDS}",
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if cached.etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 # ========================================
 # ENDPOINTS
 # ========================================
 
 @router.get("/scan-signatures", response_model=List[ScanSignatureResponse])
-async def get_scan_signatures(db: Session = Depends(get_db)):
+def get_scan_signatures(request: Request, db: Session = Depends(get_db)):
     """
     Récupère toutes les signatures de scan
     """
-    signatures = db.query(ScanSignature).all()
-    return signatures
+    return _cached_response(request, reference_store.get(db).scan_signatures_body)
+
+@router.get("/scan-signatures/lookup", response_model=SignatureLookupResponse)
+def lookup_scan_signature(
+    request: Request,
+    value: int = Query(..., ge=0, description="Valeur lue au scanner"),
+    tolerance: int = Query(0, ge=0, le=MAX_SIGNATURE_TOLERANCE, description="Écart accepté"),
+    db: Session = Depends(get_db)
+):
+    """
+    Identifie le type de roche et le nombre de rochers d'une lecture scanner
+    
+    Ex: 10380 -> 6 x Shale. Recherche exacte en O(1), avec tolérance en O(log n).
+    """
+    matches = lookup_signature(reference_store.get(db), value, tolerance)
+    return _cached_response(request, serialize({"value": value, "tolerance": tolerance, "matches": matches}))
 
 @router.get("/scan-signatures/{signature_id}", response_model=ScanSignatureResponse)
-async def get_scan_signature(signature_id: int, db: Session = Depends(get_db)):
+def get_scan_signature(signature_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Récupère une signature spécifique
     """
-    signature = db.query(ScanSignature).filter(ScanSignature.id == signature_id).first()
-    if not signature:
+    cached = reference_store.get(db).scan_signatures_by_id.get(signature_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Signature not found")
-    return signature
+    return _cached_response(request, cached)
 
 @router.get("/scan-signatures/category/{category}", response_model=List[ScanSignatureResponse])
-async def get_signatures_by_category(category: str, db: Session = Depends(get_db)):
+def get_signatures_by_category(category: str, request: Request, db: Session = Depends(get_db)):
     """
     Récupère les signatures par catégorie (Surface Deposit, Space Asteroid, etc.)
     """
-    signatures = db.query(ScanSignature).filter(
-        ScanSignature.category.ilike(f"%{category}%")
-    ).all()
-    return signatures
+    needle = category.lower()
+    signatures = [
+        s for s in reference_store.get(db).scan_signatures
+        if needle in s["category"].lower()
+    ]
+    return _cached_response(request, serialize(signatures))
 
 @router.get("/refineries", response_model=List[RefineryResponse])
-async def get_refineries(db: Session = Depends(get_db)):
+def get_refineries(request: Request, db: Session = Depends(get_db)):
     """
     Récupère toutes les raffineries avec leurs bonus
     """
-    refineries = db.query(Refinery).filter(Refinery.is_active == True).all()
-    
-    # Charger les bonus pour chaque raffinerie
-    result = []
-    for ref in refineries:
-        bonuses = db.query(RefineryBonus).filter(
-            RefineryBonus.refinery_id == ref.id
-        ).all()
-        
-        ref_dict = {
-            "id": ref.id,
-            "name": ref.name,
-            "system": ref.system,
-            "location": ref.location,
-            "is_active": ref.is_active,
-            "bonuses": [
-                {
-                    "id": b.id,
-                    "material_name": b.material_name,
-                    "bonus_percentage": b.bonus_percentage
-                }
-                for b in bonuses
-            ]
-        }
-        result.append(ref_dict)
-    
-    return result
+    return _cached_response(request, reference_store.get(db).refineries_body)
 
 @router.get("/refineries/{refinery_id}", response_model=RefineryResponse)
-async def get_refinery(refinery_id: int, db: Session = Depends(get_db)):
+def get_refinery(refinery_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Récupère une raffinerie spécifique avec ses bonus
     """
-    refinery = db.query(Refinery).filter(Refinery.id == refinery_id).first()
-    if not refinery:
+    cached = reference_store.get(db).refineries_by_id.get(refinery_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Refinery not found")
-    
-    bonuses = db.query(RefineryBonus).filter(
-        RefineryBonus.refinery_id == refinery_id
-    ).all()
-    
-    return {
-        "id": refinery.id,
-        "name": refinery.name,
-        "system": refinery.system,
-        "location": refinery.location,
-        "is_active": refinery.is_active,
-        "bonuses": [
-            {
-                "id": b.id,
-                "material_name": b.material_name,
-                "bonus_percentage": b.bonus_percentage
-            }
-            for b in bonuses
-        ]
-    }
+    return _cached_response(request, cached)
 
 @router.get("/refineries/system/{system}", response_model=List[RefineryResponse])
-async def get_refineries_by_system(system: str, db: Session = Depends(get_db)):
+def get_refineries_by_system(system: str, request: Request, db: Session = Depends(get_db)):
     """
     Récupère les raffineries d'un système spécifique
     """
-    refineries = db.query(Refinery).filter(
-        Refinery.system.ilike(f"%{system}%"),
-        Refinery.is_active == True
-    ).all()
-    
-    result = []
-    for ref in refineries:
-        bonuses = db.query(RefineryBonus).filter(
-            RefineryBonus.refinery_id == ref.id
-        ).all()
-        
-        ref_dict = {
-            "id": ref.id,
-            "name": ref.name,
-            "system": ref.system,
-            "location": ref.location,
-            "is_active": ref.is_active,
-            "bonuses": [
-                {
-                    "id": b.id,
-                    "material_name": b.material_name,
-                    "bonus_percentage": b.bonus_percentage
-                }
-                for b in bonuses
-            ]
-        }
-        result.append(ref_dict)
-    
-    return result
+    needle = system.lower()
+    refineries = [
+        r for r in reference_store.get(db).refineries
+        if r["is_active"] and needle in r["system"].lower()
+    ]
+    return _cached_response(request, serialize(refineries))
 
 @router.get("/refining-methods", response_model=List[RefiningMethodResponse])
-async def get_refining_methods(db: Session = Depends(get_db)):
+def get_refining_methods(request: Request, db: Session = Depends(get_db)):
     """
     Récupère toutes les méthodes de raffinage
     """
-    methods = db.query(RefiningMethod).all()
-    return methods
+    return _cached_response(request, reference_store.get(db).refining_methods_body)
 
 @router.get("/refining-methods/{method_id}", response_model=RefiningMethodResponse)
-async def get_refining_method(method_id: int, db: Session = Depends(get_db)):
+def get_refining_method(method_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Récupère une méthode spécifique
     """
-    method = db.query(RefiningMethod).filter(RefiningMethod.id == method_id).first()
-    if not method:
+    cached = reference_store.get(db).refining_methods_by_id.get(method_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Method not found")
-    return method
\ No newline at end of file
+    return _cached_response(request, cached)
@@ -27,6 +27,10 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class CurrentUser(UserResponse):
+    """Authenticated user snapshot (cached, read-only: reload from DB to modify)."""
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
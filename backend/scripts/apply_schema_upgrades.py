@@ -0,0 +1,145 @@
+"""
+Script pour appliquer les évolutions de schéma sur une base existante.
+
+Base.metadata.create_all ne crée que les tables manquantes : les index et
+colonnes ajoutés ensuite aux modèles existants doivent être créés ici.
+Chaque instruction est idempotente, le script peut être relancé sans risque.
+
+Usage:
+    python scripts/apply_schema_upgrades.py
+"""
+
+import sys
+import os
+
+# Ajouter le dossier parent au path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database import engine
+from models.history_event import SEARCH_VECTOR_EXPRESSION
+from models.latest_market_price import TRIGGER_FUNCTION_SQL, TRIGGER_SQL
+from models.stock_event import APPEND_ONLY_FUNCTION_SQL, APPEND_ONLY_TRIGGER_SQL
+
+# (description, SQL) — à compléter à chaque évolution de modèle
+SCHEMA_UPGRADES = [
+    (
+        "Index market_prices.material_id (valorisation du stock)",
+        "CREATE INDEX IF NOT EXISTS ix_market_prices_material_id "
+        "ON market_prices (material_id)",
+    ),
+    (
+        "Fonction latest_market_prices (re-sélection après suppression)",
+        TRIGGER_FUNCTION_SQL,
+    ),
+    (
+        "Trigger latest_market_prices sur INSERT / UPDATE / DELETE",
+        TRIGGER_SQL,
+    ),
+    (
+        "Index refining_jobs (collected_at, id) (fil d'activité)",
+        "CREATE INDEX IF NOT EXISTS idx_refining_jobs_collected_at_id "
+        "ON refining_jobs (collected_at, id)",
+    ),
+    (
+        "Index sales (sale_date, id) (fil d'activité)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_sale_date_id "
+        "ON sales (sale_date, id)",
+    ),
+    (
+        "Colonne history_events.search_vector (recherche plein texte)",
+        "ALTER TABLE history_events ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+    ),
+    (
+        "Index GIN history_events.search_vector (recherche plein texte)",
+        "CREATE INDEX IF NOT EXISTS idx_history_events_search "
+        "ON history_events USING gin (search_vector)",
+    ),
+    (
+        "Index GIN history_events.tags (filtre par tag)",
+        "CREATE INDEX IF NOT EXISTS idx_history_events_tags "
+        "ON history_events USING gin (tags)",
+    ),
+    (
+        "Index GIN history_events.crew_members (filtre par membre d'équipage)",
+        "CREATE INDEX IF NOT EXISTS idx_history_events_crew_members "
+        "ON history_events USING gin (crew_members)",
+    ),
+    (
+        "Dictionnaire history_tags recalculé depuis history_events",
+        "WITH counts AS ("
+        " SELECT tag AS name, COUNT(DISTINCT id) AS usage_count"
+        " FROM history_events, unnest(tags) AS tag GROUP BY tag"
+        "), upserted AS ("
+        " INSERT INTO history_tags (name, usage_count) SELECT name, usage_count FROM counts"
+        " ON CONFLICT (name) DO UPDATE SET usage_count = EXCLUDED.usage_count"
+        ") "
+        "DELETE FROM history_tags WHERE name NOT IN (SELECT name FROM counts)",
+    ),
+    (
+        "Suppression de l'index partiel cargo_runs livrés (jamais utilisé par /commerce/stats)",
+        "DROP INDEX IF EXISTS idx_cargo_runs_delivered_at",
+    ),
+    (
+        "Index cargo_runs (created_at, id) (pagination)",
+        "CREATE INDEX IF NOT EXISTS idx_cargo_runs_created_at_id "
+        "ON cargo_runs (created_at, id)",
+    ),
+    (
+        "Index cargo_runs (status, created_at, id) (pagination filtrée)",
+        "CREATE INDEX IF NOT EXISTS idx_cargo_runs_status_created_at_id "
+        "ON cargo_runs (status, created_at, id)",
+    ),
+    (
+        "Suppression de l'index partiel cargo_runs actifs (remplacé par le composite)",
+        "DROP INDEX IF EXISTS idx_cargo_runs_active_created_at",
+    ),
+    (
+        "Index stock_events (material_id, id) (solde depuis le snapshot)",
+        "CREATE INDEX IF NOT EXISTS idx_stock_events_material_id_id "
+        "ON stock_events (material_id, id)",
+    ),
+    (
+        "Ventes du registre de stock en quantité négative (avant le trigger append-only)",
+        "UPDATE stock_events SET quantity = -quantity "
+        "WHERE event_type = 'SELL' AND quantity > 0",
+    ),
+    (
+        "Quantités du registre de stock en SCU décimaux (production, ventes)",
+        "ALTER TABLE stock_events ALTER COLUMN quantity TYPE NUMERIC(12, 2); "
+        "ALTER TABLE stock_balance_snapshots ALTER COLUMN quantity TYPE NUMERIC(12, 2)",
+    ),
+    (
+        "Fonction append-only de stock_events",
+        APPEND_ONLY_FUNCTION_SQL,
+    ),
+    (
+        "Trigger append-only de stock_events",
+        APPEND_ONLY_TRIGGER_SQL,
+    ),
+]
+
+
+def apply_schema_upgrades() -> int:
+    """
+    Applique toutes les évolutions, chacune dans sa propre transaction.
+    
+    Returns:
+        Nombre d'évolutions appliquées
+    """
+    applied = 0
+    
+    for description, sql in SCHEMA_UPGRADES:
+        with engine.begin() as connection:
+            connection.execute(text(sql))
+        print(f"✅ {description}")
+        applied += 1
+    
+    return applied
+
+
+if __name__ == "__main__":
+    count = apply_schema_upgrades()
+    print(f"🎉 {count} évolution(s) de schéma appliquée(s)")
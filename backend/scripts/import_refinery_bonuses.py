@@ -44,6 +44,22 @@ class RefineryBonus(Base):
     material_name = Column(String(100), nullable=False, index=True)
     bonus_percentage = Column(Integer, nullable=False)  # Peut être négatif (malus)
 
+class ReferenceDataVersion(Base):
+    """Version des données de référence (rechargées par l'API quand elle change)"""
+    __tablename__ = "reference_data_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+def bump_reference_version(session, name):
+    """Incrémente la version d'un jeu de données (dans la transaction courante)"""
+    row = session.query(ReferenceDataVersion).filter(ReferenceDataVersion.name == name).with_for_update().first()
+    if row:
+        row.version += 1
+    else:
+        session.add(ReferenceDataVersion(name=name, version=1))
+
 def main():
     print("🚀 Import des bonus de raffineries...")
     
@@ -109,6 +125,9 @@ def main():
                 session.add(bonus)
                 total_bonuses += 1
         
+        # Signaler la nouvelle version à l'API (rechargement du cache)
+        bump_reference_version(session, "refineries")
+        
         # Commit
         session.commit()
         print(f"✅ {total_refineries} raffineries importées!")
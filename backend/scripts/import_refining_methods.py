@@ -6,9 +6,10 @@ Execute ce script pour peupler la table refining_methods.
 import json
 import sys
 from pathlib import Path
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import create_engine, Column, Integer, String, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import func
 from dotenv import load_dotenv
 import os
 
@@ -34,6 +35,22 @@ class RefiningMethod(Base):
     yield_rating = Column(String(50), nullable=False)  # "yield" est réservé en Python
     description = Column(String(500))
 
+class ReferenceDataVersion(Base):
+    """Version des données de référence (rechargées par l'API quand elle change)"""
+    __tablename__ = "reference_data_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+def bump_reference_version(session, name):
+    """Incrémente la version d'un jeu de données (dans la transaction courante)"""
+    row = session.query(ReferenceDataVersion).filter(ReferenceDataVersion.name == name).with_for_update().first()
+    if row:
+        row.version += 1
+    else:
+        session.add(ReferenceDataVersion(name=name, version=1))
+
 def main():
     print("🚀 Import des méthodes de raffinage...")
     
@@ -75,6 +92,9 @@ def main():
             session.add(method)
             count += 1
         
+        # Signaler la nouvelle version à l'API (rechargement du cache)
+        bump_reference_version(session, "refining_methods")
+        
         # Commit
         session.commit()
         print(f"✅ {count} méthodes importées avec succès!")
@@ -6,9 +6,10 @@ Execute ce script pour peupler la table scan_signatures.
 import json
 import sys
 from pathlib import Path
-from sqlalchemy import create_engine, Column, Integer, String, JSON
+from sqlalchemy import create_engine, Column, Integer, String, JSON, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import func
 from dotenv import load_dotenv
 import os
 
@@ -33,6 +34,22 @@ class ScanSignature(Base):
     signatures = Column(JSON, nullable=False)
     description = Column(String(500))
 
+class ReferenceDataVersion(Base):
+    """Version des données de référence (rechargées par l'API quand elle change)"""
+    __tablename__ = "reference_data_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+def bump_reference_version(session, name):
+    """Incrémente la version d'un jeu de données (dans la transaction courante)"""
+    row = session.query(ReferenceDataVersion).filter(ReferenceDataVersion.name == name).with_for_update().first()
+    if row:
+        row.version += 1
+    else:
+        session.add(ReferenceDataVersion(name=name, version=1))
+
 def main():
     print("🚀 Import des signatures de scan...")
     
@@ -114,6 +131,9 @@ def main():
             session.add(sig)
             count += 1
         
+        # Signaler la nouvelle version à l'API (rechargement du cache)
+        bump_reference_version(session, "scan_signatures")
+        
         # Commit
         session.commit()
         print(f"✅ {count} signatures importées avec succès!")
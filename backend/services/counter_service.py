@@ -0,0 +1,135 @@
+"""
+Counter service for Star Citizen App.
+Maintains the dashboard running totals (dashboard_counters table).
+
+Writers call adjust_counter() before committing, in the same transaction
+as the change it reflects, so totals are O(1) reads. reconcile_counters()
+recomputes every total from the source tables and reports the drift; it
+runs periodically in the scheduler and whenever a counter row is missing.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Union
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.dashboard_counter import DashboardCounter
+
+# Counter names
+COUNTER_STOCK_TOTAL = "stock_total"
+COUNTER_ACTIVE_REFINING = "active_refining"
+
+# Source-of-truth aggregate for each counter
+COUNTER_QUERIES = {
+    COUNTER_STOCK_TOTAL: "SELECT COALESCE(SUM(quantity), 0) FROM inventory",
+    COUNTER_ACTIVE_REFINING: "SELECT COUNT(*) FROM refining_jobs WHERE status = 'processing'",
+}
+
+
+def adjust_counter(db: Session, name: str, delta: Union[int, float, Decimal]) -> None:
+    """
+    Add a delta to a counter inside the caller's transaction.
+    
+    Does not commit: the caller commits it together with the write it
+    reflects. A missing counter row is left alone and created by the
+    next reconciliation.
+    
+    Args:
+        db: Database session
+        name: Counter name
+        delta: Amount to add (negative to subtract)
+    """
+    if not delta:
+        return
+    
+    db.execute(
+        text("""
+            UPDATE dashboard_counters
+            SET value = value + CAST(:delta AS NUMERIC), updated_at = :now
+            WHERE name = :name
+        """),
+        {"name": name, "delta": str(delta), "now": datetime.utcnow()},
+    )
+
+
+def get_counters(db: Session) -> Dict[str, float]:
+    """
+    Read every counter, reconciling first if one has never been computed.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Mapping of counter name to value
+    """
+    values = dict(db.query(DashboardCounter.name, DashboardCounter.value).all())
+    
+    if any(name not in values for name in COUNTER_QUERIES):
+        reconcile_counters(db)
+        values = dict(db.query(DashboardCounter.name, DashboardCounter.value).all())
+    
+    return {name: float(values[name]) for name in COUNTER_QUERIES}
+
+
+def reconcile_counters(db: Session) -> Dict[str, float]:
+    """
+    Recompute every counter from its source table and fix any drift.
+    
+    Each counter row is locked (FOR UPDATE) before its aggregate is
+    computed: writers hold that lock until they commit, so no increment
+    can be lost or counted twice.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Drift per counter (actual value minus stored value)
+    
+    Raises:
+        Exception: Any database error (the session is rolled back first)
+    """
+    now = datetime.utcnow()
+    drift: Dict[str, float] = {}
+    
+    try:
+        for name, query in COUNTER_QUERIES.items():
+            created = db.execute(
+                text("""
+                    INSERT INTO dashboard_counters (name, value, updated_at)
+                    VALUES (:name, 0, :now)
+                    ON CONFLICT (name) DO NOTHING
+                    RETURNING name
+                """),
+                {"name": name, "now": now},
+            ).scalar() is not None
+            
+            # Lock the row: writers that already adjusted it commit first
+            stored = db.execute(
+                text("SELECT value FROM dashboard_counters WHERE name = :name FOR UPDATE"),
+                {"name": name},
+            ).scalar()
+            
+            actual = db.execute(text(query)).scalar()
+            
+            db.execute(
+                text("""
+                    UPDATE dashboard_counters
+                    SET value = :value, reconciled_at = :now, updated_at = :now
+                    WHERE name = :name
+                """),
+                {"name": name, "value": actual, "now": now},
+            )
+            
+            drift[name] = float(actual) - float(stored)
+            if drift[name] and not created:
+                print(f"⚠️  Counter {name} drifted by {drift[name]:+,.2f} (fixed)")
+        
+        db.commit()
+    
+    except Exception:
+        db.rollback()
+        raise
+    
+    return drift
@@ -1,65 +1,293 @@
 """
 Dashboard service for Star Citizen App.
 Provides dashboard statistics calculation and broadcasting functionality.
+
+Statistics are computed once and cached in dashboard_state. Writes to
+inventory, refining jobs or prices call invalidate_dashboard(); the
+state is then recomputed after a short debounce window and pushed as a
+diff on the "dashboard" WebSocket topic. HTTP reads return the cached
+state, so N clients cost one computation instead of N.
 """
 
+import base64
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session, selectinload
+
+from database import SessionLocal
+from models.refining_job import RefiningJob, RefiningJobMaterial
+from models.sale import Sale
+from services.counter_service import COUNTER_ACTIVE_REFINING, COUNTER_STOCK_TOTAL, get_counters
+from services.ws_manager import TOPIC_DASHBOARD, ws_manager
+
+# Writes within this window trigger a single recomputation
+DASHBOARD_DEBOUNCE_SECONDS = 2.0
+
+# Stock valuation modes (price used for each material)
+STOCK_VALUATION_AVERAGE = "average"        # Average of every recorded sell price
+STOCK_VALUATION_LATEST_UEX = "latest_uex"  # Latest UEX sell price (batch price cache)
+STOCK_VALUATION_BEST_SELL = "best_sell"    # Best latest sell price across sources
+STOCK_VALUATION_MODES = (
+    STOCK_VALUATION_AVERAGE,
+    STOCK_VALUATION_LATEST_UEX,
+    STOCK_VALUATION_BEST_SELL,
+)
+DEFAULT_STOCK_VALUATION = STOCK_VALUATION_AVERAGE
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+# Activity feed page sizes
+ACTIVITY_PAGE_SIZE = 20
+ACTIVITY_MAX_PAGE_SIZE = 100
 
-from models.material import Material
-from models.refining import RefiningJob
-from models.stock import Stock
-from models.market_price import MarketPrice
+# Activity feed entry kinds (also the tie-breaker order, descending)
+ACTIVITY_REFINING = "refining"
+ACTIVITY_SALE = "sale"
 
+# Cached state is recomputed on read past this age (catches writes made
+# by other processes, which only invalidate their own cache)
+DASHBOARD_MAX_AGE_SECONDS = 60
 
-def get_dashboard_stats(db: Session) -> Dict[str, Any]:
+
+class DashboardState:
+    """
+    Cached dashboard statistics with debounced recomputation.
+    
+    Thread-safe: read from the threadpool, invalidated from endpoints
+    and background jobs.
     """
-    Calculate and retrieve dashboard statistics.
     
-    Uses UEX prices for accurate stock valuation.
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._state: Optional[Dict[str, Any]] = None
+        self._computed_at: float = 0.0
+        self._lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def get(self, db: Session) -> Dict[str, Any]:
+        """
+        Return the cached statistics, computing them if missing or too old.
+        
+        Concurrent callers wait for a single computation.
+        
+        Args:
+            db: Database session used if a computation is needed
+        
+        Returns:
+            Dashboard statistics dictionary
+        """
+        state = self._fresh_state()
+        if state is not None:
+            return state
+        
+        with self._compute_lock:
+            # Another caller may have computed it while we waited
+            state = self._fresh_state()
+            if state is not None:
+                return state
+            
+            return self._store(compute_dashboard_stats(db))
+    
+    def invalidate(self) -> None:
+        """
+        Schedule a recomputation after the debounce window.
+        
+        Further calls during the window are coalesced into the same one.
+        """
+        with self._lock:
+            if self._timer is not None:
+                return
+            
+            self._timer = threading.Timer(DASHBOARD_DEBOUNCE_SECONDS, self._recompute)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def _fresh_state(self) -> Optional[Dict[str, Any]]:
+        """Cached state if it is younger than DASHBOARD_MAX_AGE_SECONDS."""
+        with self._lock:
+            if self._state is None:
+                return None
+            if time.monotonic() - self._computed_at > DASHBOARD_MAX_AGE_SECONDS:
+                return None
+            return self._state
+    
+    def _store(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Cache a new state and publish it to WebSocket clients if it changed.
+        
+        Args:
+            state: Freshly computed statistics
+        
+        Returns:
+            The stored state
+        """
+        with self._lock:
+            changed = state != self._state
+            self._state = state
+            self._computed_at = time.monotonic()
+        
+        if changed:
+            ws_manager.publish_state_threadsafe(TOPIC_DASHBOARD, state)
+        
+        return state
+    
+    def _recompute(self) -> None:
+        """Recompute the statistics (runs in the debounce timer thread)."""
+        with self._lock:
+            self._timer = None
+        
+        db = SessionLocal()
+        try:
+            with self._compute_lock:
+                self._store(compute_dashboard_stats(db))
+        except Exception as e:
+            print(f"⚠️  Dashboard recomputation failed: {e}")
+        finally:
+            db.close()
+
+
+# Global dashboard state cache
+dashboard_state = DashboardState()
+
+
+def get_dashboard_stats(
+    db: Session,
+    valuation: str = DEFAULT_STOCK_VALUATION
+) -> Dict[str, Any]:
+    """
+    Get GLOBAL dashboard statistics from the cache.
+    
+    Args:
+        db: Database session (used only if the cache must be filled)
+        valuation: Stock valuation mode used for estimated_stock_value
+    
+    Returns:
+        Dictionary containing stock totals, estimated values, and refining activity
+    
+    Raises:
+        ValueError: If the valuation mode is unknown
+    """
+    if valuation not in STOCK_VALUATION_MODES:
+        raise ValueError(f"Unknown stock valuation: {valuation}")
+    
+    stats = dashboard_state.get(db)
+    
+    if valuation == DEFAULT_STOCK_VALUATION:
+        return stats
+    
+    return {**stats, "estimated_stock_value": stats["stock_valuations"][valuation]}
+
+
+def invalidate_dashboard() -> None:
+    """
+    Signal that inventory, refining jobs or prices changed.
+    
+    Must be called after committing such writes. The dashboard is
+    recomputed once per debounce window and pushed to subscribers.
+    """
+    dashboard_state.invalidate()
+
+
+def compute_dashboard_stats(db: Session) -> Dict[str, Any]:
+    """
+    Calculate GLOBAL dashboard statistics (all users combined).
+    
+    No user filtering - shows organization-wide data.
     
     Args:
         db: Database session
-        
+    
     Returns:
         Dictionary containing stock totals, estimated values, and refining activity
     """
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
     
-    # Recent completed refining jobs
-    refining_history = _get_recent_refining_history(db, seven_days_ago)
-    
-    # Total stock quantity
-    stock_total = _calculate_total_stock(db)
+    # Total stock and active refining jobs (all users), from running counters
+    counters = get_counters(db)
     
-    # Estimated stock value using UEX prices
-    estimated_stock_value = _calculate_stock_value_uex(db)
+    # Estimated stock value using market prices (every mode in one query)
+    stock_valuations = _calculate_stock_values(db)
     
-    # Active refining jobs count
-    active_refining = _count_active_refining(db)
+    # Recent collected jobs (all users, last 7 days)
+    refining_history = _get_recent_refining_history(db, seven_days_ago)
     
     return {
-        "stock_total": int(stock_total),
-        "estimated_stock_value": int(estimated_stock_value),
-        "active_refining": active_refining,
+        "stock_total": counters[COUNTER_STOCK_TOTAL],
+        "estimated_stock_value": stock_valuations[DEFAULT_STOCK_VALUATION],
+        "stock_valuations": stock_valuations,
+        "active_refining": int(counters[COUNTER_ACTIVE_REFINING]),
         "refining_history": _format_refining_history(refining_history),
     }
 
 
-def broadcast_dashboard(db: Session) -> None:
+def get_activity_feed(
+    db: Session,
+    limit: int = ACTIVITY_PAGE_SIZE,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
     """
-    Broadcast dashboard updates to connected clients.
+    Get one page of the organization activity timeline, newest first.
     
-    This is currently a stub function for future WebSocket implementation.
+    The timeline merges collected refining jobs and sales. Pages use
+    keyset (cursor) pagination on (occurred_at, kind, id): each page
+    reads at most limit + 1 rows per source through an index, whatever
+    the depth in the timeline.
     
     Args:
         db: Database session
+        limit: Page size (capped to ACTIVITY_MAX_PAGE_SIZE)
+        cursor: Opaque cursor returned as next_cursor by the previous page
+    
+    Returns:
+        Dictionary with items and next_cursor (None on the last page)
+    
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    limit = max(1, min(limit, ACTIVITY_MAX_PAGE_SIZE))
+    before = _decode_activity_cursor(cursor) if cursor else None
+    
+    rows = _query_activity_page(db, limit + 1, before)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    items = _hydrate_activity(db, rows)
+    
+    next_cursor = None
+    if has_more and rows:
+        kind, entry_id, occurred_at = rows[-1]
+        next_cursor = _encode_activity_cursor(occurred_at, kind, entry_id)
+    
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def notify_job_update(job: RefiningJob) -> None:
+    """
+    Notify the owner of a refining job that its status changed.
+    
+    Published on the "jobs:{user_id}" topic, so only the owner's
+    connections receive it.
+    
+    Args:
+        job: Refining job that was created, collected or cancelled
     """
-    # TODO: Implement WebSocket broadcasting when real-time updates are needed
-    pass
+    if job.user_id is None:
+        return
+    
+    ws_manager.publish_threadsafe(f"jobs:{job.user_id}", {
+        "type": "JOB_UPDATE",
+        "topic": f"jobs:{job.user_id}",
+        "payload": {
+            "id": job.id,
+            "status": job.status,
+            "refinery_id": job.refinery_id,
+            "end_time": job.end_time,
+            "collected_at": job.collected_at,
+        },
+    })
 
 
 # ============================================================================
@@ -67,136 +295,273 @@ def broadcast_dashboard(db: Session) -> None:
 # ============================================================================
 
 def _get_recent_refining_history(
-    db: Session, 
+    db: Session,
     since: datetime
 ) -> List[RefiningJob]:
     """
-    Retrieve recent completed refining jobs.
+    Retrieve recently collected refining jobs.
     
     Args:
         db: Database session
         since: Datetime threshold for filtering jobs
-        
+    
     Returns:
-        List of completed RefiningJob instances (max 5, newest first)
+        List of collected RefiningJob instances (max 5, newest first)
     """
     return (
         db.query(RefiningJob)
+        .options(
+            selectinload(RefiningJob.materials).selectinload(RefiningJobMaterial.material)
+        )
         .filter(
-            RefiningJob.status == "DONE",
-            RefiningJob.completed_at >= since,
+            RefiningJob.status == "collected",
+            RefiningJob.collected_at >= since,
         )
-        .order_by(RefiningJob.completed_at.desc())
+        .order_by(RefiningJob.collected_at.desc())
         .limit(5)
         .all()
     )
 
 
-def _calculate_total_stock(db: Session) -> int:
+def _calculate_stock_values(db: Session) -> Dict[str, float]:
     """
-    Calculate total quantity of all stock items.
+    Calculate total stock value for every valuation mode.
+    
+    Inventory is summed per material in SQL, together with the two
+    prices the latest-price API cannot serve (average over every recorded
+    price, best latest price across sources). Latest UEX prices
+    (?valuation=latest_uex) are read through the batch price cache shared
+    with trades.
     
     Args:
         db: Database session
-        
+    
+    Returns:
+        Total estimated stock value per mode (0 if no stock exists)
+    """
+    # Imported here: pricing_service -> uex_service -> dashboard_service
+    from services.pricing_service import get_latest_sell_prices
+    
+    rows = db.execute(
+        text("""
+            WITH stock AS (
+                SELECT material_id, SUM(quantity) AS quantity
+                FROM inventory
+                WHERE quantity > 0
+                GROUP BY material_id
+            ),
+            average_prices AS (
+                SELECT mp.material_id, AVG(mp.sell_price) AS price
+                FROM market_prices mp
+                JOIN stock s ON s.material_id = mp.material_id
+                GROUP BY mp.material_id
+            ),
+            best_prices AS (
+                SELECT lp.material_id, MAX(lp.sell_price) AS price
+                FROM latest_market_prices lp
+                JOIN stock s ON s.material_id = lp.material_id
+                GROUP BY lp.material_id
+            )
+            SELECT
+                s.material_id,
+                s.quantity,
+                ap.price AS average_price,
+                bp.price AS best_price
+            FROM stock s
+            LEFT JOIN average_prices ap ON ap.material_id = s.material_id
+            LEFT JOIN best_prices bp ON bp.material_id = s.material_id
+        """)
+    ).all()
+    
+    uex_prices = get_latest_sell_prices([row.material_id for row in rows], db, source="UEX")
+    
+    values = dict.fromkeys(STOCK_VALUATION_MODES, 0.0)
+    for row in rows:
+        quantity = float(row.quantity)
+        values[STOCK_VALUATION_AVERAGE] += quantity * float(row.average_price or 0)
+        values[STOCK_VALUATION_LATEST_UEX] += quantity * (uex_prices[row.material_id] or 0)
+        values[STOCK_VALUATION_BEST_SELL] += quantity * float(row.best_price or 0)
+    
+    return values
+
+
+def _format_refining_history(jobs: List[RefiningJob]) -> List[Dict[str, Any]]:
+    """
+    Format refining jobs for API response.
+    
+    Args:
+        jobs: List of RefiningJob instances
+    
     Returns:
-        Total stock quantity (0 if no stock exists)
+        List of formatted job dictionaries with material info and completion details
     """
-    return db.query(func.coalesce(func.sum(Stock.quantity), 0)).scalar()
+    return [
+        {
+            "id": job.id,
+            "material": ", ".join([m.material.name for m in job.materials]) if job.materials else "Unknown",
+            "quantity": sum([m.quantity_refined for m in job.materials]) if job.materials else 0,
+            "ended_at": job.collected_at or job.end_time,
+        }
+        for job in jobs
+    ]
 
 
-def _calculate_stock_value_uex(db: Session) -> float:
+def _query_activity_page(
+    db: Session,
+    fetch: int,
+    before: Optional[Tuple[datetime, str, int]]
+) -> List[Tuple[str, int, datetime]]:
     """
-    Calculate total estimated value of all stock using UEX prices.
+    Fetch the (kind, id, occurred_at) keys of one activity page.
     
-    This joins Stock with the latest UEX MarketPrice to get accurate valuations.
-    Falls back to Material.sell_price if no UEX price exists.
+    Each source is filtered with a row comparison on (timestamp, id) and
+    limited before the merge, so both branches are index range scans.
     
     Args:
         db: Database session
-        
+        fetch: Number of rows to fetch
+        before: Cursor position (occurred_at, kind, id), None for the first page
+    
     Returns:
-        Total estimated stock value (0 if no stock exists)
+        List of (kind, id, occurred_at), newest first
     """
-    # Subquery to get latest UEX price for each material
-    latest_uex_price = (
-        db.query(
-            MarketPrice.material_id,
-            func.max(MarketPrice.collected_at).label('max_date')
-        )
-        .filter(MarketPrice.source == 'UEX')
-        .group_by(MarketPrice.material_id)
-        .subquery()
-    )
+    params: Dict[str, Any] = {"fetch": fetch}
+    conditions = {}
     
-    # Join with actual prices
-    uex_prices = (
-        db.query(
-            MarketPrice.material_id,
-            MarketPrice.sell_price
-        )
-        .join(
-            latest_uex_price,
-            (MarketPrice.material_id == latest_uex_price.c.material_id) &
-            (MarketPrice.collected_at == latest_uex_price.c.max_date)
-        )
-        .subquery()
-    )
+    for kind in (ACTIVITY_REFINING, ACTIVITY_SALE):
+        if before is None:
+            conditions[kind] = ""
+            continue
+        
+        before_at, before_kind, before_id = before
+        # Same timestamp: kinds sort descending, then ids descending
+        if kind == before_kind:
+            bound_id = before_id
+        elif kind < before_kind:
+            bound_id = 2 ** 31 - 1
+        else:
+            bound_id = 0
+        
+        params[f"{kind}_at"] = before_at
+        params[f"{kind}_id"] = bound_id
+        conditions[kind] = f"AND (ts, id) < (:{kind}_at, :{kind}_id)"
     
-    # Calculate total value using UEX prices, fallback to Material.sell_price
-    total_value = (
-        db.query(
-            func.coalesce(
-                func.sum(
-                    Stock.quantity * func.coalesce(
-                        uex_prices.c.sell_price,
-                        Material.sell_price
-                    )
-                ),
-                0
-            )
-        )
-        .join(Material, Stock.material_id == Material.id)
-        .outerjoin(uex_prices, Stock.material_id == uex_prices.c.material_id)
-        .scalar()
-    )
+    rows = db.execute(
+        text(f"""
+            SELECT kind, id, ts FROM (
+                (
+                    SELECT '{ACTIVITY_REFINING}' AS kind, id, ts FROM (
+                        SELECT rj.id, rj.collected_at AS ts
+                        FROM refining_jobs rj
+                        WHERE rj.status = 'collected' AND rj.collected_at IS NOT NULL
+                    ) jobs
+                    WHERE TRUE {conditions[ACTIVITY_REFINING]}
+                    ORDER BY ts DESC, id DESC
+                    LIMIT :fetch
+                )
+                UNION ALL
+                (
+                    SELECT '{ACTIVITY_SALE}' AS kind, id, ts FROM (
+                        SELECT s.id, s.sale_date AS ts
+                        FROM sales s
+                        WHERE s.sale_date IS NOT NULL
+                    ) sales
+                    WHERE TRUE {conditions[ACTIVITY_SALE]}
+                    ORDER BY ts DESC, id DESC
+                    LIMIT :fetch
+                )
+            ) feed
+            ORDER BY ts DESC, kind DESC, id DESC
+            LIMIT :fetch
+        """),
+        params,
+    ).fetchall()
     
-    return float(total_value)
+    return [(row[0], row[1], row[2]) for row in rows]
 
 
-def _count_active_refining(db: Session) -> int:
+def _hydrate_activity(
+    db: Session,
+    rows: List[Tuple[str, int, datetime]]
+) -> List[Dict[str, Any]]:
     """
-    Count currently running refining jobs.
+    Load the details of an activity page with one query per source.
     
     Args:
         db: Database session
-        
+        rows: Page keys from _query_activity_page
+    
     Returns:
-        Number of active refining jobs
+        List of formatted activity entries, in page order
     """
-    return (
-        db.query(RefiningJob)
-        .filter(RefiningJob.status == "RUNNING")
-        .count()
-    )
+    job_ids = [entry_id for kind, entry_id, _ in rows if kind == ACTIVITY_REFINING]
+    sale_ids = [entry_id for kind, entry_id, _ in rows if kind == ACTIVITY_SALE]
+    
+    jobs = {}
+    if job_ids:
+        jobs = {
+            job.id: job
+            for job in db.query(RefiningJob)
+            .options(
+                selectinload(RefiningJob.refinery),
+                selectinload(RefiningJob.materials).selectinload(RefiningJobMaterial.material),
+            )
+            .filter(RefiningJob.id.in_(job_ids))
+        }
+    
+    sales = {}
+    if sale_ids:
+        sales = {
+            sale.id: sale
+            for sale in db.query(Sale)
+            .options(selectinload(Sale.material))
+            .filter(Sale.id.in_(sale_ids))
+        }
+    
+    items = []
+    for kind, entry_id, occurred_at in rows:
+        if kind == ACTIVITY_REFINING and entry_id in jobs:
+            job = jobs[entry_id]
+            items.append({
+                **_format_refining_history([job])[0],
+                "kind": ACTIVITY_REFINING,
+                "occurred_at": occurred_at,
+                "refinery": job.refinery.name if job.refinery else None,
+                "user_id": job.user_id,
+            })
+        elif kind == ACTIVITY_SALE and entry_id in sales:
+            sale = sales[entry_id]
+            items.append({
+                "id": sale.id,
+                "kind": ACTIVITY_SALE,
+                "occurred_at": occurred_at,
+                "material": sale.material.name if sale.material else "Unknown",
+                "quantity": float(sale.quantity_sold),
+                "total_revenue": float(sale.total_revenue),
+                "user_id": sale.user_id,
+            })
+    
+    return items
 
 
-def _format_refining_history(jobs: List[RefiningJob]) -> List[Dict[str, Any]]:
+def _encode_activity_cursor(occurred_at: datetime, kind: str, entry_id: int) -> str:
+    """Encode a feed position as an opaque URL-safe cursor."""
+    raw = f"{occurred_at.isoformat()}|{kind}|{entry_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_activity_cursor(cursor: str) -> Tuple[datetime, str, int]:
     """
-    Format refining jobs for API response.
+    Decode a cursor produced by _encode_activity_cursor.
     
-    Args:
-        jobs: List of RefiningJob instances
-        
-    Returns:
-        List of formatted job dictionaries with material info and completion details
+    Raises:
+        ValueError: If the cursor is malformed
     """
-    return [
-        {
-            "id": job.id,
-            "material": job.output_material.name if job.output_material else "Unknown",
-            "quantity": job.output_quantity,
-            "ended_at": job.completed_at,
-        }
-        for job in jobs
-    ]
\ No newline at end of file
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        occurred_at, kind, entry_id = raw.split("|")
+        if kind not in (ACTIVITY_REFINING, ACTIVITY_SALE):
+            raise ValueError(kind)
+        return datetime.fromisoformat(occurred_at), kind, int(entry_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid activity cursor") from e
@@ -0,0 +1,97 @@
+"""
+Login throttle for Star Citizen App.
+Limits failed login attempts per username (in-process sliding window).
+
+Each failed attempt costs a bcrypt verification; throttling repeated
+failures keeps a password-guessing burst on one account from tying up
+the password hashing pool.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque
+
+# Failed attempts allowed per username within the window
+LOGIN_MAX_FAILURES = 5
+LOGIN_FAILURE_WINDOW_SECONDS = 300
+
+# Usernames tracked at most (oldest dropped first, bounds memory)
+LOGIN_THROTTLE_MAX_TRACKED = 10_000
+
+
+class LoginThrottle:
+    """Thread-safe per-username sliding window of failed logins."""
+    
+    def __init__(self):
+        """Initialize with no tracked usernames."""
+        self._failures: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def retry_after(self, username: str) -> int:
+        """
+        Check whether a username may attempt to log in.
+        
+        Args:
+            username: Username being logged in
+        
+        Returns:
+            Seconds to wait before the next attempt (0 if allowed)
+        """
+        now = time.monotonic()
+        
+        with self._lock:
+            failures = self._failures.get(_key(username))
+            if not failures:
+                return 0
+            
+            _prune(failures, now)
+            if len(failures) < LOGIN_MAX_FAILURES:
+                return 0
+            
+            return max(1, math.ceil(failures[0] + LOGIN_FAILURE_WINDOW_SECONDS - now))
+    
+    def record_failure(self, username: str) -> None:
+        """
+        Record a failed attempt.
+        
+        Args:
+            username: Username that failed to log in
+        """
+        now = time.monotonic()
+        key = _key(username)
+        
+        with self._lock:
+            failures = self._failures.setdefault(key, deque())
+            self._failures.move_to_end(key)
+            _prune(failures, now)
+            failures.append(now)
+            
+            while len(self._failures) > LOGIN_THROTTLE_MAX_TRACKED:
+                self._failures.popitem(last=False)
+    
+    def reset(self, username: str) -> None:
+        """
+        Forget failed attempts after a successful login.
+        
+        Args:
+            username: Username that logged in
+        """
+        with self._lock:
+            self._failures.pop(_key(username), None)
+
+
+def _key(username: str) -> str:
+    """Normalize a username so case variations share one window."""
+    return username.strip().lower()
+
+
+def _prune(failures: Deque[float], now: float) -> None:
+    """Drop attempts older than the window."""
+    while failures and failures[0] <= now - LOGIN_FAILURE_WINDOW_SECONDS:
+        failures.popleft()
+
+
+# Global login throttle
+login_throttle = LoginThrottle()
@@ -0,0 +1,110 @@
+"""
+Price cache for Star Citizen App.
+Small in-process LRU cache with TTL for latest material prices.
+
+Kept in its own module so price writers (UEX services, snapshot jobs)
+can invalidate it without importing pricing_service.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Tuple
+
+# Cache sizing
+PRICE_CACHE_MAX_ENTRIES = 2048
+PRICE_CACHE_TTL_SECONDS = 300
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed TTL.
+
+    Entries are evicted least-recently-used first once max_entries is reached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            ttl_seconds: Lifetime of an entry in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], list]:
+        """
+        Look up several keys at once.
+
+        Args:
+            keys: Keys to look up
+
+        Returns:
+            Tuple of (hits dict, list of missing or expired keys)
+        """
+        now = time.monotonic()
+        hits: Dict[Hashable, Any] = {}
+        misses = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or entry[0] <= now:
+                    self._entries.pop(key, None)
+                    misses.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                hits[key] = entry[1]
+
+        return hits, misses
+
+    def set_many(self, values: Dict[Hashable, Any]) -> None:
+        """
+        Store several values, evicting the oldest entries if needed.
+
+        Args:
+            values: Mapping of key to value
+        """
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: Iterable[Hashable]) -> None:
+        """
+        Drop specific entries.
+        
+        Args:
+            keys: Keys to remove (missing keys are ignored)
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+# Global latest-price cache, keyed by (source, material_id)
+latest_price_cache = TTLCache(PRICE_CACHE_MAX_ENTRIES, PRICE_CACHE_TTL_SECONDS)
+
+
+def invalidate_price_cache() -> None:
+    """
+    Invalidate cached prices after a price write.
+
+    Must be called by any code path that inserts or updates market_prices
+    in this process. Writes from other processes are picked up once the TTL expires.
+    """
+    latest_price_cache.clear()
@@ -0,0 +1,433 @@
+"""
+Price scheduler for Star Citizen App.
+Runs UEX price refreshes, price-history snapshots, dashboard counter
+reconciliation and stock balance snapshots inside the API process.
+
+- Periodic runs use configurable intervals with random jitter so replicas
+  started together do not hit UEX at the same instant.
+- Each job kind is single-flight within the process (asyncio.Lock): a manual
+  trigger while a run is in progress returns the running job.
+- Across replicas, a PostgreSQL advisory lock ensures only one process runs
+  a given job kind at a time; the others record the run as skipped.
+- Every replica runs its own periodic loops, so the price snapshot also
+  skips a scheduled run when price_history already has a snapshot younger
+  than PRICE_SNAPSHOT_INTERVAL_MINUTES (taken by another replica).
+- Blocking work (HTTP to UEX, DB writes) runs in a worker thread.
+"""
+
+import asyncio
+import concurrent.futures
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from core.config import config
+from database import SessionLocal, engine
+from models.price_history import PriceHistory
+from services.counter_service import reconcile_counters
+from services.price_snapshot_service import create_price_snapshot
+from services.stock_service import snapshot_stock_balances
+from services.uex.uex_service import refresh_all_prices
+
+# Job kinds
+JOB_PRICE_REFRESH = "price_refresh"
+JOB_PRICE_SNAPSHOT = "price_snapshot"
+JOB_COUNTER_RECONCILE = "counter_reconcile"
+JOB_STOCK_SNAPSHOT = "stock_snapshot"
+
+# Advisory lock keys (arbitrary, but stable across deploys)
+ADVISORY_LOCK_KEYS = {
+    JOB_PRICE_REFRESH: 7_310_001,
+    JOB_PRICE_SNAPSHOT: 7_310_002,
+    JOB_COUNTER_RECONCILE: 7_310_003,
+    JOB_STOCK_SNAPSHOT: 7_310_004,
+}
+
+# Number of finished jobs kept for the status endpoint
+MAX_TRACKED_JOBS = 100
+
+# Minimum delay between two on-demand revalidations (avoids hammering UEX when it is down)
+REVALIDATION_COOLDOWN_SECONDS = 300
+
+
+class JobSkipped(Exception):
+    """Raised by a job runner when there is nothing to do (job recorded as skipped)."""
+
+
+class PriceScheduler:
+    """
+    In-process scheduler for price maintenance jobs.
+
+    Keeps a bounded registry of job records so API clients can poll the
+    status of a triggered run by job id.
+    """
+
+    def __init__(self):
+        """Initialize scheduler with no running tasks."""
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._running: Dict[str, str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._triggered: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_requested: Dict[str, float] = {}
+        self._finished: Dict[str, asyncio.Event] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the periodic refresh, snapshot, reconciliation and stock snapshot loops."""
+        self._loop = asyncio.get_running_loop()
+
+        if not config.PRICE_SCHEDULER_ENABLED:
+            print("⏸️  Price scheduler disabled")
+            return
+
+        self._tasks = [
+            asyncio.create_task(
+                self._run_periodically(JOB_PRICE_REFRESH, config.PRICE_REFRESH_INTERVAL_MINUTES)
+            ),
+            asyncio.create_task(
+                self._run_periodically(JOB_PRICE_SNAPSHOT, config.PRICE_SNAPSHOT_INTERVAL_MINUTES)
+            ),
+            asyncio.create_task(
+                self._run_periodically(JOB_COUNTER_RECONCILE, config.COUNTER_RECONCILE_INTERVAL_MINUTES)
+            ),
+            asyncio.create_task(
+                self._run_periodically(JOB_STOCK_SNAPSHOT, config.STOCK_SNAPSHOT_INTERVAL_MINUTES)
+            ),
+        ]
+        print(
+            f"⏱️  Price scheduler started (refresh every {config.PRICE_REFRESH_INTERVAL_MINUTES} min, "
+            f"snapshot every {config.PRICE_SNAPSHOT_INTERVAL_MINUTES} min, "
+            f"counter reconciliation every {config.COUNTER_RECONCILE_INTERVAL_MINUTES} min, "
+            f"stock snapshot every {config.STOCK_SNAPSHOT_INTERVAL_MINUTES} min)"
+        )
+
+    async def stop(self) -> None:
+        """Cancel the periodic loops and wait for them to exit."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    # Triggers & status
+    # ------------------------------------------------------------------
+
+    def trigger(self, kind: str, force: bool = False) -> Dict[str, Any]:
+        """
+        Trigger a job without waiting for it to complete.
+
+        If a job of the same kind is already running in this process,
+        its record is returned instead of starting a new one.
+
+        Args:
+            kind: Job kind (JOB_PRICE_REFRESH, JOB_PRICE_SNAPSHOT, JOB_COUNTER_RECONCILE
+                or JOB_STOCK_SNAPSHOT)
+            force: Bypass the UEX cache TTL (price refresh) or the
+                recent-snapshot check (price snapshot)
+
+        Returns:
+            Job record (id, kind, status, timestamps)
+        """
+        running_id = self._running.get(kind)
+        if running_id:
+            return self.jobs[running_id]
+
+        job = self._create_job(kind, trigger="manual")
+        self._running[kind] = job["id"]
+        task = asyncio.create_task(self._execute(job, force=force))
+        self._triggered.add(task)
+        task.add_done_callback(self._triggered.discard)
+        return job
+
+    def request(self, kind: str) -> bool:
+        """
+        Request a background run from any thread (e.g. a sync endpoint).
+
+        Used for stale-while-revalidate: the caller does not wait and
+        concurrent requests collapse into the single in-flight job.
+        Requests within REVALIDATION_COOLDOWN_SECONDS of the previous one
+        are ignored.
+
+        Args:
+            kind: Job kind
+
+        Returns:
+            True if a revalidation is scheduled or in flight, False if the
+            scheduler is not running
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+
+        now = time.monotonic()
+        if now - self._last_requested.get(kind, float("-inf")) < REVALIDATION_COOLDOWN_SECONDS:
+            return self.is_running(kind)
+        self._last_requested[kind] = now
+
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        if current_loop is loop:
+            self.trigger(kind)
+        else:
+            loop.call_soon_threadsafe(self.trigger, kind)
+
+        return True
+
+    def wait(self, kind: str, timeout: float) -> bool:
+        """
+        Wait from a worker thread for the in-flight job of a kind to finish.
+        
+        Must not be called from the event loop thread (returns False).
+        
+        Args:
+            kind: Job kind
+            timeout: Maximum wait in seconds (the job keeps running after it)
+        
+        Returns:
+            True if a job was in flight and finished within the timeout
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+        
+        try:
+            asyncio.get_running_loop()
+            return False
+        except RuntimeError:
+            pass
+        
+        # Queued after any trigger scheduled by request(): sees its job
+        future = asyncio.run_coroutine_threadsafe(self._wait_for(kind), loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            return False
+    
+    def is_running(self, kind: str) -> bool:
+        """
+        Check whether a job of the given kind is in flight in this process.
+
+        Args:
+            kind: Job kind
+
+        Returns:
+            True if a job is queued or running
+        """
+        return kind in self._running
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job record by id.
+
+        Args:
+            job_id: Job identifier returned by trigger()
+
+        Returns:
+            Job record, or None if unknown or evicted
+        """
+        return self.jobs.get(job_id)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    async def _run_periodically(self, kind: str, interval_minutes: int) -> None:
+        """
+        Run a job forever at a fixed interval plus random jitter.
+
+        Args:
+            kind: Job kind
+            interval_minutes: Base interval between runs
+        """
+        while True:
+            delay = interval_minutes * 60 + random.uniform(0, config.PRICE_SCHEDULER_JITTER_SECONDS)
+            await asyncio.sleep(delay)
+
+            if kind in self._running:
+                continue
+
+            job = self._create_job(kind, trigger="scheduled")
+            self._running[kind] = job["id"]
+            await self._execute(job)
+
+    async def _wait_for(self, kind: str) -> bool:
+        """Wait for the in-flight job of a kind, False if none."""
+        job_id = self._running.get(kind)
+        finished = self._finished.get(job_id) if job_id else None
+        if finished is None:
+            return False
+        
+        await finished.wait()
+        return True
+    
+    async def _execute(self, job: Dict[str, Any], force: bool = False) -> None:
+        """
+        Execute a job under the single-flight lock and record its outcome.
+
+        Args:
+            job: Job record to update in place
+            force: Bypass the UEX cache TTL or the recent-snapshot check
+        """
+        kind = job["kind"]
+        lock = self._locks.setdefault(kind, asyncio.Lock())
+
+        try:
+            async with lock:
+                job["status"] = "running"
+                job["started_at"] = datetime.utcnow().isoformat()
+
+                runner = _JOB_RUNNERS[kind]
+                acquired, result = await asyncio.to_thread(
+                    _run_with_advisory_lock, kind, runner, force
+                )
+
+                job["status"] = "success" if acquired else "skipped"
+                job["result"] = result if acquired else {"message": "Running on another instance"}
+
+        except JobSkipped as e:
+            job["status"] = "skipped"
+            job["result"] = {"message": str(e)}
+        
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            print(f"❌ Scheduled {kind} failed: {e}")
+
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat()
+            self._running.pop(kind, None)
+            self._finished.pop(job["id"]).set()
+
+    def _create_job(self, kind: str, trigger: str) -> Dict[str, Any]:
+        """
+        Register a new queued job record.
+
+        Args:
+            kind: Job kind
+            trigger: "manual" or "scheduled"
+
+        Returns:
+            The new job record
+        """
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "trigger": trigger,
+            "status": "queued",
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+
+        self.jobs[job["id"]] = job
+        self._finished[job["id"]] = asyncio.Event()
+        while len(self.jobs) > MAX_TRACKED_JOBS:
+            self.jobs.popitem(last=False)
+
+        return job
+
+
+def _run_with_advisory_lock(
+    kind: str,
+    runner: Callable[[Session, bool], Any],
+    force: bool,
+) -> tuple:
+    """
+    Run a job while holding a PostgreSQL session advisory lock.
+
+    Runs in a worker thread. The lock is held on a dedicated connection
+    for the duration of the job and released afterwards.
+
+    Args:
+        kind: Job kind (selects the advisory lock key)
+        runner: Function executing the job with a DB session
+        force: Passed through to the runner
+
+    Returns:
+        Tuple (lock acquired, runner result)
+    """
+    lock_key = ADVISORY_LOCK_KEYS[kind]
+
+    with engine.connect() as lock_conn:
+        acquired = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": lock_key}
+        ).scalar()
+        lock_conn.commit()
+
+        if not acquired:
+            return False, None
+
+        try:
+            db = SessionLocal()
+            try:
+                return True, runner(db, force)
+            finally:
+                db.close()
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": lock_key})
+            lock_conn.commit()
+
+
+def _run_price_refresh(db: Session, force: bool) -> Dict[str, Any]:
+    """Refresh all UEX prices."""
+    return refresh_all_prices(db, force=force)
+
+
+def _run_price_snapshot(db: Session, force: bool) -> Dict[str, Any]:
+    """
+    Snapshot current prices into price_history.
+    
+    The advisory lock only serializes runs: without this check each
+    replica would write its own full snapshot every interval.
+    
+    Raises:
+        JobSkipped: A snapshot younger than the interval already exists
+            (unless force)
+    """
+    if not force:
+        last_recorded_at = db.query(func.max(PriceHistory.recorded_at)).scalar()
+        interval = timedelta(minutes=config.PRICE_SNAPSHOT_INTERVAL_MINUTES)
+        if last_recorded_at and datetime.utcnow() - last_recorded_at < interval:
+            raise JobSkipped(f"Snapshot already taken at {last_recorded_at.isoformat()}")
+    
+    return {"snapshots_created": create_price_snapshot(db)}
+
+
+def _run_counter_reconcile(db: Session, force: bool) -> Dict[str, Any]:
+    """Recompute dashboard counters and report drift."""
+    return {"drift": reconcile_counters(db)}
+
+
+def _run_stock_snapshot(db: Session, force: bool) -> Dict[str, Any]:
+    """Advance the stock balance snapshots."""
+    return {"snapshots_written": snapshot_stock_balances(db)}
+
+
+_JOB_RUNNERS: Dict[str, Callable[[Session, bool], Any]] = {
+    JOB_PRICE_REFRESH: _run_price_refresh,
+    JOB_PRICE_SNAPSHOT: _run_price_snapshot,
+    JOB_COUNTER_RECONCILE: _run_counter_reconcile,
+    JOB_STOCK_SNAPSHOT: _run_stock_snapshot,
+}
+
+
+# Global price scheduler instance
+price_scheduler = PriceScheduler()
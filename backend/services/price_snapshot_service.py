@@ -0,0 +1,60 @@
+"""
+Price snapshot service for Star Citizen App.
+Copies current market prices into the price history table.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models.market_price import MarketPrice
+from models.price_history import PriceHistory
+
+
+def create_price_snapshot(db: Session, recorded_at: Optional[datetime] = None) -> int:
+    """
+    Snapshot every current market price into price_history.
+
+    Prices without a real location (e.g. UEX_ESTIMATED) are skipped since
+    price_history requires a location_id.
+
+    Args:
+        db: Database session
+        recorded_at: Snapshot timestamp (defaults to now)
+
+    Returns:
+        Number of snapshot rows created
+
+    Raises:
+        Exception: Any database error (the session is rolled back first)
+    """
+    recorded_at = recorded_at or datetime.utcnow()
+    snapshots_created = 0
+
+    try:
+        current_prices = db.query(MarketPrice).filter(
+            MarketPrice.sell_price.isnot(None),
+            MarketPrice.location_id.isnot(None),
+        ).all()
+
+        for price in current_prices:
+            db.add(
+                PriceHistory(
+                    material_id=price.material_id,
+                    location_id=price.location_id,
+                    buy_price=price.buy_price,
+                    sell_price=price.sell_price,
+                    recorded_at=recorded_at,
+                    source=price.source or "SNAPSHOT",
+                )
+            )
+            snapshots_created += 1
+
+        db.commit()
+
+    except Exception:
+        db.rollback()
+        raise
+
+    return snapshots_created
@@ -3,17 +3,26 @@ Pricing service for Star Citizen App.
 Manages price retrieval and caching for materials from various sources.
 """
 
-from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
-from models.market_price import MarketPrice
+from models.latest_market_price import LatestMarketPrice
+from services.price_cache import latest_price_cache
+from services.price_scheduler import JOB_PRICE_REFRESH, price_scheduler
 from services.uex.quantanium_service import refresh_quantanium_price
+from services.uex.uex_service import (
+    CACHE_EXPIRED,
+    CACHE_FRESH,
+    CACHE_STALE,
+    get_cache_age,
+    get_cache_state,
+)
 
-# Cache TTL for price data
-PRICE_CACHE_TTL_HOURS = 12
+# Maximum time a request waits for the hard-expiry refresh before serving
+# last-known prices (the refresh keeps running in the background)
+HARD_EXPIRY_WAIT_SECONDS = 5
 
 
 def get_latest_sell_price(material_id: int, db: Session) -> Optional[float]:
@@ -34,14 +43,7 @@ def get_latest_sell_price(material_id: int, db: Session) -> Optional[float]:
         For dashboard estimates, use get_latest_uex_sell_price() instead
         to ensure consistent pricing source.
     """
-    price_record = (
-        db.query(MarketPrice)
-        .filter(MarketPrice.material_id == material_id)
-        .order_by(desc(MarketPrice.collected_at))
-        .first()
-    )
-    
-    return price_record.sell_price if price_record else None
+    return get_latest_sell_prices([material_id], db).get(material_id)
 
 
 def get_latest_uex_sell_price(material_id: int, db: Session) -> Optional[float]:
@@ -58,25 +60,52 @@ def get_latest_uex_sell_price(material_id: int, db: Session) -> Optional[float]:
     Returns:
         Latest UEX sell price, or None if no UEX price data exists
     """
-    price_record = (
-        db.query(MarketPrice)
-        .filter(
-            MarketPrice.material_id == material_id,
-            MarketPrice.source == "UEX",
-        )
-        .order_by(desc(MarketPrice.collected_at))
-        .first()
-    )
+    return get_latest_sell_prices([material_id], db, source="UEX").get(material_id)
+
+
+def get_latest_sell_prices(
+    material_ids: Iterable[int],
+    db: Session,
+    source: Optional[str] = None,
+) -> Dict[int, Optional[float]]:
+    """
+    Get the most recent sell price for several materials in one query.
+    
+    Reads from the trigger-maintained latest_market_prices table through
+    a read-through LRU cache (see services.price_cache). Only materials
+    missing from the cache are queried, all in a single statement.
     
-    return price_record.sell_price if price_record else None
+    Args:
+        material_ids: IDs of the materials to price
+        db: Database session
+        source: Restrict to a price source (e.g. "UEX"), None for any source
+        
+    Returns:
+        Dictionary mapping every requested material ID to its latest
+        sell price, or None if no price data exists
+    """
+    keys = [(source, material_id) for material_id in dict.fromkeys(material_ids)]
+    if not keys:
+        return {}
+    
+    cached, missing = latest_price_cache.get_many(keys)
+    
+    if missing:
+        fetched = _query_latest_sell_prices([key[1] for key in missing], db, source)
+        loaded = {key: fetched.get(key[1]) for key in missing}
+        latest_price_cache.set_many(loaded)
+        cached.update(loaded)
+    
+    return {material_id: cached[(src, material_id)] for src, material_id in keys}
 
 
 def ensure_quantanium_price(db: Session) -> None:
     """
     Ensure Quantanium price data exists in the database.
     
-    Checks if recent UEX price data exists and refreshes it if needed.
-    Protected by TTL to avoid excessive API calls.
+    Uses stale-while-revalidate: fresh data is left alone, stale data is
+    kept and a background refresh is requested, and only missing or
+    hard-expired data is refreshed synchronously.
     
     Args:
         db: Database session
@@ -85,34 +114,102 @@ def ensure_quantanium_price(db: Session) -> None:
         This function is typically called during application startup
         to ensure price data is available for initial requests.
     """
-    # Check if we have recent price data
-    if _has_recent_uex_price(db):
+    state = get_cache_state(get_cache_age(db))
+    
+    if state == CACHE_FRESH:
+        return
+    
+    if state == CACHE_STALE and price_scheduler.request(JOB_PRICE_REFRESH):
         return
     
-    # Refresh price if cache is stale
-    refresh_quantanium_price(db)
+    # Hard expiry (or no scheduler): refresh before serving
+    refresh_quantanium_price(db, force=True)
+
+
+def get_price_freshness(db: Session) -> Dict[str, Any]:
+    """
+    Describe how old the UEX prices currently served are.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Dictionary with age (seconds, None if no price), state
+        (fresh/stale/expired) and whether a revalidation is in flight
+    """
+    age = get_cache_age(db)
+    
+    return {
+        "age": int(age) if age is not None else None,
+        "state": get_cache_state(age),
+        "revalidating": price_scheduler.is_running(JOB_PRICE_REFRESH),
+    }
 
 
-def _has_recent_uex_price(db: Session) -> bool:
+def revalidate_prices_if_needed(db: Session) -> Dict[str, Any]:
     """
-    Check if recent UEX price data exists within cache TTL.
+    Apply stale-while-revalidate to the UEX price cache.
+    
+    - fresh: nothing to do
+    - stale: last-known prices are served, one background refresh is
+      requested (single-flight through the price scheduler)
+    - expired: the same single-flight refresh is requested and the
+      request waits for it up to HARD_EXPIRY_WAIT_SECONDS; on timeout or
+      failure last-known prices are served. The scheduler's request
+      cooldown keeps a failing UEX from being retried on every request.
     
     Args:
         db: Database session
         
     Returns:
-        True if recent price data exists, False otherwise
+        Price freshness after revalidation (see get_price_freshness)
     """
-    cache_threshold = datetime.utcnow() - timedelta(hours=PRICE_CACHE_TTL_HOURS)
+    freshness = get_price_freshness(db)
+    
+    if freshness["state"] == CACHE_STALE:
+        freshness["revalidating"] = price_scheduler.request(JOB_PRICE_REFRESH) or freshness["revalidating"]
+    
+    elif freshness["state"] == CACHE_EXPIRED:
+        price_scheduler.request(JOB_PRICE_REFRESH)
+        if price_scheduler.wait(JOB_PRICE_REFRESH, HARD_EXPIRY_WAIT_SECONDS):
+            freshness = get_price_freshness(db)
+        else:
+            freshness["revalidating"] = price_scheduler.is_running(JOB_PRICE_REFRESH)
     
-    latest_price = (
-        db.query(MarketPrice)
-        .filter(MarketPrice.source == "UEX")
-        .order_by(desc(MarketPrice.collected_at))
-        .first()
+    return freshness
+
+
+def _query_latest_sell_prices(
+    material_ids: List[int],
+    db: Session,
+    source: Optional[str],
+) -> Dict[int, Optional[float]]:
+    """
+    Fetch latest sell prices for a batch of materials from the database.
+    
+    Args:
+        material_ids: IDs of the materials to price
+        db: Database session
+        source: Restrict to a price source, None for any source
+        
+    Returns:
+        Dictionary of material ID to sell price (materials without price are absent)
+    """
+    query = (
+        db.query(LatestMarketPrice.material_id, LatestMarketPrice.sell_price)
+        .filter(LatestMarketPrice.material_id.in_(material_ids))
     )
     
-    if not latest_price:
-        return False
+    if source:
+        query = query.filter(LatestMarketPrice.source == source)
+    else:
+        # One row per source: keep the most recent one for each material
+        query = (
+            query.distinct(LatestMarketPrice.material_id)
+            .order_by(
+                LatestMarketPrice.material_id,
+                desc(LatestMarketPrice.collected_at).nullslast(),
+            )
+        )
     
-    return latest_price.collected_at >= cache_threshold
\ No newline at end of file
+    return {material_id: sell_price for material_id, sell_price in query.all()}
@@ -0,0 +1,434 @@
+"""
+Reference data store for Star Citizen App.
+Keeps scan signatures, refineries and refining methods in memory.
+
+This data only changes when an import script runs. It is loaded once into
+an immutable snapshot together with the pre-serialized JSON bodies and
+their ETags, so the /reference endpoints neither query the database nor
+serialize anything per request. The import scripts bump a row in
+reference_data_versions; the store checks those versions at most every
+REFERENCE_VERSION_CHECK_SECONDS and reloads when one has changed.
+
+When the database is unreachable, or for a dataset that has not been
+imported yet, the JSON files under external_data/ are served instead.
+"""
+
+import hashlib
+import json
+from bisect import bisect_left, bisect_right
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
+
+from models.reference_data_version import ReferenceDataVersion
+from models.refinery import Refinery
+from models.refining_method import RefiningMethod
+from models.scan_signature import ScanSignature
+
+# Dataset names (rows of reference_data_versions)
+DATASET_SCAN_SIGNATURES = "scan_signatures"
+DATASET_REFINERIES = "refineries"
+DATASET_REFINING_METHODS = "refining_methods"
+
+# How often the version rows are read to detect a new import
+REFERENCE_VERSION_CHECK_SECONDS = 30
+
+# Cache-Control max-age sent with reference responses
+REFERENCE_CACHE_MAX_AGE_SECONDS = 300
+
+# Fallback source when the database has no reference data
+EXTERNAL_DATA_DIR = Path(__file__).resolve().parent.parent / "external_data"
+
+SOURCE_DATABASE = "database"
+SOURCE_JSON = "json"
+SOURCE_MIXED = "database+json"
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """Serialized JSON response body with its strong ETag."""
+    
+    body: bytes
+    etag: str
+
+
+def serialize(data: Any) -> CachedBody:
+    """
+    Serialize data to a JSON body and compute its ETag.
+    
+    Args:
+        data: JSON-serializable data
+    
+    Returns:
+        Body bytes and quoted ETag (hash of the body)
+    """
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return CachedBody(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    """
+    Immutable view of the reference data. Never mutated once built.
+    
+    Lists hold response-ready dicts; the *_body fields are the serialized
+    collection responses and the *_by_id maps the single-item responses.
+    refinery_bonuses maps refinery id -> material name (casefolded) -> bonus %.
+    signature_index maps a scanner reading to the rock types producing it;
+    signature_values / signature_matches are the same entries sorted by
+    value, for tolerance-window lookups.
+    """
+    
+    source: str
+    versions: Optional[Dict[str, int]]
+    scan_signatures: Tuple[Dict[str, Any], ...]
+    refineries: Tuple[Dict[str, Any], ...]
+    refining_methods: Tuple[Dict[str, Any], ...]
+    scan_signatures_body: CachedBody
+    refineries_body: CachedBody
+    refining_methods_body: CachedBody
+    scan_signatures_by_id: Dict[int, CachedBody]
+    refineries_by_id: Dict[int, CachedBody]
+    refining_methods_by_id: Dict[int, CachedBody]
+    refinery_bonuses: Dict[int, Dict[str, int]]
+    signature_index: Dict[int, Tuple[Dict[str, Any], ...]]
+    signature_values: Tuple[int, ...]
+    signature_matches: Tuple[Dict[str, Any], ...]
+
+
+def _build_signature_entries(scan_signatures: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Expand every signature list into (reading -> rock type, rock count) entries.
+    
+    signatures[i] is the reading of i + 1 rocks of that type.
+    
+    Returns:
+        Entries sorted by signature value
+    """
+    entries = [
+        {
+            "signature": value,
+            "signature_id": s["id"],
+            "type": s["type"],
+            "category": s["category"],
+            "rock_count": position,
+        }
+        for s in scan_signatures
+        for position, value in enumerate(s["signatures"], start=1)
+    ]
+    entries.sort(key=lambda e: (e["signature"], e["type"]))
+    return entries
+
+
+def _build_snapshot(
+    source: str,
+    versions: Optional[Dict[str, int]],
+    scan_signatures: List[Dict[str, Any]],
+    refineries: List[Dict[str, Any]],
+    refining_methods: List[Dict[str, Any]]
+) -> ReferenceSnapshot:
+    """Serialize every response once and freeze the result."""
+    signature_entries = _build_signature_entries(scan_signatures)
+    signature_index: Dict[int, List[Dict[str, Any]]] = {}
+    for entry in signature_entries:
+        signature_index.setdefault(entry["signature"], []).append(entry)
+    
+    return ReferenceSnapshot(
+        source=source,
+        versions=versions,
+        scan_signatures=tuple(scan_signatures),
+        refineries=tuple(refineries),
+        refining_methods=tuple(refining_methods),
+        scan_signatures_body=serialize(scan_signatures),
+        # The collection only lists active refineries
+        refineries_body=serialize([r for r in refineries if r["is_active"]]),
+        refining_methods_body=serialize(refining_methods),
+        scan_signatures_by_id={s["id"]: serialize(s) for s in scan_signatures},
+        refineries_by_id={r["id"]: serialize(r) for r in refineries},
+        refining_methods_by_id={m["id"]: serialize(m) for m in refining_methods},
+        refinery_bonuses={
+            r["id"]: {b["material_name"].casefold(): b["bonus_percentage"] for b in r["bonuses"]}
+            for r in refineries
+        },
+        signature_index={value: tuple(matches) for value, matches in signature_index.items()},
+        signature_values=tuple(e["signature"] for e in signature_entries),
+        signature_matches=tuple(signature_entries),
+    )
+
+
+# ========================================
+# LOADERS
+# ========================================
+
+def _read_versions(db: Session) -> Dict[str, int]:
+    """Read the version of every reference dataset."""
+    return dict(db.query(ReferenceDataVersion.name, ReferenceDataVersion.version).all())
+
+
+def _load_from_database(db: Session) -> Tuple[List[dict], List[dict], List[dict]]:
+    """
+    Load the three datasets from the database.
+    
+    Returns:
+        (scan signatures, refineries with bonuses, refining methods)
+    """
+    scan_signatures = [
+        {
+            "id": s.id,
+            "type": s.type,
+            "category": s.category,
+            "signatures": list(s.signatures or []),
+            "description": s.description,
+        }
+        for s in db.query(ScanSignature).order_by(ScanSignature.id).all()
+    ]
+    
+    refineries = [
+        {
+            "id": r.id,
+            "name": r.name,
+            "system": r.system,
+            "location": r.location,
+            "is_active": bool(r.is_active),
+            "bonuses": [
+                {
+                    "id": b.id,
+                    "material_name": b.material_name,
+                    "bonus_percentage": b.bonus_percentage,
+                }
+                for b in r.bonuses
+            ],
+        }
+        for r in db.query(Refinery).options(selectinload(Refinery.bonuses)).order_by(Refinery.id).all()
+    ]
+    
+    refining_methods = [
+        {
+            "id": m.id,
+            "name": m.name,
+            "time": m.time,
+            "cost": m.cost,
+            "yield_rating": m.yield_rating,
+            "description": m.description,
+        }
+        for m in db.query(RefiningMethod).order_by(RefiningMethod.id).all()
+    ]
+    
+    return scan_signatures, refineries, refining_methods
+
+
+def _read_json(filename: str) -> Any:
+    """Read a JSON file from external_data/."""
+    with open(EXTERNAL_DATA_DIR / filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _load_from_json() -> Tuple[List[dict], List[dict], List[dict]]:
+    """
+    Build the three datasets from external_data/, as the import scripts do.
+    
+    Ids are positional since the files have none.
+    
+    Returns:
+        (scan signatures, refineries with bonuses, refining methods)
+    """
+    data = _read_json("scan_signatures.json")
+    entries = [
+        (item["type"], item["category"], item["signatures"], None)
+        for group in ("surface_deposits", "space_ice", "space_asteroids")
+        for item in data.get(group, [])
+    ]
+    salvage = data.get("salvage", {})
+    if "debris" in salvage:
+        entries.append((
+            "Debris", "Salvage", [],
+            salvage["debris"]["description"] + " - " + salvage["debris"]["pattern"],
+        ))
+    if "wrecks" in salvage:
+        entries.append(("Wrecks", "Salvage", [], salvage["wrecks"]["description"]))
+    
+    scan_signatures = [
+        {"id": i, "type": t, "category": c, "signatures": s, "description": d}
+        for i, (t, c, s, d) in enumerate(entries, start=1)
+    ]
+    
+    refineries = []
+    bonus_id = 0
+    for i, ref in enumerate(_read_json("refinery_bonuses.json").get("refineries", []), start=1):
+        bonuses = []
+        for material_name, bonus_value in ref.get("bonuses", {}).items():
+            bonus_id += 1
+            bonuses.append({"id": bonus_id, "material_name": material_name, "bonus_percentage": bonus_value})
+        
+        refineries.append({
+            "id": i,
+            "name": f"{ref['code']} - {ref['name']}",
+            "system": ref["system"],
+            "location": ref.get("parent"),
+            "is_active": True,
+            "bonuses": bonuses,
+        })
+    
+    refining_methods = [
+        {
+            "id": i,
+            "name": m["name"],
+            "time": m["time"],
+            "cost": m["cost"],
+            "yield_rating": m["yield"],
+            "description": m.get("description"),
+        }
+        for i, m in enumerate(_read_json("refining_methods.json"), start=1)
+    ]
+    
+    return scan_signatures, refineries, refining_methods
+
+
+def lookup_signature(snapshot: ReferenceSnapshot, value: int, tolerance: int = 0) -> List[Dict[str, Any]]:
+    """
+    Identify the rock types (and rock count) behind a scanner reading.
+    
+    Exact readings are a hash lookup; with a tolerance, the window
+    [value - tolerance, value + tolerance] is found by binary search in
+    the sorted signature values.
+    
+    Args:
+        snapshot: Reference snapshot
+        value: Scanner reading
+        tolerance: Accepted distance between reading and signature
+    
+    Returns:
+        Matches closest first, each with its "difference" to the reading
+    """
+    if tolerance <= 0:
+        candidates = snapshot.signature_index.get(value, ())
+    else:
+        start = bisect_left(snapshot.signature_values, value - tolerance)
+        end = bisect_right(snapshot.signature_values, value + tolerance)
+        candidates = snapshot.signature_matches[start:end]
+    
+    matches = [{**entry, "difference": entry["signature"] - value} for entry in candidates]
+    matches.sort(key=lambda m: (abs(m["difference"]), m["type"]))
+    return matches
+
+
+# ========================================
+# STORE
+# ========================================
+
+class ReferenceStore:
+    """
+    Process-wide holder of the current ReferenceSnapshot.
+    
+    Readers get the snapshot without locking (it is replaced, never
+    modified); loads are serialized by a lock.
+    """
+    
+    def __init__(self):
+        """Initialize an empty store (loaded on startup or first use)."""
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self, db: Session) -> ReferenceSnapshot:
+        """
+        Return the current snapshot, reloading it after a new import.
+        
+        The version rows are read at most once every
+        REFERENCE_VERSION_CHECK_SECONDS; in between this is a plain
+        attribute read.
+        
+        Args:
+            db: Database session (only used to load or check versions)
+        
+        Returns:
+            Current reference snapshot
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load(db)
+        
+        if time.monotonic() - self._checked_at < REFERENCE_VERSION_CHECK_SECONDS:
+            return snapshot
+        
+        self._checked_at = time.monotonic()
+        try:
+            versions = _read_versions(db)
+        except SQLAlchemyError:
+            db.rollback()
+            return snapshot
+        
+        if versions != snapshot.versions:
+            return self.load(db)
+        return snapshot
+    
+    def load(self, db: Session) -> ReferenceSnapshot:
+        """
+        (Re)load every dataset, from the database or else from external_data/.
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            The new snapshot
+        """
+        with self._lock:
+            try:
+                versions = _read_versions(db)
+                datasets = _load_from_database(db)
+                source = SOURCE_DATABASE
+            except SQLAlchemyError as e:
+                db.rollback()
+                print(f"⚠️  Reference data unavailable in database ({e.__class__.__name__}), using external_data/")
+                versions = None
+                datasets = None
+            
+            # Datasets not imported yet are served from the bundled JSON
+            if datasets is None or not all(datasets):
+                fallback = _load_from_json()
+                if datasets is None or not any(datasets):
+                    source = SOURCE_JSON
+                    datasets = fallback
+                else:
+                    source = SOURCE_MIXED
+                    datasets = tuple(d or f for d, f in zip(datasets, fallback))
+            
+            self._snapshot = _build_snapshot(source, versions, *datasets)
+            self._checked_at = time.monotonic()
+        
+        print(
+            f"📚 Reference data loaded from {source}: "
+            f"{len(datasets[0])} signatures, {len(datasets[1])} refineries, {len(datasets[2])} methods"
+        )
+        return self._snapshot
+    
+    def get_refinery_bonus(self, db: Session, refinery_id: int, material_name: str) -> int:
+        """
+        Yield bonus (or malus) of a refinery for a material, in percent.
+        
+        Dictionary lookups only: use this in refining yield calculations
+        instead of querying refinery_bonuses.
+        
+        Args:
+            db: Database session (only used to load or check versions)
+            refinery_id: Refinery ID
+            material_name: Material name (case-insensitive)
+        
+        Returns:
+            Bonus percentage, 0 when the refinery has none for this material
+        """
+        bonuses = self.get(db).refinery_bonuses.get(refinery_id, {})
+        return bonuses.get(material_name.casefold(), 0)
+    
+    def invalidate(self) -> None:
+        """Force a version check on the next access."""
+        self._checked_at = 0.0
+
+
+# Global reference store
+reference_store = ReferenceStore()
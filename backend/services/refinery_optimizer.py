@@ -0,0 +1,250 @@
+"""
+Refinery optimizer for Star Citizen App.
+Ranks every (refinery, refining method) pair for an ore load.
+
+The expected value of a load is linear in each factor:
+
+    refined_scu[r, m, i] = quantity[i] * yield[m] * (1 + bonus[r, i] / 100)
+    value[r, m]          = yield[m] * sum_i(quantity[i] * price[i] * (1 + bonus[r, i] / 100))
+
+so the refinery term (one dot product per refinery over the load's
+materials) is computed once and scaled by each method's factors instead of
+evaluating the full refinery x method x material matrix cell by cell.
+
+Refinery bonus rows and method factors come from the reference store and
+are precomputed once per reference snapshot. Prices come from the latest
+price cache, which is invalidated on every price write.
+
+Refining methods are only rated qualitatively (Very Low .. Very High);
+METHOD_YIELD_RATES, METHOD_COST_RATES and METHOD_HOURS_PER_SCU turn those
+ratings into estimates.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.material import Material
+from services.pricing_service import get_latest_sell_prices
+from services.reference_store import ReferenceSnapshot, reference_store
+
+# Optimization objectives
+OBJECTIVE_VALUE = "value"                    # Highest net value
+OBJECTIVE_VALUE_PER_HOUR = "value_per_hour"  # Highest net value per refining hour
+OBJECTIVES = (OBJECTIVE_VALUE, OBJECTIVE_VALUE_PER_HOUR)
+
+# Share of the ore recovered as refined material, per yield rating
+METHOD_YIELD_RATES = {
+    "Very Low": 0.50,
+    "Low": 0.60,
+    "Medium": 0.70,
+    "High": 0.80,
+    "Very High": 0.90,
+}
+
+# Refining fee as a share of the refined value, per cost rating
+METHOD_COST_RATES = {
+    "Very Low": 0.02,
+    "Low": 0.04,
+    "Medium": 0.06,
+    "High": 0.08,
+    "Very High": 0.10,
+}
+
+# Processing time per SCU of ore, per time rating
+METHOD_HOURS_PER_SCU = {
+    "Very Low": 0.05,
+    "Low": 0.10,
+    "Medium": 0.20,
+    "High": 0.30,
+    "Very High": 0.40,
+}
+
+# Rating used when a method has an unknown label
+DEFAULT_RATING = "Medium"
+
+
+@dataclass(frozen=True)
+class MethodFactors:
+    """Numeric factors of a refining method."""
+    
+    id: int
+    name: str
+    yield_rate: float
+    cost_rate: float
+    hours_per_scu: float
+
+
+@dataclass(frozen=True)
+class OptimizerMatrices:
+    """Per-snapshot precomputed inputs of the optimizer."""
+    
+    snapshot: ReferenceSnapshot
+    refineries: Tuple[Dict[str, Any], ...]
+    bonus_factors: Dict[int, Dict[str, float]]
+    methods: Tuple[MethodFactors, ...]
+
+
+def _rating(table: Dict[str, float], label: Optional[str]) -> float:
+    """Map a qualitative rating to its numeric factor."""
+    return table.get((label or "").strip().title(), table[DEFAULT_RATING])
+
+
+def _build_matrices(snapshot: ReferenceSnapshot) -> OptimizerMatrices:
+    """
+    Precompute the refinery and method factors for a reference snapshot.
+    
+    Args:
+        snapshot: Reference snapshot
+    
+    Returns:
+        Active refineries, their (1 + bonus) factor per material, and
+        every method's yield / cost / time factors
+    """
+    refineries = tuple(r for r in snapshot.refineries if r["is_active"])
+    
+    bonus_factors = {
+        r["id"]: {
+            material: 1 + percentage / 100
+            for material, percentage in snapshot.refinery_bonuses.get(r["id"], {}).items()
+        }
+        for r in refineries
+    }
+    
+    methods = tuple(
+        MethodFactors(
+            id=m["id"],
+            name=m["name"],
+            yield_rate=_rating(METHOD_YIELD_RATES, m["yield_rating"]),
+            cost_rate=_rating(METHOD_COST_RATES, m["cost"]),
+            hours_per_scu=_rating(METHOD_HOURS_PER_SCU, m["time"]),
+        )
+        for m in snapshot.refining_methods
+    )
+    
+    return OptimizerMatrices(snapshot, refineries, bonus_factors, methods)
+
+
+class OptimizerCache:
+    """Keeps the matrices of the current reference snapshot."""
+    
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._matrices: Optional[OptimizerMatrices] = None
+        self._lock = threading.Lock()
+    
+    def get(self, db: Session) -> OptimizerMatrices:
+        """
+        Return the matrices, rebuilt when the reference snapshot changes.
+        
+        Args:
+            db: Database session (passed to the reference store)
+        
+        Returns:
+            Precomputed optimizer matrices
+        """
+        snapshot = reference_store.get(db)
+        matrices = self._matrices
+        if matrices is not None and matrices.snapshot is snapshot:
+            return matrices
+        
+        with self._lock:
+            if self._matrices is None or self._matrices.snapshot is not snapshot:
+                self._matrices = _build_matrices(snapshot)
+            return self._matrices
+
+
+# Global optimizer cache
+optimizer_cache = OptimizerCache()
+
+
+def optimize_refining(
+    db: Session,
+    load: Dict[int, float],
+    objective: str = OBJECTIVE_VALUE,
+    limit: int = 5,
+    system: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Rank refinery x method combinations for an ore load.
+    
+    Args:
+        db: Database session
+        load: Material ID -> ore quantity (SCU)
+        objective: OBJECTIVE_VALUE or OBJECTIVE_VALUE_PER_HOUR
+        limit: Number of combinations returned
+        system: Only consider refineries of this system (case-insensitive)
+    
+    Returns:
+        Dictionary with the ranked options ("best" is the first one, or
+        None) and the materials that have no known price
+    
+    Raises:
+        ValueError: If the objective is unknown
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}' (expected one of {', '.join(OBJECTIVES)})")
+    
+    load = {material_id: quantity for material_id, quantity in load.items() if quantity > 0}
+    matrices = optimizer_cache.get(db)
+    
+    names = dict(
+        db.query(Material.id, Material.name).filter(Material.id.in_(list(load))).all()
+    ) if load else {}
+    prices = get_latest_sell_prices(list(load), db)
+    
+    # Materials of the load: (id, name key, quantity, unit price)
+    materials = [
+        (material_id, names[material_id].casefold(), quantity, prices.get(material_id) or 0.0)
+        for material_id, quantity in load.items()
+        if material_id in names
+    ]
+    total_scu = sum(quantity for _, _, quantity, _ in materials)
+    
+    refineries = matrices.refineries
+    if system:
+        refineries = tuple(r for r in refineries if r["system"].casefold() == system.casefold())
+    
+    options = []
+    for refinery in refineries:
+        factors = matrices.bonus_factors[refinery["id"]]
+        
+        # Refinery term, shared by every method
+        boosted_scu = [quantity * factors.get(key, 1.0) for _, key, quantity, _ in materials]
+        boosted_value = sum(scu * m[3] for scu, m in zip(boosted_scu, materials))
+        boosted_total = sum(boosted_scu)
+        
+        for method in matrices.methods:
+            gross_value = boosted_value * method.yield_rate
+            refining_cost = gross_value * method.cost_rate
+            net_value = gross_value - refining_cost
+            hours = total_scu * method.hours_per_scu
+            
+            options.append({
+                "refinery_id": refinery["id"],
+                "refinery_name": refinery["name"],
+                "refinery_system": refinery["system"],
+                "method_id": method.id,
+                "method_name": method.name,
+                "refined_scu": round(boosted_total * method.yield_rate, 2),
+                "gross_value": round(gross_value, 2),
+                "refining_cost": round(refining_cost, 2),
+                "net_value": round(net_value, 2),
+                "duration_hours": round(hours, 2),
+                "value_per_hour": round(net_value / hours, 2) if hours else 0.0,
+            })
+    
+    sort_key = "net_value" if objective == OBJECTIVE_VALUE else "value_per_hour"
+    options.sort(key=lambda o: (o[sort_key], o["net_value"]), reverse=True)
+    options = options[:limit]
+    
+    return {
+        "objective": objective,
+        "total_scu": round(total_scu, 2),
+        "best": options[0] if options else None,
+        "options": options,
+        "unknown_material_ids": sorted(set(load) - set(names)),
+        "unpriced_material_ids": sorted(m[0] for m in materials if not m[3]),
+    }
@@ -1,133 +1,118 @@
 """
 Refining service for Star Citizen App.
-Handles the creation and tracking of material refining jobs.
+Records the stock movements of refining jobs in the stock ledger.
+
+Raw ore committed to a job is consumed when the job starts (and given back
+if it is cancelled); refined materials enter the stock when the job is
+collected. These events carry zero value to keep refining financially
+neutral: costs and revenues are recorded by trades and sales.
+
+None of these functions commit: the production endpoints commit them with
+the job update and the dashboard counters.
 """
 
-from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Tuple
 
 from sqlalchemy.orm import Session
 
-from models.refining import RefiningJob
+from models.refining_job import RefiningJob
 from models.stock_event import StockEvent
+from services.stock_service import (
+    EVENT_ADJUSTMENT,
+    EVENT_PRODUCTION,
+    EVENT_REFINING_CONSUME,
+    record_stock_event,
+)
+
+# reference_type of the ledger events written for a refining job
+REFERENCE_REFINING = "REFINING"
 
+# Refined quantities are entered in cSCU (1/100 SCU)
+CSCU_PER_SCU = Decimal("100")
 
-def start_refining(
-    input_material_id: int,
-    output_material_id: int,
-    input_quantity: int,
-    output_quantity: int,
-    duration_minutes: int,
+
+def record_ore_consumption(
     db: Session,
-) -> int:
+    job_id: int,
+    ores: Iterable[Tuple[int, float]],
+) -> None:
     """
-    Start a new refining job and consume input materials.
-    
-    Creates a refining job record and generates a stock event to track
-    the consumption of raw materials. The job will be marked as "RUNNING"
-    until its duration elapses.
+    Record the consumption of raw ore committed to a refining job.
     
     Args:
-        input_material_id: ID of the raw material being consumed
-        output_material_id: ID of the refined material being produced
-        input_quantity: Amount of raw material to consume
-        output_quantity: Amount of refined material to produce
-        duration_minutes: Duration of the refining process
         db: Database session
-        
-    Returns:
-        ID of the created refining job
-        
-    Note:
-        The consumption event is recorded with zero value to maintain
-        financial neutrality during the refining process.
-    """
-    # Create refining job
-    job = _create_refining_job(
-        db=db,
-        input_material_id=input_material_id,
-        output_material_id=output_material_id,
-        input_quantity=input_quantity,
-        output_quantity=output_quantity,
-        duration_minutes=duration_minutes,
-    )
-    
-    # Record material consumption
-    _record_material_consumption(
-        db=db,
-        job_id=job.id,
-        material_id=input_material_id,
-        quantity=input_quantity,
-    )
+        job_id: ID of the refining job
+        ores: (material ID, quantity in SCU) pairs
     
-    return job.id
+    Raises:
+        ValueError: If a quantity is not positive
+    """
+    for material_id, quantity in ores:
+        # Mined ore never enters the ledger through a purchase: no stock check
+        record_stock_event(
+            db,
+            material_id=material_id,
+            quantity=quantity,
+            event_type=EVENT_REFINING_CONSUME,
+            unit_price=0.0,
+            total_value=0.0,
+            reference_type=REFERENCE_REFINING,
+            reference_id=job_id,
+            allow_negative=True,
+        )
 
 
-def _create_refining_job(
-    db: Session,
-    input_material_id: int,
-    output_material_id: int,
-    input_quantity: int,
-    output_quantity: int,
-    duration_minutes: int,
-) -> RefiningJob:
+def release_ore_consumption(db: Session, job_id: int) -> None:
     """
-    Create a new refining job record.
+    Give back the ore consumed by a cancelled refining job.
+    
+    The ledger is append-only, so each consumption is offset by an
+    adjustment of the opposite sign.
     
     Args:
         db: Database session
-        input_material_id: Raw material ID
-        output_material_id: Refined material ID
-        input_quantity: Raw material quantity
-        output_quantity: Refined material quantity
-        duration_minutes: Refining duration
-        
-    Returns:
-        Created RefiningJob instance with generated ID
+        job_id: ID of the cancelled refining job
     """
-    job = RefiningJob(
-        input_material_id=input_material_id,
-        output_material_id=output_material_id,
-        input_quantity=input_quantity,
-        output_quantity=output_quantity,
-        duration_minutes=duration_minutes,
-        started_at=datetime.utcnow(),
-        status="RUNNING",
-    )
-    
-    db.add(job)
-    db.commit()
-    db.refresh(job)
+    consumed = db.query(StockEvent.material_id, StockEvent.quantity).filter(
+        StockEvent.reference_type == REFERENCE_REFINING,
+        StockEvent.reference_id == job_id,
+        StockEvent.event_type == EVENT_REFINING_CONSUME,
+    ).all()
     
-    return job
+    for material_id, quantity in consumed:
+        record_stock_event(
+            db,
+            material_id=material_id,
+            quantity=-quantity,
+            event_type=EVENT_ADJUSTMENT,
+            unit_price=0.0,
+            total_value=0.0,
+            reference_type=REFERENCE_REFINING,
+            reference_id=job_id,
+        )
 
 
-def _record_material_consumption(
-    db: Session,
-    job_id: int,
-    material_id: int,
-    quantity: int,
-) -> None:
+def record_refined_output(db: Session, job: RefiningJob) -> None:
     """
-    Record the consumption of raw materials for a refining job.
-    
-    Creates a stock event with zero financial value to track
-    material consumption without affecting financial totals.
+    Record the refined materials of a collected job as production.
     
     Args:
         db: Database session
-        job_id: ID of the refining job
-        material_id: ID of the consumed material
-        quantity: Quantity consumed (will be recorded as negative)
+        job: Refining job being collected (with its materials)
     """
-    consume_event = StockEvent(
-        material_id=material_id,
-        quantity=-quantity,
-        unit_price=0.0,
-        total_value=0.0,
-        event_type="REFINING_CONSUME",
-        reference_type="REFINING",
-        reference_id=job_id,
-    )
-    
-    db.add(consume_event)
-    db.commit()
\ No newline at end of file
+    for job_mat in job.materials:
+        quantity_scu = Decimal(str(job_mat.quantity_refined)) / CSCU_PER_SCU
+        if quantity_scu <= 0:
+            continue
+        
+        record_stock_event(
+            db,
+            material_id=job_mat.material_id,
+            quantity=quantity_scu,
+            event_type=EVENT_PRODUCTION,
+            unit_price=0.0,
+            total_value=0.0,
+            reference_type=REFERENCE_REFINING,
+            reference_id=job.id,
+        )
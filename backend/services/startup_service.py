@@ -0,0 +1,91 @@
+"""
+Startup service for Star Citizen App.
+Runs application warmup in the background and tracks readiness.
+
+The API accepts traffic as soon as the process starts. Warmup work that may
+depend on external APIs (UEX pricing) runs off the event loop; until it
+finishes, endpoints keep serving the prices already stored in the database.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from database import SessionLocal
+from services.pricing_service import ensure_quantanium_price
+from services.reference_store import reference_store
+
+
+class ReadinessState:
+    """Tracks the progress of the background startup warmup."""
+
+    def __init__(self):
+        """Initialize readiness state as not started."""
+        self.ready: bool = False
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize readiness state for the /ready endpoint.
+
+        Returns:
+            Dictionary with readiness flag, timestamps and last warmup error
+        """
+        return {
+            "ready": self.ready,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+# Global readiness state
+readiness = ReadinessState()
+
+
+async def run_startup_warmup() -> None:
+    """
+    Run startup warmup without blocking the event loop.
+
+    Blocking work (reference data load, DB session, UEX HTTP calls) runs
+    in a worker thread.
+    The app is marked ready once warmup completes, even if it failed:
+    in that case, stale prices from the database are served until the
+    next successful refresh.
+    """
+    readiness.started_at = datetime.utcnow()
+
+    try:
+        await asyncio.to_thread(_load_reference_data)
+    except Exception as e:
+        print(f"⚠️  Reference data preload failed: {e}")
+    
+    try:
+        await asyncio.to_thread(_warm_prices)
+        print("✅ Quantanium price initialized")
+    except Exception as e:
+        readiness.error = str(e)
+        print(f"⚠️  Quantanium initialization failed: {e}")
+    finally:
+        readiness.finished_at = datetime.utcnow()
+        readiness.ready = True
+
+
+def _warm_prices() -> None:
+    """Ensure Quantanium pricing data exists (runs in a worker thread)."""
+    db = SessionLocal()
+    try:
+        ensure_quantanium_price(db)
+    finally:
+        db.close()
+
+
+def _load_reference_data() -> None:
+    """Load the reference data store (runs in a worker thread)."""
+    db = SessionLocal()
+    try:
+        reference_store.load(db)
+    finally:
+        db.close()
@@ -1,37 +1,202 @@
 """
 Stock service for Star Citizen App.
-Provides stock quantity queries and aggregations by material.
+Stock ledger: records stock movements and computes balances by material.
+
+stock_events is an append-only ledger (enforced by a trigger) and the only
+source of truth for stock; every movement goes through record_stock_event().
+Quantities are signed SCU (NUMERIC, like the inventory): entries
+(purchases, refined output) are positive, exits (sales, ore consumption)
+negative.
+
+Balances are read as the material's latest snapshot (stock_balance_snapshots)
+plus the events recorded after it. snapshot_stock_balances() advances the
+snapshots periodically (scheduler job), so a read only sums the events
+since the last run.
 """
 
-from sqlalchemy import func
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from models.stock_event import StockEvent
 
+# Event types and the sign of their quantity
+EVENT_BUY = "BUY"
+EVENT_SELL = "SELL"
+EVENT_PRODUCTION = "PRODUCTION"
+EVENT_REFINING_CONSUME = "REFINING_CONSUME"
+EVENT_ADJUSTMENT = "ADJUSTMENT"
+
+EVENT_SIGNS = {
+    EVENT_BUY: 1,
+    EVENT_PRODUCTION: 1,
+    EVENT_SELL: -1,
+    EVENT_REFINING_CONSUME: -1,
+    EVENT_ADJUSTMENT: 0,  # Either sign
+}
+
+# Namespace of the per-material advisory locks taken before a stock exit
+STOCK_LOCK_NAMESPACE = 7_320
+
+
+class InsufficientStock(ValueError):
+    """Raised when an exit would make a material's balance negative."""
+
+
+def record_stock_event(
+    db: Session,
+    material_id: int,
+    quantity: float,
+    event_type: str,
+    unit_price: Optional[float] = None,
+    total_value: float = 0.0,
+    reference_type: Optional[str] = None,
+    reference_id: Optional[int] = None,
+    allow_negative: bool = False,
+) -> StockEvent:
+    """
+    Append a movement to the stock ledger.
+    
+    Does not commit: the caller commits it with the rest of its work.
+    For an exit, the material is locked until that commit and the
+    balance is checked first, so concurrent exits cannot oversell.
+    
+    Args:
+        db: Database session
+        material_id: Material moved
+        quantity: Quantity moved, unsigned (the sign comes from event_type)
+            except for EVENT_ADJUSTMENT which takes a signed quantity
+        event_type: One of EVENT_SIGNS
+        unit_price: Unit price at the time of the movement
+        total_value: Financial value (negative for a cost)
+        reference_type: Kind of the originating record (e.g. "REFINING")
+        reference_id: ID of the originating record
+        allow_negative: Skip the balance check for an exit
+    
+    Returns:
+        The new (flushed) StockEvent
+    
+    Raises:
+        ValueError: Unknown event type or non-positive quantity
+        InsufficientStock: The exit exceeds the current balance
+    """
+    if event_type not in EVENT_SIGNS:
+        raise ValueError(f"Unknown stock event type '{event_type}'")
+    
+    sign = EVENT_SIGNS[event_type]
+    if sign:
+        if quantity <= 0:
+            raise ValueError("Stock movement quantity must be positive")
+        quantity = sign * quantity
+    
+    if quantity < 0 and not allow_negative:
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, :material_id)"),
+            {"namespace": STOCK_LOCK_NAMESPACE, "material_id": material_id},
+        )
+        available = get_stock_by_material(material_id, db)
+        if available + float(quantity) < 0:
+            raise InsufficientStock(
+                f"Insufficient stock for material {material_id} ({available} available, {-quantity} requested)"
+            )
+    
+    stock_event = StockEvent(
+        material_id=material_id,
+        quantity=quantity,
+        unit_price=unit_price,
+        total_value=total_value,
+        event_type=event_type,
+        reference_type=reference_type,
+        reference_id=reference_id,
+    )
+    db.add(stock_event)
+    db.flush()
+    
+    return stock_event
+
 
-def get_stock_by_material(material_id: int, db: Session) -> int:
+def get_stock_by_material(material_id: int, db: Session) -> float:
     """
     Calculate total stock quantity for a specific material.
     
-    Aggregates all stock events (purchases, sales, production, consumption)
-    to determine current stock level.
+    Latest snapshot plus the events recorded after it (an index range
+    scan on stock_events (material_id, id)).
     
     Args:
         material_id: ID of the material to query
         db: Database session
-        
+    
     Returns:
-        Total quantity in stock (0 if no stock exists)
-        
-    Note:
-        This function sums all StockEvent quantities, where:
-        - Positive values: purchases, production
-        - Negative values: sales, consumption
+        Total quantity in stock, in SCU (0 if no stock exists)
     """
-    total = (
-        db.query(func.coalesce(func.sum(StockEvent.quantity), 0))
-        .filter(StockEvent.material_id == material_id)
-        .scalar()
-    )
+    total = db.execute(
+        text("""
+            SELECT
+                COALESCE(s.quantity, 0) + COALESCE((
+                    SELECT SUM(e.quantity)
+                    FROM stock_events e
+                    WHERE e.material_id = m.material_id
+                      AND e.id > COALESCE(s.last_event_id, 0)
+                ), 0)
+            FROM (SELECT CAST(:material_id AS INTEGER) AS material_id) m
+            LEFT JOIN stock_balance_snapshots s ON s.material_id = m.material_id
+        """),
+        {"material_id": material_id},
+    ).scalar()
+    
+    return float(total)
+
+
+def snapshot_stock_balances(db: Session) -> int:
+    """
+    Advance the balance snapshot of every material with new events.
+    
+    stock_events is locked in SHARE mode for the duration: it waits for
+    in-flight writers to commit (so no lower event id can appear after
+    the snapshot) and briefly holds new writes. Each snapshot only adds
+    the events since the previous one.
+    
+    Args:
+        db: Database session
+    
+    Returns:
+        Number of snapshots written
+    
+    Raises:
+        Exception: Any database error (the session is rolled back first)
+    """
+    try:
+        db.execute(text("LOCK TABLE stock_events IN SHARE MODE"))
+        
+        result = db.execute(
+            text("""
+                INSERT INTO stock_balance_snapshots (
+                    material_id, quantity, total_value, last_event_id, created_at
+                )
+                SELECT
+                    e.material_id,
+                    COALESCE(s.quantity, 0) + SUM(e.quantity),
+                    COALESCE(s.total_value, 0) + SUM(e.total_value),
+                    MAX(e.id),
+                    :now
+                FROM stock_events e
+                LEFT JOIN stock_balance_snapshots s ON s.material_id = e.material_id
+                WHERE e.id > COALESCE(s.last_event_id, 0)
+                GROUP BY e.material_id, s.quantity, s.total_value
+                ON CONFLICT (material_id) DO UPDATE SET
+                    quantity = EXCLUDED.quantity,
+                    total_value = EXCLUDED.total_value,
+                    last_event_id = EXCLUDED.last_event_id,
+                    created_at = EXCLUDED.created_at
+            """),
+            {"now": datetime.utcnow()},
+        )
+        db.commit()
+    
+    except Exception:
+        db.rollback()
+        raise
     
-    return int(total)
\ No newline at end of file
+    return result.rowcount
@@ -7,11 +7,14 @@ from datetime import datetime, timedelta
 from typing import Optional
 
 import requests
-from sqlalchemy import desc, text
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
 
 from core.config import UEX_API_TOKEN
 from models.market_price import MarketPrice
+from services.dashboard_service import invalidate_dashboard
+from services.price_cache import invalidate_price_cache
+from models.latest_market_price import LatestMarketPrice
 
 # UEX API configuration
 UEX_API_URL = "https://api.uexcorp.space/2.0/commodities"
@@ -38,20 +41,19 @@ def is_quantanium_cache_valid(db: Session) -> bool:
     """
     cache_threshold = datetime.utcnow() - timedelta(hours=CACHE_TTL_HOURS)
     
-    latest = (
-        db.query(MarketPrice)
+    latest_collected_at = (
+        db.query(func.max(LatestMarketPrice.collected_at))
         .filter(
-            MarketPrice.source == "UEX",
-            MarketPrice.location_string == UEX_LOCATION,
+            LatestMarketPrice.source == "UEX",
+            LatestMarketPrice.location_string == UEX_LOCATION,
         )
-        .order_by(desc(MarketPrice.collected_at))
-        .first()
+        .scalar()
     )
     
-    if not latest:
+    if not latest_collected_at:
         return False
     
-    return latest.collected_at >= cache_threshold
+    return latest_collected_at >= cache_threshold
 
 
 def fetch_quantanium_price_from_uex() -> float:
@@ -129,14 +131,19 @@ def refresh_quantanium_price(db: Session, force: bool = False) -> None:
     sell_price = fetch_quantanium_price_from_uex()
     
     # Create new price record
+    now = datetime.utcnow()
+    
     price = MarketPrice(
         material_id=material_id,
-        location=UEX_LOCATION,
+        location_string=UEX_LOCATION,
         sell_price=sell_price,
         buy_price=None,
         source="UEX",
-        updated_at=datetime.utcnow(),
+        updated_at=now,
+        collected_at=now,
     )
     
     db.add(price)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_price_cache()
+    invalidate_dashboard()
\ No newline at end of file
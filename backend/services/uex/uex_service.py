@@ -7,17 +7,27 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import requests
 
-from sqlalchemy import desc, text
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
 
 from core.config import UEX_API_TOKEN
 from models.market_price import MarketPrice
+from models.latest_market_price import LatestMarketPrice
 from models.material import Material
+from services.dashboard_service import invalidate_dashboard
+from services.price_cache import invalidate_price_cache
+from services.ws_manager import ws_manager
 
 # Configuration
 UEX_API_BASE_URL = "https://api.uexcorp.space/2.0"
 UEX_LOCATION = "UEX_ESTIMATED"
-CACHE_TTL_HOURS = 12
+CACHE_TTL_HOURS = 12          # Prix "frais" : servis sans revalidation
+CACHE_HARD_EXPIRY_HOURS = 72  # Au-delà : refresh synchrone avant de servir
+
+# États du cache (stale-while-revalidate)
+CACHE_FRESH = "fresh"
+CACHE_STALE = "stale"
+CACHE_EXPIRED = "expired"
 
 HEADERS = {
     "Authorization": f"Bearer {UEX_API_TOKEN}",
@@ -28,7 +38,7 @@ HEADERS = {
 
 def is_cache_valid(db: Session, material_id: Optional[int] = None) -> bool:
     """
-    Vérifie si le cache des prix UEX est encore valide.
+    Vérifie si le cache des prix UEX est encore frais (dans le TTL).
     
     Args:
         db: Session de base de données
@@ -37,22 +47,60 @@ def is_cache_valid(db: Session, material_id: Optional[int] = None) -> bool:
     Returns:
         True si le cache est valide, False sinon
     """
-    cache_threshold = datetime.utcnow() - timedelta(hours=CACHE_TTL_HOURS)
+    return get_cache_state(get_cache_age(db, material_id)) == CACHE_FRESH
+
+
+def get_cache_age(db: Session, material_id: Optional[int] = None) -> Optional[float]:
+    """
+    Calcule l'âge (en secondes) du dernier prix UEX enregistré.
     
-    query = db.query(MarketPrice).filter(
-        MarketPrice.source == "UEX",
-        MarketPrice.location_string == UEX_LOCATION,
+    Args:
+        db: Session de base de données
+        material_id: ID du matériau spécifique (None = vérification globale)
+        
+    Returns:
+        Âge en secondes, ou None si aucun prix UEX n'existe
+    """
+    query = db.query(func.max(LatestMarketPrice.collected_at)).filter(
+        LatestMarketPrice.source == "UEX",
+        LatestMarketPrice.location_string == UEX_LOCATION,
     )
     
     if material_id:
-        query = query.filter(MarketPrice.material_id == material_id)
+        query = query.filter(LatestMarketPrice.material_id == material_id)
     
-    latest = query.order_by(desc(MarketPrice.collected_at)).first()
+    latest_collected_at = query.scalar()
     
-    if not latest:
-        return False
+    if not latest_collected_at:
+        return None
     
-    return latest.collected_at >= cache_threshold
+    return max(0.0, (datetime.utcnow() - latest_collected_at).total_seconds())
+
+
+def get_cache_state(age_seconds: Optional[float]) -> str:
+    """
+    Détermine l'état du cache à partir de son âge.
+    
+    - fresh : plus récent que CACHE_TTL_HOURS
+    - stale : servi tel quel, une revalidation en arrière-plan est attendue
+    - expired : plus vieux que CACHE_HARD_EXPIRY_HOURS (ou absent)
+    
+    Args:
+        age_seconds: Âge du cache en secondes (None = aucun prix)
+        
+    Returns:
+        CACHE_FRESH, CACHE_STALE ou CACHE_EXPIRED
+    """
+    if age_seconds is None:
+        return CACHE_EXPIRED
+    
+    if age_seconds < timedelta(hours=CACHE_TTL_HOURS).total_seconds():
+        return CACHE_FRESH
+    
+    if age_seconds < timedelta(hours=CACHE_HARD_EXPIRY_HOURS).total_seconds():
+        return CACHE_STALE
+    
+    return CACHE_EXPIRED
 
 
 def fetch_all_commodities_from_uex() -> List[Dict]:
@@ -167,6 +215,7 @@ def refresh_all_prices(db: Session, force: bool = False) -> Dict[str, int]:
         "skipped": 0,
         "errors": 0,
     }
+    updated_prices: List[Dict] = []
     
     try:
         # Récupérer toutes les commodities
@@ -218,6 +267,7 @@ def refresh_all_prices(db: Session, force: bool = False) -> Dict[str, int]:
                 )
                 
                 db.add(market_price)
+                updated_prices.append(_price_state(market_price))
                 stats["updated"] += 1
                 
                 print(f"✅ Updated {material.name}: {sell_price:,.2f} aUEC")
@@ -228,6 +278,9 @@ def refresh_all_prices(db: Session, force: bool = False) -> Dict[str, int]:
                 continue
         
         db.commit()
+        invalidate_price_cache()
+        invalidate_dashboard()
+        _publish_prices(updated_prices)
         print(f"🎉 Refresh complete! Updated: {stats['updated']}, Skipped: {stats['skipped']}, Errors: {stats['errors']}")
         
     except Exception as e:
@@ -290,7 +343,11 @@ def refresh_single_material(
                 )
                 
                 db.add(market_price)
+                price_state = _price_state(market_price)
                 db.commit()
+                invalidate_price_cache()
+                invalidate_dashboard()
+                _publish_prices([price_state])
                 
                 print(f"✅ Updated {material.name}: {sell_price:,.2f} aUEC")
                 return True
@@ -331,4 +388,36 @@ def get_material_price_history(
         )
         .order_by(MarketPrice.collected_at.desc())
         .all()
-    )
\ No newline at end of file
+    )
+
+
+def _price_state(price: MarketPrice) -> Dict:
+    """
+    Sérialise un prix pour le topic WebSocket "prices:{material_id}".
+    
+    À appeler avant le commit (les attributs sont expirés ensuite).
+    
+    Args:
+        price: Prix UEX à publier
+        
+    Returns:
+        Dictionnaire JSON-compatible du prix
+    """
+    return {
+        "material_id": price.material_id,
+        "sell_price": float(price.sell_price) if price.sell_price is not None else None,
+        "buy_price": float(price.buy_price) if price.buy_price is not None else None,
+        "source": price.source,
+        "collected_at": price.collected_at,
+    }
+
+
+def _publish_prices(prices: List[Dict]) -> None:
+    """
+    Publie les nouveaux prix sur les topics WebSocket "prices:{material_id}".
+    
+    Args:
+        prices: Prix sérialisés par _price_state
+    """
+    for price in prices:
+        ws_manager.publish_state_threadsafe(f"prices:{price['material_id']}", price)
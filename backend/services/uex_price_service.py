@@ -14,6 +14,8 @@ from sqlalchemy.orm import Session
 
 from core.config import UEX_API_TOKEN
 from models.market_price import MarketPrice
+from services.dashboard_service import invalidate_dashboard
+from services.price_cache import invalidate_price_cache
 
 # UEX API configuration
 UEX_API_URL = "https://api.uexcorp.space/2.0/market/prices"
@@ -133,4 +135,6 @@ def refresh_quantanium_price(db: Session, force: bool = False) -> None:
     )
     
     db.add(price)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_price_cache()
+    invalidate_dashboard()
\ No newline at end of file
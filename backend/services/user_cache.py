@@ -0,0 +1,59 @@
+"""
+User cache for Star Citizen App.
+Short-lived in-process cache of authenticated users, keyed by token subject.
+
+Authenticated requests read the user from this cache instead of querying
+the users table every time. Entries are read-only snapshots (CurrentUser);
+code that modifies a user must reload it from the database and call
+invalidate_user() after committing (password change, role change,
+deactivation). Other processes pick up the change once the TTL expires.
+"""
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models.user import User
+from schemas.auth import CurrentUser
+from services.price_cache import TTLCache
+
+# Cache sizing (TTL bounds how long a change can go unnoticed by other workers)
+USER_CACHE_MAX_ENTRIES = 1024
+USER_CACHE_TTL_SECONDS = 60
+
+# Global user cache, keyed by username (JWT "sub" claim)
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+
+
+def get_user_by_subject(db: Session, username: str) -> Optional[CurrentUser]:
+    """
+    Get the user behind a token subject, from the cache when possible.
+    
+    Args:
+        db: Database session (only used on a cache miss)
+        username: Token subject
+    
+    Returns:
+        User snapshot, or None if the user does not exist
+    """
+    hits, _ = user_cache.get_many([username])
+    if username in hits:
+        return hits[username]
+    
+    user = db.query(User).filter(User.username == username).first()
+    if not user:
+        return None
+    
+    current_user = CurrentUser.model_validate(user)
+    user_cache.set_many({username: current_user})
+    return current_user
+
+
+def invalidate_user(username: str) -> None:
+    """
+    Drop a user from the cache after modifying it.
+    
+    Args:
+        username: Username of the modified user
+    """
+    user_cache.delete([username])
@@ -0,0 +1,234 @@
+"""
+WebSocket broadcast backend for Star Citizen App.
+Relays WebSocket events between API processes with Postgres LISTEN/NOTIFY.
+
+ws_manager only knows the sockets connected to its own process. With
+several uvicorn workers or replicas, every event published through
+ws_manager is also sent as a NOTIFY on WS_NOTIFY_CHANNEL; each process
+LISTENs on that channel and replays events coming from other processes
+to its local subscribers. No infrastructure is needed beyond the database.
+
+Both connections are plain psycopg2 connections owned by daemon threads,
+so neither the event loop nor the SQLAlchemy pool is ever blocked.
+"""
+
+import json
+import queue
+import select
+import threading
+import uuid
+from typing import Any, List
+
+import psycopg2
+import psycopg2.extensions
+
+from core.config import config
+from database import engine
+from services.ws_manager import ws_manager
+
+# Postgres channel shared by every API process
+WS_NOTIFY_CHANNEL = "ws_events"
+
+# NOTIFY payloads are limited to 8000 bytes by Postgres
+NOTIFY_MAX_PAYLOAD_BYTES = 7900
+
+# Events waiting to be sent before new ones are dropped
+OUTBOX_SIZE = 10_000
+
+# Maximum NOTIFY sent in a single transaction
+NOTIFY_BATCH_SIZE = 100
+
+# Wait between reconnection attempts after a database error
+RECONNECT_DELAY_SECONDS = 5
+
+# How often the threads check for shutdown while idle
+POLL_TIMEOUT_SECONDS = 1.0
+
+
+class PostgresBroadcastBackend:
+    """
+    Cross-process fan-out for ws_manager based on LISTEN/NOTIFY.
+    
+    One thread sends queued events with pg_notify(), another LISTENs
+    and hands events from other processes back to ws_manager.
+    """
+    
+    def __init__(self):
+        """Initialize the backend (threads are started by start())."""
+        self.origin = uuid.uuid4().hex
+        self._outbox: "queue.Queue[str]" = queue.Queue(maxsize=OUTBOX_SIZE)
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    @property
+    def running(self) -> bool:
+        """True while the listener and publisher threads are alive."""
+        return any(thread.is_alive() for thread in self._threads)
+    
+    def start(self) -> None:
+        """
+        Start the listener and publisher threads and plug into ws_manager.
+        
+        Does nothing when WS_BROADCAST_BACKEND is "local".
+        """
+        if config.WS_BROADCAST_BACKEND != "postgres":
+            print("⏸️  WebSocket broadcast is local to this process")
+            return
+        
+        if self.running:
+            return
+        
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._listen, name="ws-broadcast-listen", daemon=True),
+            threading.Thread(target=self._publish, name="ws-broadcast-notify", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        
+        ws_manager.backend = self
+        print(f"📡 WebSocket broadcast via Postgres channel '{WS_NOTIFY_CHANNEL}'")
+    
+    def stop(self) -> None:
+        """Stop both threads and detach from ws_manager."""
+        if ws_manager.backend is self:
+            ws_manager.backend = None
+        
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=POLL_TIMEOUT_SECONDS * 2)
+        self._threads = []
+    
+    def notify(self, kind: str, topic: str, data: Any) -> None:
+        """
+        Queue an event for the other processes. Never blocks.
+        
+        Args:
+            kind: ws_manager.RELAY_EVENT or ws_manager.RELAY_STATE
+            topic: Topic name
+            data: Message or state, JSON-serializable
+        """
+        payload = json.dumps(
+            {"origin": self.origin, "kind": kind, "topic": topic, "data": data},
+            default=str,
+        )
+        
+        if len(payload.encode("utf-8")) > NOTIFY_MAX_PAYLOAD_BYTES:
+            print(f"⚠️  WebSocket event on '{topic}' too large for NOTIFY, delivered locally only")
+            return
+        
+        try:
+            self._outbox.put_nowait(payload)
+        except queue.Full:
+            print(f"⚠️  WebSocket broadcast outbox full, event on '{topic}' dropped")
+    
+    # ------------------------------------------------------------------
+    # Threads
+    # ------------------------------------------------------------------
+    
+    def _listen(self) -> None:
+        """LISTEN on the channel and relay events from other processes."""
+        while not self._stop_event.is_set():
+            connection = None
+            try:
+                connection = _connect()
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {WS_NOTIFY_CHANNEL}")
+                
+                while not self._stop_event.is_set():
+                    readable, _, _ = select.select([connection], [], [], POLL_TIMEOUT_SECONDS)
+                    if not readable:
+                        continue
+                    
+                    connection.poll()
+                    while connection.notifies:
+                        payload = connection.notifies.pop(0).payload
+                        # A bad event must not stop the relay for the others
+                        try:
+                            self._relay(payload)
+                        except Exception as e:
+                            print(f"⚠️  WebSocket broadcast event dropped ({type(e).__name__}): {e}")
+            
+            except psycopg2.Error as e:
+                print(f"⚠️  WebSocket broadcast listener error: {e}")
+                self._stop_event.wait(RECONNECT_DELAY_SECONDS)
+            
+            except Exception as e:
+                print(f"❌ WebSocket broadcast listener failed, reconnecting ({type(e).__name__}): {e}")
+                self._stop_event.wait(RECONNECT_DELAY_SECONDS)
+            
+            finally:
+                if connection is not None:
+                    connection.close()
+    
+    def _publish(self) -> None:
+        """Send queued events with pg_notify(), batched per transaction."""
+        connection = None
+        
+        while not self._stop_event.is_set():
+            try:
+                batch = [self._outbox.get(timeout=POLL_TIMEOUT_SECONDS)]
+            except queue.Empty:
+                continue
+            
+            while len(batch) < NOTIFY_BATCH_SIZE:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                if connection is None or connection.closed:
+                    connection = _connect()
+                
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        "SELECT pg_notify(%s, %s)",
+                        [(WS_NOTIFY_CHANNEL, payload) for payload in batch],
+                    )
+                # Notifications are delivered when the transaction commits
+                connection.commit()
+            
+            except Exception as e:
+                print(f"⚠️  WebSocket broadcast publish error, {len(batch)} event(s) lost: {e}")
+                if connection is not None:
+                    connection.close()
+                connection = None
+                self._stop_event.wait(RECONNECT_DELAY_SECONDS)
+        
+        if connection is not None:
+            connection.close()
+    
+    def _relay(self, payload: str) -> None:
+        """
+        Hand an event received from another process to ws_manager.
+        
+        Args:
+            payload: Raw NOTIFY payload
+        """
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        
+        # Events from this process were already delivered locally
+        if event.get("origin") == self.origin:
+            return
+        
+        ws_manager.relay(event.get("kind"), event.get("topic"), event.get("data"))
+
+
+def _connect() -> "psycopg2.extensions.connection":
+    """
+    Open a dedicated psycopg2 connection outside the SQLAlchemy pool.
+    
+    Returns:
+        New psycopg2 connection
+    """
+    dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    return psycopg2.connect(dsn, client_encoding="utf8")
+
+
+# Global broadcast backend
+pg_broadcast = PostgresBroadcastBackend()
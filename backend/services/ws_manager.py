@@ -1,63 +1,469 @@
 """
 WebSocket manager for Star Citizen App.
 Manages WebSocket connections and broadcasting messages to connected clients.
+
+Each connection owns a bounded send queue drained by its own task, so a
+slow client never delays the others. Broadcasts are JSON-encoded once and
+fanned out to every queue; connections whose queue overflows or whose send
+fails are evicted.
+
+Clients subscribe to topics by sending JSON messages:
+
+    {"action": "subscribe", "topic": "prices:42"}
+    {"action": "unsubscribe", "topic": "prices:42"}
+
+Supported topics: "dashboard", "jobs:{user_id}" (own user only) and
+"prices:{material_id}". Stateful topics are published with publish_state():
+new subscribers receive the full payload, existing ones only the diff.
+
+Events published with the *_threadsafe methods are also handed to the
+optional cross-process backend (see services/ws_broadcast.py), which
+relays them to the clients connected to other workers.
 """
 
-from typing import List
+import asyncio
+import json
+import re
+from typing import Any, Dict, Optional, Set
 
 from fastapi import WebSocket
 
+# Messages buffered per connection before it is considered too slow
+WS_SEND_QUEUE_SIZE = 64
+
+# Maximum time a single send may take before the connection is dropped
+WS_SEND_TIMEOUT_SECONDS = 10
+
+# Close code used when evicting a client that cannot keep up (Try Again Later)
+WS_CLOSE_TOO_SLOW = 1013
+
+# Allowed subscription topics
+TOPIC_DASHBOARD = "dashboard"
+TOPIC_PATTERN = re.compile(r"^(dashboard|jobs:\d+|prices:\d+)$")
+
+# Kinds of events relayed between processes
+RELAY_EVENT = "event"
+RELAY_STATE = "state"
+
+
+class ClientConnection:
+    """A registered WebSocket with its outgoing queue and sender task."""
+    
+    def __init__(self, websocket: WebSocket):
+        """
+        Initialize connection state.
+        
+        Args:
+            websocket: Accepted WebSocket connection
+        """
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.sender_task: asyncio.Task = None
+        self.topics: Set[str] = set()
+        self.user_id: Optional[int] = None
+
 
 class WSManager:
     """
     WebSocket connection manager.
     
-    Maintains a list of active WebSocket connections and provides
-    methods for connecting, disconnecting, and broadcasting messages.
+    Maintains the active WebSocket connections and a topic -> connections
+    index, and provides methods for connecting, subscribing, publishing
+    and broadcasting messages.
     """
     
     def __init__(self):
-        """Initialize WebSocket manager with empty connections list."""
-        self.active_connections: List[WebSocket] = []
+        """Initialize WebSocket manager with no connections."""
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.topic_index: Dict[str, Set[WebSocket]] = {}
+        self._topic_state: Dict[str, Dict[str, Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[asyncio.Future] = set()
+        self.backend = None
     
-    async def connect(self, websocket: WebSocket) -> None:
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Bind the event loop used by the *_threadsafe methods.
+        
+        Called at startup so events are tracked before the first client
+        connects; connect() binds it too.
+        
+        Args:
+            loop: Running event loop of the application
+        """
+        self._loop = loop
+    
+    async def connect(self, websocket: WebSocket, user_id: Optional[int] = None) -> None:
         """
         Accept and register a new WebSocket connection.
         
+        Starts a dedicated task that drains the connection's send queue.
+        
         Args:
             websocket: WebSocket connection to register
+            user_id: Authenticated user, required for "jobs:{user_id}" topics
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        
+        self._loop = asyncio.get_running_loop()
+        
+        connection = ClientConnection(websocket)
+        connection.user_id = user_id
+        connection.sender_task = asyncio.create_task(self._drain(connection))
+        self.active_connections[websocket] = connection
     
     def disconnect(self, websocket: WebSocket) -> None:
         """
-        Unregister a WebSocket connection.
+        Unregister a WebSocket connection and stop its sender task.
         
         Args:
             websocket: WebSocket connection to remove
         """
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        connection = self.active_connections.pop(websocket, None)
+        
+        if connection:
+            self._remove_from_topics(connection)
+        
+        if connection and connection.sender_task and not connection.sender_task.done():
+            connection.sender_task.cancel()
+    
+    async def subscribe(self, websocket: WebSocket, topic: str) -> bool:
+        """
+        Subscribe a connection to a topic.
+        
+        If the topic has a published state, the full payload is sent
+        to the new subscriber right away.
+        
+        Args:
+            websocket: Subscribing connection
+            topic: Topic name
+        
+        Returns:
+            True if subscribed, False if the topic is invalid or not allowed
+        """
+        connection = self.active_connections.get(websocket)
+        
+        if not connection or not self._can_subscribe(connection, topic):
+            return False
+        
+        connection.topics.add(topic)
+        self.topic_index.setdefault(topic, set()).add(websocket)
+        
+        state = self._topic_state.get(topic)
+        if state is not None:
+            await self._enqueue(connection, _encode(_full_message(topic, state)))
+        
+        return True
+    
+    def unsubscribe(self, websocket: WebSocket, topic: str) -> None:
+        """
+        Unsubscribe a connection from a topic.
+        
+        Args:
+            websocket: Connection to unsubscribe
+            topic: Topic name
+        """
+        connection = self.active_connections.get(websocket)
+        
+        if connection:
+            connection.topics.discard(topic)
+        
+        subscribers = self.topic_index.get(topic)
+        if subscribers is not None:
+            subscribers.discard(websocket)
+            if not subscribers:
+                del self.topic_index[topic]
+    
+    async def handle_message(self, websocket: WebSocket, raw: str) -> None:
+        """
+        Process a client control message (subscribe / unsubscribe).
+        
+        Args:
+            websocket: Sending connection
+            raw: Raw text received from the client
+        """
+        try:
+            message = json.loads(raw)
+            action = message.get("action")
+            topic = message.get("topic")
+        except (ValueError, AttributeError):
+            await self.send(websocket, {"type": "ERROR", "detail": "Invalid JSON message"})
+            return
+        
+        if action == "subscribe":
+            if await self.subscribe(websocket, topic):
+                await self.send(websocket, {"type": "SUBSCRIBED", "topic": topic})
+            else:
+                await self.send(websocket, {"type": "ERROR", "topic": topic, "detail": "Topic not allowed"})
+        
+        elif action == "unsubscribe":
+            self.unsubscribe(websocket, topic)
+            await self.send(websocket, {"type": "UNSUBSCRIBED", "topic": topic})
+        
+        elif action == "ping":
+            await self.send(websocket, {"type": "PONG"})
+        
+        else:
+            await self.send(websocket, {"type": "ERROR", "detail": f"Unknown action: {action}"})
+    
+    async def publish(self, topic: str, message: dict) -> None:
+        """
+        Send a message to the subscribers of a topic only.
+        
+        Args:
+            topic: Topic name
+            message: Dictionary to send as JSON
+        """
+        subscribers = self.topic_index.get(topic)
+        if not subscribers:
+            return
+        
+        payload = _encode(message)
+        connections = [
+            self.active_connections[websocket]
+            for websocket in list(subscribers)
+            if websocket in self.active_connections
+        ]
+        
+        await asyncio.gather(
+            *(self._enqueue(connection, payload) for connection in connections)
+        )
+    
+    async def publish_state(self, topic: str, state: Dict[str, Any]) -> None:
+        """
+        Publish the new state of a topic as a diff.
+        
+        Only top-level keys whose value changed are sent to current
+        subscribers; nothing is sent if the state is unchanged. The
+        full state is kept for future subscribers.
+        
+        Args:
+            topic: Topic name
+            state: Complete current state for the topic
+        """
+        previous = self._topic_state.get(topic)
+        self._topic_state[topic] = state
+        
+        if previous is None:
+            await self.publish(topic, _full_message(topic, state))
+            return
+        
+        changes = {
+            key: value
+            for key, value in state.items()
+            if key not in previous or previous[key] != value
+        }
+        removed = [key for key in previous if key not in state]
+        
+        if not changes and not removed:
+            return
+        
+        await self.publish(topic, {
+            "type": f"{_topic_root(topic)}_DIFF",
+            "topic": topic,
+            "changes": changes,
+            "removed": removed,
+        })
+    
+    def publish_state_threadsafe(self, topic: str, state: Dict[str, Any]) -> None:
+        """
+        Publish a topic state from sync code (threadpool endpoints, jobs).
+        
+        Does nothing if no client ever connected in this process.
+        
+        Args:
+            topic: Topic name
+            state: Complete current state for the topic
+        """
+        self._submit(self.publish_state(topic, state))
+        
+        if self.backend is not None:
+            self.backend.notify(RELAY_STATE, topic, state)
+    
+    def relay(self, kind: str, topic: str, data: Any) -> None:
+        """
+        Deliver an event received from another process to local clients.
+        
+        Unlike the *_threadsafe methods, this never goes back to the backend.
+        
+        Args:
+            kind: RELAY_EVENT or RELAY_STATE
+            topic: Topic name
+            data: Message (event) or complete state
+        """
+        if not isinstance(topic, str) or not isinstance(data, dict):
+            return
+        
+        if kind == RELAY_EVENT:
+            self._submit(self.publish(topic, data))
+        elif kind == RELAY_STATE:
+            self._submit(self.publish_state(topic, data))
+    
+    def publish_threadsafe(self, topic: str, message: dict) -> None:
+        """
+        Publish an event message from sync code (threadpool endpoints, jobs).
+        
+        Does nothing if no client ever connected in this process.
+        
+        Args:
+            topic: Topic name
+            message: Dictionary to send as JSON
+        """
+        self._submit(self.publish(topic, message))
+        
+        if self.backend is not None:
+            self.backend.notify(RELAY_EVENT, topic, message)
     
     async def broadcast(self, message: dict) -> None:
         """
         Broadcast a message to all connected clients.
         
+        The message is encoded once and queued for every connection
+        concurrently; this never waits on client round trips.
+        
         Args:
             message: Dictionary to send as JSON to all clients
-            
-        Note:
-            Failed sends are silently ignored. Consider adding
-            error handling and automatic disconnection for failed sends.
         """
-        for websocket in self.active_connections:
-            try:
-                await websocket.send_json(message)
-            except Exception:
-                # Connection might be closed, will be cleaned up on next disconnect
-                pass
+        payload = _encode(message)
+        connections = list(self.active_connections.values())
+        
+        await asyncio.gather(
+            *(self._enqueue(connection, payload) for connection in connections)
+        )
+    
+    async def send(self, websocket: WebSocket, message: dict) -> None:
+        """
+        Queue a message for a single client.
+        
+        Args:
+            websocket: Target connection
+            message: Dictionary to send as JSON
+        """
+        connection = self.active_connections.get(websocket)
+        
+        if connection:
+            await self._enqueue(connection, _encode(message))
+    
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    
+    def _submit(self, coro) -> None:
+        """
+        Schedule a coroutine on the manager's event loop from another thread.
+        
+        Args:
+            coro: Coroutine to run (closed without running if no loop is known)
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            coro.close()
+            return
+        
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+    
+    def _can_subscribe(self, connection: ClientConnection, topic: Any) -> bool:
+        """
+        Check that a topic is valid and allowed for this connection.
+        
+        Args:
+            connection: Subscribing connection
+            topic: Requested topic
+        
+        Returns:
+            True if the subscription is allowed
+        """
+        if not isinstance(topic, str) or not TOPIC_PATTERN.match(topic):
+            return False
+        
+        if topic.startswith("jobs:"):
+            return connection.user_id is not None and topic == f"jobs:{connection.user_id}"
+        
+        return True
+    
+    def _remove_from_topics(self, connection: ClientConnection) -> None:
+        """
+        Remove a connection from every topic it subscribed to.
+        
+        Args:
+            connection: Connection being removed
+        """
+        for topic in list(connection.topics):
+            self.unsubscribe(connection.websocket, topic)
+    
+    async def _enqueue(self, connection: ClientConnection, payload: str) -> None:
+        """
+        Queue an encoded message, evicting the client if its queue is full.
+        
+        Args:
+            connection: Target connection
+            payload: JSON-encoded message
+        """
+        try:
+            connection.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            await self._evict(connection, code=WS_CLOSE_TOO_SLOW)
+    
+    async def _drain(self, connection: ClientConnection) -> None:
+        """
+        Send queued messages to one client until it disconnects.
+        
+        Args:
+            connection: Connection whose queue is drained
+        """
+        try:
+            while True:
+                payload = await connection.queue.get()
+                await asyncio.wait_for(
+                    connection.websocket.send_text(payload),
+                    timeout=WS_SEND_TIMEOUT_SECONDS,
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed or timed out: the client is gone or too slow
+            await self._evict(connection, code=WS_CLOSE_TOO_SLOW)
+    
+    async def _evict(self, connection: ClientConnection, code: int) -> None:
+        """
+        Drop a connection from the manager and close its socket.
+        
+        Args:
+            connection: Connection to evict
+            code: WebSocket close code
+        """
+        if self.active_connections.get(connection.websocket) is not connection:
+            return
+        
+        self.active_connections.pop(connection.websocket, None)
+        self._remove_from_topics(connection)
+        
+        if connection.sender_task and connection.sender_task is not asyncio.current_task():
+            connection.sender_task.cancel()
+        
+        try:
+            await connection.websocket.close(code=code)
+        except Exception:
+            # Socket already closed
+            pass
+
+
+def _encode(message: dict) -> str:
+    """Encode a message once for every recipient."""
+    return json.dumps(message, default=str)
+
+
+def _topic_root(topic: str) -> str:
+    """Message type prefix for a topic ("jobs:3" -> "JOBS")."""
+    return topic.split(":", 1)[0].upper()
+
+
+def _full_message(topic: str, state: Dict[str, Any]) -> dict:
+    """Build the full-state message sent to new subscribers."""
+    return {"type": f"{_topic_root(topic)}_UPDATE", "topic": topic, "payload": state}
 
 
 # Global WebSocket manager instance
-ws_manager = WSManager()
\ No newline at end of file
+ws_manager = WSManager()
@@ -0,0 +1,123 @@
+"""
+Test du hachage des mots de passe hors du threadpool partagé.
+
+register et reset-password doivent hacher dans password_executor
+(core/security.py) et non dans le threadpool des routes synchrones. Le
+hachage bcrypt est remplacé par un stub qui note le thread appelant ; la
+session est un stub : aucune base n'est nécessaire.
+
+Lancement : python -m pytest -q test_auth_password_hashing.py
+"""
+
+import asyncio
+import os
+import threading
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("UEX_API_TOKEN", "test")
+
+import httpx
+from fastapi import FastAPI
+
+import core.security
+from api import auth
+from database import get_db
+from models.user import User
+from schemas.auth import CurrentUser
+
+# Préfixe des threads de password_executor
+PASSWORD_THREAD_PREFIX = "password-hash"
+
+
+class StubQuery:
+    """Query stub: chainable, returns the configured user."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def filter(self, *criteria):
+        return self
+
+    def first(self):
+        return self.user
+
+
+class StubSession:
+    """Session stub: no existing user unless one is given."""
+
+    def __init__(self, user=None):
+        self.user = user
+
+    def query(self, *entities):
+        return StubQuery(self.user)
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        pass
+
+    def refresh(self, obj):
+        obj.id = 2
+        obj.is_active = True
+        obj.created_at = datetime.utcnow()
+
+
+def _admin():
+    return CurrentUser(
+        id=1,
+        username="admin",
+        email=None,
+        role="admin",
+        is_active=True,
+        created_at=datetime.utcnow(),
+    )
+
+
+def _build_app(session: StubSession) -> FastAPI:
+    app = FastAPI()
+    app.include_router(auth.router, prefix="/auth")
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[auth.get_current_user] = _admin
+    return app
+
+
+def _record_hash_threads(monkeypatch) -> list:
+    """Remplace bcrypt par un stub qui note le nom du thread appelant."""
+    threads = []
+
+    def fake_hash(password):
+        threads.append(threading.current_thread().name)
+        return "hashed"
+
+    monkeypatch.setattr(core.security.pwd_context, "hash", fake_hash)
+    return threads
+
+
+async def _post(app: FastAPI, url: str, payload: dict) -> httpx.Response:
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        return await client.post(url, json=payload)
+
+
+def test_register_hashes_in_password_executor(monkeypatch):
+    threads = _record_hash_threads(monkeypatch)
+    app = _build_app(StubSession())
+
+    response = asyncio.run(_post(app, "/auth/register", {"username": "carol", "password": "pw"}))
+
+    assert response.status_code == 200, response.text
+    assert asyncio.iscoroutinefunction(auth.register)
+    assert threads and all(name.startswith(PASSWORD_THREAD_PREFIX) for name in threads), threads
+
+
+def test_reset_password_hashes_in_password_executor(monkeypatch):
+    threads = _record_hash_threads(monkeypatch)
+    target = User(id=2, username="bob", password_hash="old", role="member", is_active=True)
+    app = _build_app(StubSession(user=target))
+
+    response = asyncio.run(_post(app, "/auth/reset-password/2", {"new_password": "pw"}))
+
+    assert response.status_code == 200, response.text
+    assert target.password_hash == "hashed"
+    assert threads and all(name.startswith(PASSWORD_THREAD_PREFIX) for name in threads), threads
@@ -0,0 +1,118 @@
+"""
+Test de latence de la boucle d'événements sous requêtes d'historique concurrentes.
+
+Les routes de routes/history.py sont synchrones : FastAPI les exécute dans
+le threadpool, donc une requête DB lente ne doit pas bloquer la boucle.
+La session est remplacée par un stub qui bloque (time.sleep) comme le
+ferait psycopg2 : aucune base n'est nécessaire.
+
+Lancement : python -m pytest -q test_history_event_loop.py
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("UEX_API_TOKEN", "test")
+
+import httpx
+from fastapi import FastAPI
+
+from api.auth import get_current_user
+from database import get_db
+from routes.history import router as history_router
+from schemas.auth import CurrentUser
+
+# Durée d'une requête DB simulée
+QUERY_SECONDS = 0.2
+
+# Requêtes d'historique lancées en parallèle
+CONCURRENT_REQUESTS = 10
+
+# Retard maximal toléré sur un tick de la boucle
+MAX_LOOP_LAG_SECONDS = 0.1
+
+# Période du tick de mesure
+TICK_SECONDS = 0.01
+
+
+class BlockingQuery:
+    """Query stub: chainable, blocks the calling thread on execution."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def all(self):
+        time.sleep(QUERY_SECONDS)
+        return []
+
+
+class BlockingSession:
+    """Session stub returning blocking queries."""
+
+    def query(self, *entities):
+        return BlockingQuery()
+
+
+def _override_get_db():
+    yield BlockingSession()
+
+
+def _override_current_user():
+    return CurrentUser(
+        id=1,
+        username="admin",
+        email=None,
+        role="admin",
+        is_active=True,
+        created_at=datetime.utcnow(),
+    )
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(history_router)
+    app.dependency_overrides[get_db] = _override_get_db
+    app.dependency_overrides[get_current_user] = _override_current_user
+    return app
+
+
+async def _measure_loop_lag(stop: asyncio.Event) -> float:
+    """Plus grand retard observé d'un tick de TICK_SECONDS jusqu'à stop."""
+    max_lag = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        max_lag = max(max_lag, time.perf_counter() - started - TICK_SECONDS)
+    return max_lag
+
+
+async def _run_concurrent_history_requests():
+    app = _build_app()
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_measure_loop_lag(stop))
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.get("/stats/history/") for _ in range(CONCURRENT_REQUESTS)
+        ))
+        elapsed = time.perf_counter() - started
+
+    stop.set()
+    return responses, elapsed, await monitor
+
+
+def test_history_queries_do_not_block_event_loop():
+    responses, elapsed, max_lag = asyncio.run(_run_concurrent_history_requests())
+
+    assert [r.status_code for r in responses] == [200] * CONCURRENT_REQUESTS
+    assert all(r.json() == [] for r in responses)
+
+    # La boucle reste réactive pendant les requêtes bloquantes
+    assert max_lag < MAX_LOOP_LAG_SECONDS, f"event loop lag {max_lag:.3f}s"
+
+    # Les requêtes se recouvrent (threadpool) au lieu de s'enchaîner
+    assert elapsed < CONCURRENT_REQUESTS * QUERY_SECONDS / 2
@@ -54,6 +54,14 @@ export default function StatsOverview() {
       const data = JSON.parse(event.data)
       if (data.type === "DASHBOARD_UPDATE") {
         setStats(data.payload)
+      } else if (data.type === "DASHBOARD_DIFF") {
+        // Only the changed fields are sent
+        setStats(prev => {
+          if (!prev) return prev
+          const next = { ...prev, ...data.changes }
+          for (const key of data.removed ?? []) delete (next as any)[key]
+          return next
+        })
       }
     }
 